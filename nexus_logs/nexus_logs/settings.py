@@ -67,9 +67,27 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "data" / "db.sqlite3",
+        # Reuse each worker's connection across requests instead of
+        # reopening the file (and re-running the pragmas below) every time.
+        "CONN_MAX_AGE": int(os.environ.get("DJANGO_CONN_MAX_AGE", "600")),
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {
+            # Seconds to wait for another connection's write lock (e.g. a
+            # running import) before giving up with "database is locked".
+            "timeout": 30,
+        },
     }
 }
 
+# Applied to every new SQLite connection by tracker.sqlite.configure_sqlite.
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -64 * 1024,  # negative = KiB, so 64 MB
+    "mmap_size": 256 * 1024 * 1024,
+    "temp_store": "MEMORY",
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {"NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator"},
     {"NAME": "django.contrib.auth.password_validation.MinimumLengthValidator"},
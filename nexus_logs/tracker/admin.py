@@ -1,16 +1,122 @@
+import json
+
 from django.contrib import admin
+from django.db import transaction
+from django.utils.html import format_html
 
-from .models import AppConfig, TimelineEntry
+from .geofence import retag_all, tag_entries
+from .models import (
+    AppConfig, DaySummary, GeoFence, ImportedSegment, ImportJob, KnownPlace, Part,
+    PartLineItem, RawSegment, TimelineEntry,
+)
+from .parts import release_part_items, sync_part_items
 
 
 @admin.register(TimelineEntry)
 class TimelineEntryAdmin(admin.ModelAdmin):
     list_display = ["visit_date", "entry_type", "source", "location_name", "start_time", "end_time"]
-    list_filter = ["entry_type", "source", "visit_date"]
+    list_filter = ["entry_type", "source", "is_home", "geofence", "visit_date"]
     search_fields = ["location_name", "address", "parts_used", "comments"]
     date_hierarchy = "visit_date"
+    readonly_fields = ["original_segment"]
+
+    # Changes made here have to reach the geo-fence tags, the parts
+    # catalogue and the day summaries too, as they do from the app's own
+    # views
+    def save_model(self, request, obj, form, change):
+        old_date = (
+            TimelineEntry.objects.filter(pk=obj.pk).values_list("visit_date", flat=True).first()
+            if change else None
+        )
+        with transaction.atomic():
+            tag_entries([obj])  # a new or moved visit may be in a fence or at home
+            super().save_model(request, obj, form, change)
+            sync_part_items(obj)
+            DaySummary.refresh(filter(None, [old_date, obj.visit_date]))
+
+    def delete_model(self, request, obj):
+        with transaction.atomic():
+            release_part_items(obj)
+            super().delete_model(request, obj)
+            DaySummary.refresh([obj.visit_date])
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            dates = set(queryset.values_list("visit_date", flat=True))
+            for obj in queryset.exclude(parts_used=""):
+                release_part_items(obj)
+            super().delete_queryset(request, queryset)
+            DaySummary.refresh(dates)
+
+    @admin.display(description="Original export segment")
+    def original_segment(self, obj):
+        try:
+            raw = obj.raw_segment
+        except RawSegment.DoesNotExist:
+            return "—"
+        return format_html("<pre>{}</pre>", json.dumps(raw.data, indent=2))
 
 
 @admin.register(AppConfig)
 class AppConfigAdmin(admin.ModelAdmin):
     list_display = ["default_export_format", "home_address"]
+
+
+@admin.register(GeoFence)
+class GeoFenceAdmin(admin.ModelAdmin):
+    list_display = ["name", "shape", "radius_m", "is_home"]
+    list_filter = ["shape", "is_home"]
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        retag_all()
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        retag_all()
+
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        retag_all()
+
+
+@admin.register(KnownPlace)
+class KnownPlaceAdmin(admin.ModelAdmin):
+    list_display = ["location_name", "address", "place_id", "updated_at"]
+    search_fields = ["location_name", "address", "place_id"]
+
+
+@admin.register(Part)
+class PartAdmin(admin.ModelAdmin):
+    list_display = ["name", "use_count"]
+    search_fields = ["name"]
+    readonly_fields = ["key", "use_count"]
+
+
+@admin.register(PartLineItem)
+class PartLineItemAdmin(admin.ModelAdmin):
+    list_display = ["visit_date", "part", "quantity", "unit", "line"]
+    list_filter = ["unit"]
+    search_fields = ["line", "part__name"]
+    date_hierarchy = "visit_date"
+
+
+@admin.register(DaySummary)
+class DaySummaryAdmin(admin.ModelAdmin):
+    list_display = ["date", "visit_count", "home_visit_count", "drive_minutes", "drive_km"]
+    date_hierarchy = "date"
+
+
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+    list_display = [
+        "created_at", "original_name", "status",
+        "segments_parsed", "created_count", "refined_count", "skipped_count",
+    ]
+    list_filter = ["status"]
+
+
+@admin.register(ImportedSegment)
+class ImportedSegmentAdmin(admin.ModelAdmin):
+    list_display = ["fingerprint", "imported_at"]
+    search_fields = ["fingerprint"]
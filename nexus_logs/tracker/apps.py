@@ -1,6 +1,12 @@
 from django.apps import AppConfig as DjangoAppConfig
+from django.db.backends.signals import connection_created
 
 
 class TrackerConfig(DjangoAppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "tracker"
+
+    def ready(self):
+        from .sqlite import configure_sqlite
+
+        connection_created.connect(configure_sqlite, dispatch_uid="tracker.configure_sqlite")
@@ -1,6 +1,11 @@
 from django import forms
+from django.urls import reverse_lazy
 
-from .models import AppConfig, TimelineEntry
+from .models import AppConfig, GeoFence, TimelineEntry
+
+# parts_used textareas get suggestions from previously used parts (see the
+# script in base.html and tracker.parts)
+PARTS_AUTOCOMPLETE = {"data-parts-url": reverse_lazy("parts_autocomplete"), "autocomplete": "off"}
 
 INPUT_CLASSES = "w-full border border-slate-300 rounded-lg px-3 py-1.5 text-sm focus:outline-none focus:ring-2 focus:ring-brand-600"
 
@@ -43,6 +48,7 @@ class JobEntryForm(TailwindStyledForm, forms.ModelForm):
                 attrs={
                     "rows": 4,
                     "placeholder": "One item per line, e.g.\nX1 4x2 plug\nX1 gland\n500mm 16x25 trunking",
+                    **PARTS_AUTOCOMPLETE,
                 }
             ),
             "comments": forms.Textarea(
@@ -72,7 +78,9 @@ class ManualEntryForm(TailwindStyledForm, forms.Form):
     )
     parts_used = forms.CharField(
         required=False,
-        widget=forms.Textarea(attrs={"rows": 4, "placeholder": "One item per line"}),
+        widget=forms.Textarea(
+            attrs={"rows": 4, "placeholder": "One item per line", **PARTS_AUTOCOMPLETE}
+        ),
     )
     comments = forms.CharField(required=False, widget=forms.Textarea(attrs={"rows": 2}))
 
@@ -94,3 +102,23 @@ class ConfigForm(TailwindStyledForm, forms.ModelForm):
                 attrs={"placeholder": "e.g. Home (Grande Stellenbosch)"}
             ),
         }
+
+
+class GeoFenceForm(TailwindStyledForm, forms.ModelForm):
+    """Quick-add for a circular area on the settings page — polygons are
+    rarer and are drawn up in /admin/ instead."""
+
+    class Meta:
+        model = GeoFence
+        fields = ["name", "latitude", "longitude", "radius_m", "is_home"]
+        widgets = {
+            "name": forms.TextInput(attrs={"placeholder": "e.g. Depot, Villa Lion View"}),
+            "latitude": forms.NumberInput(attrs={"placeholder": "-33.9012", "step": "any"}),
+            "longitude": forms.NumberInput(attrs={"placeholder": "18.6934", "step": "any"}),
+        }
+        labels = {"radius_m": "Radius (m)", "is_home": "This is home"}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields["latitude"].required = True
+        self.fields["longitude"].required = True
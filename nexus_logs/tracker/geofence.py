@@ -0,0 +1,174 @@
+"""
+Matches visits to GeoFence areas by coordinates, and precomputes the
+`geofence` / `is_home` tags on TimelineEntry rows so the dashboard's home
+filter is an indexed column lookup rather than a substring scan.
+
+The fences (a few dozen at most) are loaded into an in-memory grid index:
+each one is registered in every ~1 km cell its bounding box touches, so
+matching a point only runs the exact circle/polygon test against the
+handful of fences sharing its cell. When fences overlap (a customer's
+site inside a broad depot area, say), the smallest one wins.
+
+A visit is tagged as home if it falls inside a fence marked is_home, or
+if its name/address contains AppConfig.home_address — the only way to
+recognise manual entries, which have no coordinates.
+"""
+import math
+from typing import Optional
+
+from django.db import transaction
+
+from .models import AppConfig, DaySummary, GeoFence, TimelineEntry
+
+_CELL_DEG = 0.01  # ~1.1 km of latitude per grid cell
+# Fences spanning more cells than this (whole suburbs) are checked against
+# every point instead of being registered cell by cell.
+_MAX_CELLS_PER_FENCE = 2500
+_METRES_PER_DEG_LAT = 111_320
+_EARTH_RADIUS_M = 6_371_000
+
+
+def haversine_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * _EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+def _point_in_polygon(lat: float, lng: float, points) -> bool:
+    """Even-odd ray casting, treating lng as x and lat as y — plenty
+    accurate at the scale of a job site."""
+    inside = False
+    j = len(points) - 1
+    for i in range(len(points)):
+        lat_i, lng_i = points[i]
+        lat_j, lng_j = points[j]
+        if (lat_i > lat) != (lat_j > lat):
+            crossing = lng_i + (lat - lat_i) * (lng_j - lng_i) / (lat_j - lat_i)
+            if lng < crossing:
+                inside = not inside
+        j = i
+    return inside
+
+
+class _Area:
+    """One fence, pre-digested for fast containment tests."""
+
+    def __init__(self, fence: GeoFence):
+        self.fence = fence
+        if fence.shape == GeoFence.POLYGON:
+            self.points = [(float(lat), float(lng)) for lat, lng in fence.polygon]
+            lats = [p[0] for p in self.points]
+            lngs = [p[1] for p in self.points]
+            self.bbox = (min(lats), min(lngs), max(lats), max(lngs))
+            mid_lat = math.radians((self.bbox[0] + self.bbox[2]) / 2)
+            shoelace = sum(
+                a[1] * b[0] - b[1] * a[0]
+                for a, b in zip(self.points, self.points[1:] + self.points[:1])
+            )
+            self.size = abs(shoelace) / 2 * _METRES_PER_DEG_LAT ** 2 * math.cos(mid_lat)
+        else:
+            lat, lng, radius = fence.latitude, fence.longitude, fence.radius_m
+            d_lat = radius / _METRES_PER_DEG_LAT
+            d_lng = radius / (_METRES_PER_DEG_LAT * max(math.cos(math.radians(lat)), 1e-6))
+            self.bbox = (lat - d_lat, lng - d_lng, lat + d_lat, lng + d_lng)
+            self.size = math.pi * radius ** 2
+
+    def contains(self, lat: float, lng: float) -> bool:
+        min_lat, min_lng, max_lat, max_lng = self.bbox
+        if not (min_lat <= lat <= max_lat and min_lng <= lng <= max_lng):
+            return False
+        fence = self.fence
+        if fence.shape == GeoFence.POLYGON:
+            return _point_in_polygon(lat, lng, self.points)
+        return haversine_m(lat, lng, fence.latitude, fence.longitude) <= fence.radius_m
+
+
+def _cell(lat: float, lng: float) -> tuple:
+    return math.floor(lat / _CELL_DEG), math.floor(lng / _CELL_DEG)
+
+
+class GeoFenceIndex:
+    def __init__(self, fences):
+        self._cells = {}
+        self._oversized = []
+        for fence in fences:
+            try:
+                area = _Area(fence)
+            except (TypeError, ValueError):
+                continue  # half-configured fence (see GeoFence.clean)
+            min_row, min_col = _cell(area.bbox[0], area.bbox[1])
+            max_row, max_col = _cell(area.bbox[2], area.bbox[3])
+            if (max_row - min_row + 1) * (max_col - min_col + 1) > _MAX_CELLS_PER_FENCE:
+                self._oversized.append(area)
+                continue
+            for row in range(min_row, max_row + 1):
+                for col in range(min_col, max_col + 1):
+                    self._cells.setdefault((row, col), []).append(area)
+
+    @classmethod
+    def load(cls) -> "GeoFenceIndex":
+        return cls(GeoFence.objects.all())
+
+    def match(self, lat: float, lng: float) -> Optional[GeoFence]:
+        """The smallest fence containing the point, or None."""
+        best = None
+        for area in (*self._cells.get(_cell(lat, lng), ()), *self._oversized):
+            if (best is None or area.size < best.size) and area.contains(lat, lng):
+                best = area
+        return best.fence if best else None
+
+
+def tag_entries(entries, index: Optional[GeoFenceIndex] = None, home_address: Optional[str] = None) -> list:
+    """Sets `geofence` and `is_home` on each TimelineEntry in place (saved
+    or not) and returns the ones whose tags changed. Pass `index` and
+    `home_address` when tagging in a loop to avoid reloading them."""
+    if index is None:
+        index = GeoFenceIndex.load()
+    if home_address is None:
+        home_address = AppConfig.get_solo().home_address
+    home = home_address.lower()
+
+    changed = []
+    for entry in entries:
+        fence = None
+        is_home = False
+        if entry.entry_type == TimelineEntry.VISIT:
+            if entry.latitude is not None and entry.longitude is not None:
+                fence = index.match(entry.latitude, entry.longitude)
+            is_home = (fence is not None and fence.is_home) or bool(
+                home and (home in entry.location_name.lower() or home in entry.address.lower())
+            )
+        if entry.geofence_id != (fence.pk if fence else None) or entry.is_home != is_home:
+            entry.geofence = fence
+            entry.is_home = is_home
+            changed.append(entry)
+    return changed
+
+
+RETAG_BATCH_SIZE = 2000
+
+
+def retag_all() -> int:
+    """Re-tags every entry — run after the fences or the home address
+    change — and rebuilds the day summaries that count home visits.
+    Returns how many entries changed."""
+    index = GeoFenceIndex.load()
+    home_address = AppConfig.get_solo().home_address
+    entries = TimelineEntry.objects.only(
+        "entry_type", "latitude", "longitude", "location_name", "address", "geofence", "is_home"
+    ).order_by("pk")
+    changed_count = 0
+    last_pk = 0
+    with transaction.atomic():
+        # walked in pk order a batch at a time, rather than writing to the
+        # table while a cursor over it is still open
+        while batch := list(entries.filter(pk__gt=last_pk)[:RETAG_BATCH_SIZE]):
+            last_pk = batch[-1].pk
+            changed = tag_entries(batch, index, home_address)
+            if changed:
+                TimelineEntry.objects.bulk_update(changed, ["geofence", "is_home"], batch_size=500)
+            changed_count += len(changed)
+        DaySummary.refresh_all()
+    return changed_count
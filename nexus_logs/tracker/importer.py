@@ -0,0 +1,431 @@
+"""
+The Timeline import pipeline: turns parsed visit/drive dicts into
+TimelineEntry rows without ever duplicating a segment or clobbering
+anything the user typed in. Shared by the upload view and the background
+import worker (tracker.jobs).
+"""
+import datetime as dt
+import os
+from typing import Optional
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .geofence import GeoFenceIndex, tag_entries
+from .models import AppConfig, DaySummary, ImportedSegment, RawSegment, TimelineEntry
+from .parsers import iter_timeline_batches, segment_fingerprint
+from .paths import PATH_CARRY_WINDOW, attach_path_points
+from .places import PlaceMemory, apply_known_names
+
+
+# Fields Google's own data can legitimately refine between exports (e.g. an
+# in-progress visit's end_time growing once you've actually left). Never
+# includes location_name/address/parts_used/comments — those may have been
+# typed in by the user and a re-import must not clobber them.
+_REFINABLE_FIELDS = ["end_time", "distance_km", "latitude", "longitude"]
+
+
+def _identity_key(entry: dict):
+    """The stable identity Google reuses for 'the same' visit/drive across
+    re-exports. Visits key on their place_id (stable even if start/end get
+    refined); drives have no place_id but can't physically overlap for one
+    phone, so start_time alone is safe. See the UniqueConstraints on
+    TimelineEntry for the DB-level backstop of this same logic."""
+    if entry["entry_type"] == TimelineEntry.VISIT:
+        return (TimelineEntry.VISIT, entry.get("place_id"), entry["start_time"])
+    return (TimelineEntry.DRIVE, None, entry["start_time"])
+
+
+def _import_parsed_entries(
+    parsed: list, path_buffer: Optional[list] = None, fingerprints: Optional[list] = None
+) -> tuple:
+    """Creates new TimelineEntry rows for segments never seen before, and
+    refines already-imported ones in place (see _REFINABLE_FIELDS) instead
+    of either duplicating them or leaving stale end times when the same
+    Timeline export is re-uploaded — which happens on every import, since
+    Google only offers a full-history export, not an incremental one.
+    Segments already recorded in the ImportedSegment ledger are dropped up
+    front, before the database is asked about any of them.
+
+    On SQLite 3.35+ the new-versus-existing diff is done by the database
+    itself (_upsert_in_sqlite); elsewhere existing rows are loaded and
+    compared in Python (_diff_in_python).
+
+    "path" dicts (timelinePath breadcrumbs) in `parsed` are merged into
+    the routes of the drives they belong to (tracker.paths). Points that
+    can't be matched yet are left in `path_buffer`, if one is passed, to
+    be retried with the next batch. A path segment only joins the ledger
+    once none of its points are still waiting there, so one whose drive
+    hasn't been imported yet — it's in a later export, or the import
+    stopped first — is read again next time.
+
+    `fingerprints`, when the parser has already worked them out, are the
+    parsed segments' segment_fingerprint()s, in order.
+    Returns (created_count, updated_count).
+    """
+    if fingerprints is None:
+        fingerprints = [segment_fingerprint(e["raw_data"]) for e in parsed]
+    already_imported = set(
+        ImportedSegment.objects.filter(fingerprint__in=fingerprints).values_list(
+            "fingerprint", flat=True
+        )
+    )
+    fresh = [(e, fp) for e, fp in zip(parsed, fingerprints) if fp not in already_imported]
+    if not fresh:
+        return 0, 0
+
+    # buffered points carry their segment's fingerprint as a fourth item
+    path_points = list(path_buffer or ())
+    path_segments = {point[3] for point in path_points}
+    entries = []
+    seen_in_batch = set()
+    for entry, fp in fresh:
+        if entry["entry_type"] == "path":
+            path_points.extend((*point, fp) for point in entry["points"])
+            path_segments.add(fp)
+            continue
+        key = _identity_key(entry)
+        if key in seen_in_batch:
+            continue  # the export itself repeated this segment
+        seen_in_batch.add(key)
+        entries.append(entry)
+
+    created = updated = 0
+    touched_dates = set()
+    with transaction.atomic():
+        if entries:
+            apply = _upsert_in_sqlite if _can_upsert() else _diff_in_python
+            created, updated, touched_dates = apply(entries)
+        reached = max(e["start_time"] for e in entries) if entries else None
+        _attach_path_points(path_points, path_buffer, reached)
+        waiting = {point[3] for point in path_buffer or ()}
+        _record_imported(
+            [fp for entry, fp in fresh if entry["entry_type"] != "path"]
+            + [fp for fp in path_segments if fp not in waiting]
+        )
+        DaySummary.refresh(touched_dates)
+
+    return created, updated
+
+
+def _new_entries(entries: list) -> list:
+    """Unsaved TimelineEntry rows for parsed dicts, named and tagged the
+    way a brand-new row should be."""
+    rows = [
+        TimelineEntry(
+            source=TimelineEntry.GOOGLE,
+            visit_date=entry["start_time"].date(),
+            **{k: v for k, v in entry.items() if k != "raw_data"},
+        )
+        for entry in entries
+    ]
+    # Names the user has given these places before are filled in first
+    # (tracker.places), so the home tag below sees them too. Geo-fence/home
+    # tags are worked out here, once per row, so the dashboard's home
+    # filter never has to (see tracker.geofence).
+    apply_known_names(rows, PlaceMemory.load())
+    tag_entries(rows, GeoFenceIndex.load(), AppConfig.get_solo().home_address)
+    for row in rows:
+        if row.geofence is not None and not row.location_name:
+            row.location_name = row.geofence.name
+    return rows
+
+
+def _retag(rows) -> None:
+    """Re-tags refined rows, in case their coordinates moved."""
+    changed = tag_entries(rows, GeoFenceIndex.load(), AppConfig.get_solo().home_address)
+    if changed:
+        TimelineEntry.objects.bulk_update(changed, ["geofence", "is_home"], batch_size=500)
+
+
+def _save_raw_segments(raw_by_pk: dict) -> None:
+    # The original segments go to the RawSegment side table, not onto the
+    # entry rows. Every segment here is new or changed (the ledger already
+    # dropped exact repeats), so its stored copy is always rewritten.
+    RawSegment.objects.bulk_create(
+        [RawSegment(entry_id=pk, compressed=RawSegment.pack(raw)) for pk, raw in raw_by_pk.items()],
+        batch_size=500,
+        update_conflicts=True,
+        unique_fields=["entry"],
+        update_fields=["compressed"],
+    )
+
+
+def _diff_in_python(entries: list) -> tuple:
+    """Loads the existing rows in the batch's date window and diffs them
+    against `entries` attribute by attribute. Returns
+    (created_count, updated_count, touched_dates)."""
+    min_date = min(e["start_time"] for e in entries).date() - dt.timedelta(days=1)
+    max_date = max(e["end_time"] for e in entries).date() + dt.timedelta(days=1)
+    existing = {
+        _identity_key(
+            {
+                "entry_type": e.entry_type,
+                "place_id": e.place_id,
+                "start_time": e.start_time,
+            }
+        ): e
+        for e in TimelineEntry.objects.filter(
+            source=TimelineEntry.GOOGLE, visit_date__gte=min_date, visit_date__lte=max_date
+        ).only(
+            "entry_type", "place_id", "start_time", "visit_date",
+            "location_name", "address", "geofence", "is_home", *_REFINABLE_FIELDS,
+        )
+    }
+
+    new = []
+    to_update = []
+    raw_by_pk = {}
+    raw_for_new = {}
+    for entry in entries:
+        key = _identity_key(entry)
+        match = existing.get(key)
+        if match is None:
+            new.append(entry)
+            raw_for_new[key] = entry["raw_data"]
+            continue
+
+        raw_by_pk[match.pk] = entry["raw_data"]
+        changed = False
+        for field in _REFINABLE_FIELDS:
+            new_value = entry.get(field)
+            if new_value is not None and getattr(match, field) != new_value:
+                setattr(match, field, new_value)
+                changed = True
+        if changed:
+            to_update.append(match)
+
+    to_create = _new_entries(new)
+    TimelineEntry.objects.bulk_create(to_create, batch_size=500, ignore_conflicts=True)
+    if to_create:
+        # ignore_conflicts leaves the new rows without pks, so read them
+        # back by identity to link their raw segments
+        created_rows = TimelineEntry.objects.filter(
+            source=TimelineEntry.GOOGLE, start_time__in={e.start_time for e in to_create}
+        ).values_list("pk", "entry_type", "place_id", "start_time")
+        for pk, entry_type, place_id, start_time in created_rows:
+            key = _identity_key(
+                {"entry_type": entry_type, "place_id": place_id, "start_time": start_time}
+            )
+            if key in raw_for_new:
+                raw_by_pk[pk] = raw_for_new[key]
+    if to_update:
+        TimelineEntry.objects.bulk_update(to_update, _REFINABLE_FIELDS, batch_size=500)
+        _retag(to_update)
+    _save_raw_segments(raw_by_pk)
+
+    touched_dates = {e.visit_date for e in [*to_create, *to_update]}
+    return len(to_create), len(to_update), touched_dates
+
+
+# ---------------------------------------------------------------------------
+# Set-based path: the diff happens inside SQLite
+# ---------------------------------------------------------------------------
+#
+# The batch is bulk-inserted into a per-connection temp table, then applied
+# with INSERT ... SELECT ... ON CONFLICT DO UPDATE against the
+# unique_visit_per_place_start / unique_drive_per_start indexes. The DO
+# UPDATE only fires when a refinable field actually changed, and RETURNING
+# hands back exactly the rows that were inserted or refined — so no
+# existing row is loaded into Python unless it changed.
+
+_STAGING_TABLE = "tracker_import_staging"
+_STAGED_FIELDS = [
+    "entry_type", "source", "location_name", "address", "latitude", "longitude",
+    "place_id", "geofence", "is_home", "distance_km", "start_time", "end_time",
+    "visit_date", "parts_used", "comments", "created_at", "updated_at",
+]
+
+
+def _can_upsert() -> bool:
+    # RETURNING arrived in SQLite 3.35, UPDATE ... FROM in 3.33
+    return connection.vendor == "sqlite" and connection.Database.sqlite_version_info >= (3, 35)
+
+
+def _upsert_sql() -> dict:
+    qn = connection.ops.quote_name
+    table = qn(TimelineEntry._meta.db_table)
+    fields = [TimelineEntry._meta.get_field(name) for name in _STAGED_FIELDS]
+    columns = ", ".join(qn(f.column) for f in fields)
+    staged_columns = ", ".join(f"s.{qn(f.column)}" for f in fields)
+    refinable = [qn(TimelineEntry._meta.get_field(name).column) for name in _REFINABLE_FIELDS]
+    updated_at = qn(TimelineEntry._meta.get_field("updated_at").column)
+
+    def refine(source: str) -> tuple:
+        # like the Python diff: a refinable value only replaces the stored
+        # one when the export has one and it differs
+        assignments = ", ".join(f"{c} = COALESCE({source}.{c}, {table}.{c})" for c in refinable)
+        changed = " OR ".join(
+            f"({source}.{c} IS NOT NULL AND {source}.{c} IS NOT {table}.{c})" for c in refinable
+        )
+        return f"{assignments}, {updated_at} = {source}.{updated_at}", changed
+
+    conflict_set, conflict_changed = refine("excluded")
+    null_set, null_changed = refine("s")
+    upsert = (
+        f"INSERT INTO {table} ({columns}) "
+        f"SELECT {staged_columns} FROM {_STAGING_TABLE} AS s WHERE {{where}} ORDER BY s.seq "
+        f"ON CONFLICT {{target}} DO UPDATE SET {conflict_set} WHERE {conflict_changed} "
+        f"RETURNING id, visit_date"
+    )
+    return {
+        "create": (
+            f"CREATE TEMP TABLE IF NOT EXISTS {_STAGING_TABLE} "
+            f"(seq INTEGER PRIMARY KEY, {columns})"
+        ),
+        "clear": f"DELETE FROM {_STAGING_TABLE}",
+        "stage": (
+            f"INSERT INTO {_STAGING_TABLE} (seq, {columns}) "
+            f"VALUES ({', '.join(['%s'] * (len(fields) + 1))})"
+        ),
+        "max_id": f"SELECT COALESCE(MAX(id), 0) FROM {table}",
+        "visits": upsert.format(
+            where="s.entry_type = 'visit' AND s.place_id IS NOT NULL",
+            target="(source, place_id, start_time) WHERE entry_type = 'visit'",
+        ),
+        "drives": upsert.format(
+            where="s.entry_type = 'drive'",
+            target="(source, start_time) WHERE entry_type = 'drive'",
+        ),
+        # A visit without a place_id can never hit the unique index (NULLs
+        # are distinct), so those are matched explicitly instead.
+        "refine_unplaced": (
+            f"UPDATE {table} SET {null_set} FROM {_STAGING_TABLE} AS s "
+            f"WHERE {table}.entry_type = 'visit' AND {table}.place_id IS NULL "
+            f"AND s.entry_type = 'visit' AND s.place_id IS NULL "
+            f"AND {table}.source = s.source AND {table}.start_time = s.start_time "
+            f"AND ({null_changed}) RETURNING id, visit_date"
+        ),
+        "insert_unplaced": (
+            f"INSERT INTO {table} ({columns}) "
+            f"SELECT {staged_columns} FROM {_STAGING_TABLE} AS s "
+            f"WHERE s.entry_type = 'visit' AND s.place_id IS NULL AND NOT EXISTS ("
+            f"SELECT 1 FROM {table} AS e WHERE e.entry_type = 'visit' AND e.place_id IS NULL "
+            f"AND e.source = s.source AND e.start_time = s.start_time"
+            f") ORDER BY s.seq RETURNING id, visit_date"
+        ),
+        # every staged row's id, for linking its raw segment
+        "ids": (
+            f"SELECT s.seq, e.id FROM {_STAGING_TABLE} AS s JOIN {table} AS e "
+            f"ON e.entry_type = 'visit' AND e.source = s.source "
+            f"AND e.place_id = s.place_id AND e.start_time = s.start_time "
+            f"WHERE s.entry_type = 'visit' "
+            f"UNION ALL "
+            f"SELECT s.seq, e.id FROM {_STAGING_TABLE} AS s JOIN {table} AS e "
+            f"ON e.entry_type = 'drive' AND e.source = s.source AND e.start_time = s.start_time "
+            f"WHERE s.entry_type = 'drive' "
+            f"UNION ALL "
+            f"SELECT s.seq, e.id FROM {_STAGING_TABLE} AS s JOIN {table} AS e "
+            f"ON e.entry_type = 'visit' AND e.place_id IS NULL "
+            f"AND e.source = s.source AND e.start_time = s.start_time "
+            f"WHERE s.entry_type = 'visit' AND s.place_id IS NULL"
+        ),
+    }
+
+
+def _upsert_in_sqlite(entries: list) -> tuple:
+    """Stages `entries` and lets SQLite insert the new ones and refine the
+    changed ones. Returns (created_count, updated_count, touched_dates)."""
+    sql = _upsert_sql()
+    rows = _new_entries(entries)
+    now = timezone.now()
+    fields = [TimelineEntry._meta.get_field(name) for name in _STAGED_FIELDS]
+    staged = []
+    for seq, row in enumerate(rows):
+        row.created_at = row.updated_at = now
+        staged.append(
+            [seq, *(f.get_db_prep_save(getattr(row, f.attname), connection) for f in fields)]
+        )
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql["create"])
+        cursor.execute(sql["clear"])
+        cursor.executemany(sql["stage"], staged)
+        cursor.execute(sql["max_id"])
+        max_existing_id = cursor.fetchone()[0]
+
+        touched = []
+        for statement in ("visits", "drives", "refine_unplaced", "insert_unplaced"):
+            cursor.execute(sql[statement])
+            touched.extend(cursor.fetchall())
+
+        cursor.execute(sql["ids"])
+        raw_by_pk = {pk: entries[seq]["raw_data"] for seq, pk in cursor.fetchall()}
+        cursor.execute(sql["clear"])
+
+    # ids are AUTOINCREMENT, so anything above the old maximum is new
+    created_ids = {pk for pk, _ in touched if pk > max_existing_id}
+    refined_ids = [pk for pk, _ in touched if pk <= max_existing_id]
+    if refined_ids:
+        _retag(
+            TimelineEntry.objects.filter(pk__in=refined_ids).only(
+                "entry_type", "latitude", "longitude", "location_name", "address",
+                "geofence", "is_home",
+            )
+        )
+    _save_raw_segments(raw_by_pk)
+
+    touched_dates = {dt.date.fromisoformat(str(day)) for _, day in touched}
+    return len(created_ids), len(refined_ids), touched_dates
+
+
+def _attach_path_points(points: list, path_buffer: Optional[list], reached) -> None:
+    """Attaches breadcrumbs to drives already stored (this batch's new
+    ones included), carrying the rest over in `path_buffer` unless they're
+    too far behind `reached` — the latest start time imported so far — to
+    still belong to a drive later in the file."""
+    unmatched = attach_path_points(points)
+    if path_buffer is not None:
+        if reached is not None:
+            horizon = reached - PATH_CARRY_WINDOW
+            unmatched = [p for p in unmatched if p[0] >= horizon]
+        path_buffer[:] = unmatched
+
+
+def _record_imported(fingerprints: list) -> None:
+    ImportedSegment.objects.bulk_create(
+        [ImportedSegment(fingerprint=fp) for fp in fingerprints],
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+
+
+# Raw segments are parsed and imported this many at a time, so a
+# multi-year export never has more than one batch (and its date window of
+# existing rows) in memory at once.
+IMPORT_BATCH_SIZE = 2000
+
+# Exports at least this big have their batches parsed and fingerprinted in
+# a process pool, one worker per CPU, while the import writes the previous
+# batch. Below it, starting the pool costs more than it saves.
+PARALLEL_IMPORT_MIN_BYTES = 32 * 1024 * 1024
+
+
+def import_workers(size: int) -> int:
+    """How many parser processes an import of a `size`-byte export uses."""
+    return (os.cpu_count() or 1) if size >= PARALLEL_IMPORT_MIN_BYTES else 1
+
+
+def import_timeline_file(fileobj, progress=None, workers: int = 1) -> tuple:
+    """Streams an export through the parser and importer batch by batch.
+    Each batch commits on its own, so progress is visible to other
+    connections while a long import runs; a file that turns out to be
+    malformed part-way through keeps the batches before the error, which
+    is harmless since re-importing is idempotent. With `workers` > 1 the
+    batches are parsed in that many processes (see import_workers).
+    `progress`, if given, is called after every batch with the running
+    (parsed_count, created_count, updated_count).
+    Returns the final (parsed_count, created_count, updated_count)."""
+    parsed_count = created_count = updated_count = 0
+    path_buffer = []
+    batches = iter_timeline_batches(fileobj, IMPORT_BATCH_SIZE, paths=True, workers=workers)
+    for batch, fingerprints in batches:
+        if not batch:
+            continue
+        created, updated = _import_parsed_entries(batch, path_buffer, fingerprints)
+        parsed_count += sum(1 for e in batch if e["entry_type"] != "path")
+        created_count += created
+        updated_count += updated
+        if progress is not None:
+            progress(parsed_count, created_count, updated_count)
+    return parsed_count, created_count, updated_count
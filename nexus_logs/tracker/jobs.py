@@ -0,0 +1,77 @@
+"""
+Background runner for ImportJob rows.
+
+Imports run on a single in-process worker thread — no broker or separate
+service to deploy. One thread per process is deliberate: SQLite only allows
+one writer at a time, so running imports side by side would just make them
+queue on the database lock instead. Jobs left queued or half-run by a
+restarted container can be finished with `manage.py run_import_jobs`.
+"""
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+
+from .importer import import_timeline_file, import_workers
+from .models import ImportJob
+from .parsers import TimelineParseError
+
+logger = logging.getLogger(__name__)
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="nexus-import")
+
+
+def enqueue_import(job: ImportJob) -> None:
+    """Hands `job` to the worker thread once the row creating it commits."""
+    job_id = job.pk
+    transaction.on_commit(lambda: _executor.submit(_run_in_thread, job_id))
+
+
+def _run_in_thread(job_id: int) -> None:
+    close_old_connections()
+    try:
+        run_import_job(job_id)
+    finally:
+        # worker threads get their own DB connection; don't leak it
+        connection.close()
+
+
+def run_import_job(job_id: int) -> ImportJob:
+    """Runs one import to completion, recording progress and the outcome
+    on the ImportJob row. Never raises for a bad file — the error is saved
+    for the dashboard to show instead."""
+    job = ImportJob.objects.get(pk=job_id)
+    job.status = ImportJob.RUNNING
+    job.started_at = timezone.now()
+    job.save(update_fields=["status", "started_at"])
+
+    def report(parsed, created, refined):
+        job.segments_parsed = parsed
+        job.created_count = created
+        job.refined_count = refined
+        job.skipped_count = parsed - created - refined
+        job.save(
+            update_fields=["segments_parsed", "created_count", "refined_count", "skipped_count"]
+        )
+
+    try:
+        workers = import_workers(job.upload.size)
+        with job.upload.open("rb") as fileobj:
+            report(*import_timeline_file(fileobj, progress=report, workers=workers))
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        job.status, job.error = ImportJob.FAILED, "That file isn't valid JSON."
+    except TimelineParseError as exc:
+        job.status, job.error = ImportJob.FAILED, str(exc)
+    except Exception:  # keep the worker alive; the traceback goes to the log
+        logger.exception("Import job %s failed", job_id)
+        job.status, job.error = ImportJob.FAILED, "The import failed unexpectedly — see the server log."
+    else:
+        job.status = ImportJob.DONE
+        # the export can be hundreds of MB and is never needed again
+        job.upload.delete(save=False)
+
+    job.finished_at = timezone.now()
+    job.save()
+    return job
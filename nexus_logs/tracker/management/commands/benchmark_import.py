@@ -0,0 +1,213 @@
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+import timeit
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from tracker import parsers
+from tracker.importer import import_timeline_file
+from tracker.synthetic import SCHEMAS, iter_synthetic_segments, write_synthetic_export
+
+
+class _QueryCounter:
+    """Counts queries through a DB execute wrapper — unlike
+    CaptureQueriesContext it doesn't keep every statement's SQL around,
+    which at a million segments would skew the memory numbers."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def _reset_peak_rss() -> None:
+    # Linux lets a process reset its own high-water mark, so each scenario
+    # reports its own peak rather than the largest one so far.
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def _peak_rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # getrusage is a lifetime peak (kB on Linux, bytes on macOS)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the Timeline parser and import pipeline against synthetic "
+        "exports (see tracker/synthetic.py), reporting segments/s, peak RSS "
+        "and query counts for a cold import, an identical re-import and a "
+        "re-import of a changed re-export. Runs against a throwaway database "
+        "— your own data is never touched."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes", type=int, nargs="+", default=[10_000, 100_000],
+            help="Export sizes to benchmark, in segments (default: 10000 100000; "
+                 "add 1000000 for the full-size run).",
+        )
+        parser.add_argument(
+            "--schema", choices=[*SCHEMAS, "both"], default="both",
+            help="Which export shape to generate (default: both).",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--workers", type=int, default=0,
+            help="Also time parse_timeline's and the importer's multi-process "
+                 "modes with this many workers against their sequential modes.",
+        )
+        parser.add_argument(
+            "--json", action="store_true",
+            help="Print one JSON object per result instead of a table, for "
+                 "comparing runs.",
+        )
+
+    def handle(self, *args, **options):
+        if any(size <= 0 for size in options["sizes"]):
+            raise CommandError("--sizes must be positive.")
+        schemas = SCHEMAS if options["schema"] == "both" else [options["schema"]]
+        self.as_json = options["json"]
+        # DEBUG keeps a log of recent queries on the connection; the
+        # benchmark should measure what production (DEBUG off) does.
+        settings.DEBUG = False
+
+        self._bench_field_parsers(options["seed"])
+        self._report_header()
+        with tempfile.TemporaryDirectory(prefix="nexus-bench-") as workdir:
+            old_name = self._create_scratch_db(os.path.join(workdir, "bench.sqlite3"))
+            try:
+                for schema in schemas:
+                    for size in options["sizes"]:
+                        self._bench_export(workdir, schema, size, options["seed"], options["workers"])
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def _create_scratch_db(self, path: str) -> str:
+        """Points the default connection at a fresh, migrated SQLite file,
+        the same way the test runner does. Returns the real DB name to
+        restore afterwards."""
+        old_name = connection.settings_dict["NAME"]
+        connection.settings_dict.setdefault("TEST", {})["NAME"] = path
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        return old_name
+
+    def _bench_field_parsers(self, seed: int) -> None:
+        """Per-call cost of the scalar parsers every segment goes through."""
+        samples = list(iter_synthetic_segments(5_000, seed=seed))
+        timestamps = [s["startTime"] for s in samples] + [s["endTime"] for s in samples]
+        geos = [
+            s["visit"]["topCandidate"]["placeLocation"] if "visit" in s else s["activity"]["start"]
+            for s in samples if "visit" in s or "activity" in s
+        ]
+        for name, func, values in [
+            ("_parse_time", parsers._parse_time, timestamps),
+            ("_parse_geo", parsers._parse_geo, geos),
+        ]:
+            elapsed = min(timeit.repeat(lambda: [func(v) for v in values], number=1, repeat=5))
+            self._report(
+                {"scenario": name, "calls": len(values), "calls_per_s": round(len(values) / elapsed)}
+            )
+
+    def _bench_export(self, workdir: str, schema: str, size: int, seed: int, workers: int) -> None:
+        path = os.path.join(workdir, f"{schema}-{size}.json")
+        revised_path = os.path.join(workdir, f"{schema}-{size}-r1.json")
+        with open(path, "w", encoding="utf-8") as f:
+            write_synthetic_export(f, size, schema, seed)
+        with open(revised_path, "w", encoding="utf-8") as f:
+            write_synthetic_export(f, size, schema, seed, revision=1)
+
+        def parse_only(fp):
+            return sum(1 for _ in parsers.iter_timeline(fp)), 0, 0
+
+        def parse_loaded(workers):
+            # parse_timeline takes already-loaded JSON, so the load is timed too
+            return lambda fp: (len(parsers.parse_timeline(json.load(fp), workers=workers)), 0, 0)
+
+        scenarios = [("parse", path, parse_only)]
+        if workers > 1:
+            scenarios += [
+                ("parse_timeline", path, parse_loaded(1)),
+                (f"parse_timeline x{workers}", path, parse_loaded(workers)),
+            ]
+        scenarios += [
+            ("cold import", path, import_timeline_file),
+            ("re-import", path, import_timeline_file),
+            ("re-export import", revised_path, import_timeline_file),
+        ]
+        if workers > 1:
+            scenarios.append(
+                (f"cold import x{workers}", path, lambda fp: import_timeline_file(fp, workers=workers))
+            )
+        try:
+            for scenario, source, run in scenarios:
+                if scenario.startswith("cold import"):
+                    call_command("flush", interactive=False, verbosity=0)
+                self._run_scenario(schema, size, scenario, source, run)
+        finally:
+            os.remove(path)
+            os.remove(revised_path)
+
+    def _run_scenario(self, schema, size, scenario, source, run) -> None:
+        counter = _QueryCounter()
+        _reset_peak_rss()
+        with open(source, "rb") as fp, connection.execute_wrapper(counter):
+            started = time.perf_counter()
+            parsed, created, refined = run(fp)
+            elapsed = max(time.perf_counter() - started, 1e-9)
+        self._report(
+            {
+                "scenario": scenario,
+                "schema": schema,
+                "segments": size,
+                "entries": parsed,
+                "created": created,
+                "refined": refined,
+                "seconds": round(elapsed, 2),
+                "segments_per_s": round(size / elapsed),
+                "queries": counter.count,
+                "peak_rss_mb": round(_peak_rss_mb(), 1),
+            }
+        )
+
+    _COLUMNS = [
+        ("scenario", 17), ("schema", 9), ("segments", 9), ("entries", 8), ("created", 8),
+        ("refined", 8), ("seconds", 8), ("segments_per_s", 15), ("queries", 8), ("peak_rss_mb", 12),
+    ]
+
+    def _report_header(self) -> None:
+        if not self.as_json:
+            self.stdout.write(" ".join(name.rjust(width) for name, width in self._COLUMNS))
+
+    def _report(self, result: dict) -> None:
+        if self.as_json:
+            self.stdout.write(json.dumps(result))
+        elif "calls" in result:
+            self.stdout.write(
+                f"{result['scenario'].rjust(17)} {result['calls_per_s']:>,} calls/s "
+                f"over {result['calls']:,} calls"
+            )
+        else:
+            self.stdout.write(
+                " ".join(str(result[name]).rjust(width) for name, width in self._COLUMNS)
+            )
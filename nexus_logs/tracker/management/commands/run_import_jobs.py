@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from tracker.jobs import run_import_job
+from tracker.models import ImportJob
+
+
+class Command(BaseCommand):
+    help = (
+        "Run queued Timeline import jobs in the foreground — e.g. ones left "
+        "behind when the web container restarted mid-import. Re-running a "
+        "half-finished job is safe, since re-importing is idempotent."
+    )
+
+    def handle(self, *args, **options):
+        job_ids = list(
+            ImportJob.objects.filter(status__in=[ImportJob.PENDING, ImportJob.RUNNING])
+            .order_by("created_at")
+            .values_list("pk", flat=True)
+        )
+        if not job_ids:
+            self.stdout.write("No queued import jobs.")
+            return
+        for job_id in job_ids:
+            job = run_import_job(job_id)
+            self.stdout.write(
+                f"{job}: {job.segments_parsed} parsed, {job.created_count} new, "
+                f"{job.refined_count} refined, {job.skipped_count} unchanged"
+                + (f" — {job.error}" if job.error else "")
+            )
@@ -0,0 +1,56 @@
+# Generated by Django 4.2.16 on 2026-10-17 19:04
+
+from django.db import migrations, models
+
+
+def backfill_day_summaries(apps, schema_editor):
+    # Mirrors DaySummary.refresh_all() — historical models don't carry
+    # custom methods, so the per-day sums are repeated here.
+    AppConfig = apps.get_model("tracker", "AppConfig")
+    DaySummary = apps.get_model("tracker", "DaySummary")
+    TimelineEntry = apps.get_model("tracker", "TimelineEntry")
+
+    config = AppConfig.objects.filter(pk=1).first()
+    home = config.home_address.lower() if config else ""
+    totals = {}
+    entries = TimelineEntry.objects.only(
+        "entry_type", "location_name", "address", "distance_km",
+        "start_time", "end_time", "visit_date",
+    )
+    for entry in entries.iterator():
+        row = totals.setdefault(entry.visit_date, DaySummary(date=entry.visit_date))
+        if entry.entry_type == "drive":
+            row.drive_minutes += round((entry.end_time - entry.start_time).total_seconds() / 60)
+            row.drive_km += entry.distance_km or 0
+        else:
+            row.visit_count += 1
+            if home and (home in entry.location_name.lower() or home in entry.address.lower()):
+                row.home_visit_count += 1
+    DaySummary.objects.bulk_create(totals.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0003_importjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DaySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('visit_count', models.PositiveIntegerField(default=0)),
+                ('home_visit_count', models.PositiveIntegerField(default=0)),
+                ('drive_minutes', models.PositiveIntegerField(default=0)),
+                ('drive_km', models.FloatField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Day summaries',
+                'ordering': ['date'],
+            },
+        ),
+        migrations.RunPython(backfill_day_summaries, migrations.RunPython.noop),
+    ]
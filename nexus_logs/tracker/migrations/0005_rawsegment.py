@@ -0,0 +1,57 @@
+# Generated by Django 4.2.16 on 2026-10-17 19:07
+
+import json
+import zlib
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def _pack(segment) -> bytes:
+    # same encoding as RawSegment.pack()
+    return zlib.compress(json.dumps(segment, separators=(",", ":")).encode("utf-8"))
+
+
+def move_raw_data_to_side_table(apps, schema_editor):
+    RawSegment = apps.get_model("tracker", "RawSegment")
+    TimelineEntry = apps.get_model("tracker", "TimelineEntry")
+
+    batch = []
+    rows = TimelineEntry.objects.filter(raw_data__isnull=False).values_list("pk", "raw_data")
+    for pk, raw_data in rows.iterator(chunk_size=500):
+        batch.append(RawSegment(entry_id=pk, compressed=_pack(raw_data)))
+        if len(batch) >= 500:
+            RawSegment.objects.bulk_create(batch)
+            batch = []
+    RawSegment.objects.bulk_create(batch)
+
+
+def restore_raw_data(apps, schema_editor):
+    RawSegment = apps.get_model("tracker", "RawSegment")
+    TimelineEntry = apps.get_model("tracker", "TimelineEntry")
+
+    for raw in RawSegment.objects.iterator(chunk_size=500):
+        data = json.loads(zlib.decompress(bytes(raw.compressed)))
+        TimelineEntry.objects.filter(pk=raw.entry_id).update(raw_data=data)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0004_daysummary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RawSegment',
+            fields=[
+                ('entry', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='raw_segment', serialize=False, to='tracker.timelineentry')),
+                ('compressed', models.BinaryField()),
+            ],
+        ),
+        migrations.RunPython(move_raw_data_to_side_table, restore_raw_data),
+        migrations.RemoveField(
+            model_name='timelineentry',
+            name='raw_data',
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 4.2.16 on 2026-10-17 19:09
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Q
+
+
+def tag_home_visits(apps, schema_editor):
+    # No fences exist yet, so is_home starts out as exactly what the old
+    # dashboard filter matched: visits whose name/address contain the
+    # configured home address.
+    AppConfig = apps.get_model("tracker", "AppConfig")
+    TimelineEntry = apps.get_model("tracker", "TimelineEntry")
+
+    config = AppConfig.objects.filter(pk=1).first()
+    if config and config.home_address:
+        TimelineEntry.objects.filter(entry_type="visit").filter(
+            Q(location_name__icontains=config.home_address)
+            | Q(address__icontains=config.home_address)
+        ).update(is_home=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0005_rawsegment'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GeoFence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('shape', models.CharField(choices=[('circle', 'Circle'), ('polygon', 'Polygon')], default='circle', max_length=10)),
+                ('latitude', models.FloatField(blank=True, null=True)),
+                ('longitude', models.FloatField(blank=True, null=True)),
+                ('radius_m', models.PositiveIntegerField(default=150, help_text='Radius in metres (circles only).')),
+                ('polygon', models.JSONField(blank=True, help_text='Polygons only: [[lat, lng], [lat, lng], ...]', null=True)),
+                ('is_home', models.BooleanField(default=False, help_text='Visits inside this area are hidden from the dashboard along with other home visits.')),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='timelineentry',
+            name='is_home',
+            field=models.BooleanField(db_index=True, default=False),
+        ),
+        migrations.AddField(
+            model_name='timelineentry',
+            name='geofence',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='entries', to='tracker.geofence'),
+        ),
+        migrations.RunPython(tag_home_visits, migrations.RunPython.noop),
+    ]
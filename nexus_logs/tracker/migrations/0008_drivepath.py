@@ -0,0 +1,22 @@
+# Generated by Django 4.2.16 on 2026-10-17 19:19
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0007_knownplace'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DrivePath',
+            fields=[
+                ('entry', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='path', serialize=False, to='tracker.timelineentry')),
+                ('point_count', models.PositiveIntegerField(default=0)),
+                ('compressed', models.BinaryField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.16 on 2026-10-17 19:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0008_drivepath'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(max_length=10)),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('rows', models.JSONField(default=list)),
+                ('created_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='reportcache',
+            constraint=models.UniqueConstraint(fields=('period', 'start_date', 'end_date'), name='unique_report_range'),
+        ),
+    ]
@@ -0,0 +1,112 @@
+# Generated by Django 4.2.16 on 2026-10-17 19:28
+
+import re
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# A frozen copy of tracker.parts' parser as it was when this migration was
+# written, so replaying it gives the same parts whatever the app's parser
+# does later (0012 applies the plural folding added since).
+_UNITS = {
+    "mm": ("m", 0.001),
+    "cm": ("m", 0.01),
+    "m": ("m", 1),
+    "ml": ("l", 0.001),
+    "l": ("l", 1),
+    "g": ("kg", 0.001),
+    "kg": ("kg", 1),
+}
+_NUMBER = r"\d+(?:[.,]\d+)?"
+_LINE = re.compile(
+    rf"^(?:[x×]\s*(?P<prefixed>{_NUMBER})\s+"
+    rf"|(?P<count>{_NUMBER})(?:\s*[x×]\s+|(?P<unit>{'|'.join(_UNITS)})\s+|\s+))"
+    r"(?P<name>\S.*)$",
+    re.IGNORECASE,
+)
+
+
+def _part_key(name):
+    return " ".join(name.casefold().split())
+
+
+def _parse_parts(text):
+    parsed = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        quantity, unit, name = 1.0, "", line
+        match = _LINE.match(line)
+        if match:
+            number = match["prefixed"] or match["count"]
+            quantity = float(number.replace(",", "."))
+            name = match["name"].strip()
+            if match["unit"]:
+                unit, factor = _UNITS[match["unit"].lower()]
+                quantity = round(quantity * factor, 6)
+        parsed.append((line[:500], quantity, unit, name[:255], _part_key(name)[:255]))
+    return parsed
+
+
+def catalogue_existing_parts(apps, schema_editor):
+    # Every job logged before the catalogue existed gets its line items.
+    TimelineEntry = apps.get_model("tracker", "TimelineEntry")
+    Part = apps.get_model("tracker", "Part")
+    PartLineItem = apps.get_model("tracker", "PartLineItem")
+
+    parts = {}
+    items = []
+    for entry in TimelineEntry.objects.exclude(parts_used="").only("pk", "visit_date", "parts_used").iterator():
+        for line, quantity, unit, name, key in _parse_parts(entry.parts_used):
+            part = parts.get(key)
+            if part is None:
+                part = parts[key] = Part.objects.create(key=key, name=name)
+            part.use_count += 1
+            items.append(
+                PartLineItem(
+                    entry_id=entry.pk, part=part, line=line, quantity=quantity,
+                    unit=unit, visit_date=entry.visit_date,
+                )
+            )
+    PartLineItem.objects.bulk_create(items, batch_size=500)
+    Part.objects.bulk_update(parts.values(), ["use_count"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0009_reportcache'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Part',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('key', models.CharField(max_length=255, unique=True)),
+                ('use_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PartLineItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('line', models.CharField(help_text='The line as it was typed.', max_length=500)),
+                ('quantity', models.FloatField(default=1)),
+                ('unit', models.CharField(blank=True, max_length=10)),
+                ('visit_date', models.DateField()),
+                ('entry', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='part_items', to='tracker.timelineentry')),
+                ('part', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='line_items', to='tracker.part')),
+            ],
+            options={
+                'ordering': ['pk'],
+                'indexes': [models.Index(fields=['visit_date', 'part'], name='tracker_par_visit_d_b11a7a_idx')],
+            },
+        ),
+        migrations.RunPython(catalogue_existing_parts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,78 @@
+from django.db import migrations
+
+# An external-content FTS5 index over visits' free-text fields: it stores
+# only the index, reading the text itself back from tracker_timelineentry.
+# The triggers keep it in step with every write — ORM saves, bulk_create,
+# the importer's raw upserts and admin edits alike. Drives are left out;
+# the importer's refinements never touch the indexed columns, so they
+# don't fire the update triggers. See tracker.search.
+CREATE_SEARCH_INDEX = [
+    """
+    CREATE VIRTUAL TABLE tracker_entry_search USING fts5(
+        location_name, address, parts_used, comments,
+        content='tracker_timelineentry', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER tracker_entry_search_insert AFTER INSERT ON tracker_timelineentry
+    WHEN new.entry_type = 'visit' BEGIN
+        INSERT INTO tracker_entry_search (rowid, location_name, address, parts_used, comments)
+        VALUES (new.id, new.location_name, new.address, new.parts_used, new.comments);
+    END
+    """,
+    """
+    CREATE TRIGGER tracker_entry_search_delete AFTER DELETE ON tracker_timelineentry
+    WHEN old.entry_type = 'visit' BEGIN
+        INSERT INTO tracker_entry_search (tracker_entry_search, rowid, location_name, address, parts_used, comments)
+        VALUES ('delete', old.id, old.location_name, old.address, old.parts_used, old.comments);
+    END
+    """,
+    """
+    CREATE TRIGGER tracker_entry_search_update
+    AFTER UPDATE OF entry_type, location_name, address, parts_used, comments ON tracker_timelineentry
+    BEGIN
+        INSERT INTO tracker_entry_search (tracker_entry_search, rowid, location_name, address, parts_used, comments)
+        SELECT 'delete', old.id, old.location_name, old.address, old.parts_used, old.comments
+        WHERE old.entry_type = 'visit';
+        INSERT INTO tracker_entry_search (rowid, location_name, address, parts_used, comments)
+        SELECT new.id, new.location_name, new.address, new.parts_used, new.comments
+        WHERE new.entry_type = 'visit';
+    END
+    """,
+    """
+    INSERT INTO tracker_entry_search (rowid, location_name, address, parts_used, comments)
+    SELECT id, location_name, address, parts_used, comments
+    FROM tracker_timelineentry WHERE entry_type = 'visit'
+    """,
+]
+
+DROP_SEARCH_INDEX = [
+    "DROP TRIGGER IF EXISTS tracker_entry_search_insert",
+    "DROP TRIGGER IF EXISTS tracker_entry_search_delete",
+    "DROP TRIGGER IF EXISTS tracker_entry_search_update",
+    "DROP TABLE IF EXISTS tracker_entry_search",
+]
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        # FTS5 is SQLite-only; other databases fall back to a plain
+        # icontains search (tracker.search)
+        if schema_editor.connection.vendor != "sqlite":
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0010_parts'),
+    ]
+
+    operations = [
+        migrations.RunPython(_run(CREATE_SEARCH_INDEX), _run(DROP_SEARCH_INDEX)),
+    ]
@@ -0,0 +1,52 @@
+from django.db import migrations
+
+# A frozen copy of tracker.parts.part_key as of this migration.
+_PLURAL_ENDINGS = (("sses", "ss"), ("ches", "ch"), ("shes", "sh"), ("xes", "x"), ("s", ""))
+
+
+def _singular(word):
+    if len(word) > 3 and word.isalpha() and not word.endswith(("ss", "us", "is")):
+        for plural, singular in _PLURAL_ENDINGS:
+            if word.endswith(plural):
+                return word[: -len(plural)] + singular
+    return word
+
+
+def _part_key(name):
+    words = name.casefold().split()
+    if words:
+        words[-1] = _singular(words[-1])
+    return " ".join(words)
+
+
+def fold_part_plurals(apps, schema_editor):
+    # Parts catalogued before part_key folded plurals: "glands" and "gland"
+    # become one part. The one already holding the new key, or else the
+    # first logged, keeps its name and takes the others' line items.
+    Part = apps.get_model("tracker", "Part")
+    PartLineItem = apps.get_model("tracker", "PartLineItem")
+
+    groups = {}
+    for part in Part.objects.order_by("pk"):
+        groups.setdefault(_part_key(part.name), []).append(part)
+    for key, parts in groups.items():
+        keeper = next((part for part in parts if part.key == key), parts[0])
+        merged = [part.pk for part in parts if part.pk != keeper.pk]
+        if merged:
+            PartLineItem.objects.filter(part_id__in=merged).update(part=keeper)
+            Part.objects.filter(pk__in=merged).delete()
+            keeper.use_count = keeper.line_items.count()
+        if merged or keeper.key != key:
+            keeper.key = key
+            keeper.save(update_fields=["key", "use_count"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0011_entry_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(fold_part_plurals, migrations.RunPython.noop),
+    ]
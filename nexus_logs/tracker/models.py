@@ -1,5 +1,10 @@
+import array
+import json
+import sys
+import zlib
 from typing import Optional
 
+from django.core.exceptions import ValidationError
 from django.db import models
 
 
@@ -44,6 +49,13 @@ class TimelineEntry(models.Model):
     # (see tracker.parsers and the re-import logic in tracker.views).
     place_id = models.CharField(max_length=255, null=True, blank=True, db_index=True)
 
+    # Precomputed by tracker.geofence whenever a visit is imported, added or
+    # edited, so the dashboard's home filter is a plain indexed lookup.
+    geofence = models.ForeignKey(
+        "GeoFence", null=True, blank=True, on_delete=models.SET_NULL, related_name="entries"
+    )
+    is_home = models.BooleanField(default=False, db_index=True)
+
     # drive fields
     distance_km = models.FloatField(null=True, blank=True)
 
@@ -58,8 +70,8 @@ class TimelineEntry(models.Model):
     parts_used = models.TextField(blank=True)
     comments = models.TextField(blank=True)
 
-    # original parsed segment, kept for troubleshooting bad imports
-    raw_data = models.JSONField(null=True, blank=True)
+    # The original parsed segment, kept for troubleshooting bad imports,
+    # lives in RawSegment (entry.raw_segment) so these rows stay small.
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -123,6 +135,389 @@ class TimelineEntry(models.Model):
         return self.location_name or self.address or "Unnamed location"
 
 
+class GeoFence(models.Model):
+    """
+    A named area — home, the depot, a regular customer's site — that
+    visits are matched against by their coordinates (see tracker.geofence).
+    Either a circle (centre + radius) or a polygon of [lat, lng] points.
+    Google visits usually carry only coordinates, which the home address
+    text filter can't see; a home fence catches them.
+    """
+
+    CIRCLE = "circle"
+    POLYGON = "polygon"
+    SHAPE_CHOICES = [
+        (CIRCLE, "Circle"),
+        (POLYGON, "Polygon"),
+    ]
+
+    name = models.CharField(max_length=255)
+    shape = models.CharField(max_length=10, choices=SHAPE_CHOICES, default=CIRCLE)
+    # circle fields
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    radius_m = models.PositiveIntegerField(default=150, help_text="Radius in metres (circles only).")
+    # polygon field
+    polygon = models.JSONField(
+        null=True, blank=True, help_text='Polygons only: [[lat, lng], [lat, lng], ...]'
+    )
+    is_home = models.BooleanField(
+        default=False,
+        help_text="Visits inside this area are hidden from the dashboard "
+        "along with other home visits.",
+    )
+
+    class Meta:
+        ordering = ["name"]
+
+    def __str__(self) -> str:
+        return self.name
+
+    def clean(self):
+        if self.shape == self.CIRCLE and (self.latitude is None or self.longitude is None):
+            raise ValidationError("A circle needs a centre latitude and longitude.")
+        if self.shape == self.POLYGON:
+            points = self.polygon
+            if (
+                not isinstance(points, list)
+                or len(points) < 3
+                or not all(isinstance(p, (list, tuple)) and len(p) == 2 for p in points)
+            ):
+                raise ValidationError("A polygon needs at least three [lat, lng] points.")
+
+
+class KnownPlace(models.Model):
+    """
+    The last name/address the user typed for a place, so repeat visits
+    don't have to be named by hand every time (Timeline exports never
+    carry names). Keyed by Google's place_id where there is one, with the
+    coordinates as a proximity fallback — see tracker.places.
+    """
+
+    place_id = models.CharField(max_length=255, null=True, blank=True, unique=True)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    location_name = models.CharField(max_length=255, blank=True)
+    address = models.CharField(max_length=500, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["location_name"]
+
+    def __str__(self) -> str:
+        return self.location_name or self.address or self.place_id or f"Place {self.pk}"
+
+
+class Part(models.Model):
+    """
+    One distinct part ever logged in a job's parts_used, and the index the
+    parts autocomplete searches. `key` is the case/space-folded, singular
+    name, so "4x2 Plug", "4x2  plug" and "4x2 plugs" are the same part;
+    `name` keeps the spelling it was first logged with. See tracker.parts.
+    """
+
+    name = models.CharField(max_length=255)
+    key = models.CharField(max_length=255, unique=True)
+    # how many line items reference this part, kept up to date by
+    # tracker.parts so the autocomplete can rank without a GROUP BY
+    use_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ["name"]
+
+    def __str__(self) -> str:
+        return self.name
+
+
+class PartLineItem(models.Model):
+    """
+    One line of a visit's parts_used, split into quantity, unit and part so
+    usage can be totalled with a GROUP BY instead of re-parsing free text.
+    The parts_used text stays the source of truth; these rows are rebuilt
+    from it whenever a job is saved (tracker.parts.sync_part_items).
+    """
+
+    entry = models.ForeignKey(TimelineEntry, on_delete=models.CASCADE, related_name="part_items")
+    part = models.ForeignKey(Part, on_delete=models.CASCADE, related_name="line_items")
+    line = models.CharField(max_length=500, help_text="The line as it was typed.")
+    quantity = models.FloatField(default=1)
+    unit = models.CharField(max_length=10, blank=True)
+    # Denormalised from the entry, like TimelineEntry.visit_date, so usage
+    # reports filter by date without a join.
+    visit_date = models.DateField()
+
+    class Meta:
+        ordering = ["pk"]
+        indexes = [models.Index(fields=["visit_date", "part"])]
+
+    def __str__(self) -> str:
+        return self.line
+
+
+class RawSegment(models.Model):
+    """
+    The original export segment behind a Google-imported TimelineEntry,
+    stored as zlib-compressed JSON. It's only ever needed for
+    troubleshooting a bad import, so it's kept out of the main table,
+    where every dashboard, export and import range scan would otherwise
+    drag several KB of JSON per row through the ORM. Read it on demand via
+    `entry.raw_segment.data`.
+    """
+
+    entry = models.OneToOneField(
+        TimelineEntry, on_delete=models.CASCADE, primary_key=True, related_name="raw_segment"
+    )
+    compressed = models.BinaryField()
+
+    def __str__(self) -> str:
+        return f"Raw segment for entry {self.entry_id}"
+
+    @staticmethod
+    def pack(segment) -> bytes:
+        return zlib.compress(json.dumps(segment, separators=(",", ":")).encode("utf-8"))
+
+    @property
+    def data(self):
+        return json.loads(zlib.decompress(bytes(self.compressed)))
+
+
+class DrivePath(models.Model):
+    """
+    The breadcrumb route of one Google-imported drive, rebuilt from the
+    export's timelinePath points (see tracker.paths) so a drive's mileage
+    can be checked against where it actually went.
+
+    Points are packed into a single blob per drive instead of a row each —
+    a few years of driving is millions of points. Each point is three
+    int32s (seconds since the drive started, latitude and longitude in
+    1e-7 degrees), stored as deltas from the previous point, so
+    consecutive points are mostly small numbers that zlib shrinks well.
+    """
+
+    entry = models.OneToOneField(
+        TimelineEntry, on_delete=models.CASCADE, primary_key=True, related_name="path"
+    )
+    point_count = models.PositiveIntegerField(default=0)
+    compressed = models.BinaryField()
+
+    def __str__(self) -> str:
+        return f"Route for entry {self.entry_id} ({self.point_count} points)"
+
+    @staticmethod
+    def pack(points) -> bytes:
+        """[(seconds, lat_e7, lng_e7), ...] in time order -> blob."""
+        values = array.array("i")
+        prev_t = prev_lat = prev_lng = 0
+        for t, lat, lng in points:
+            values.extend((t - prev_t, lat - prev_lat, lng - prev_lng))
+            prev_t, prev_lat, prev_lng = t, lat, lng
+        if sys.byteorder == "big":
+            values.byteswap()  # always stored little-endian
+        return zlib.compress(values.tobytes())
+
+    @property
+    def points(self) -> list:
+        """The stored [(seconds, lat_e7, lng_e7), ...], in time order."""
+        values = array.array("i")
+        values.frombytes(zlib.decompress(bytes(self.compressed)))
+        if sys.byteorder == "big":
+            values.byteswap()
+        points = []
+        t = lat = lng = 0
+        for i in range(0, len(values), 3):
+            t += values[i]
+            lat += values[i + 1]
+            lng += values[i + 2]
+            points.append((t, lat, lng))
+        return points
+
+
+class DaySummary(models.Model):
+    """
+    Pre-aggregated per-day totals behind the dashboard's day headers, so a
+    month- or year-wide range reads one small row per day instead of
+    re-summing every TimelineEntry in Python on each page load.
+
+    Kept up to date explicitly by whatever changes entries (the importer,
+    the edit/manual-entry/delete views and the admin) via
+    DaySummary.refresh(dates).
+    home_visit_count follows TimelineEntry.is_home, so every row is rebuilt
+    when the home address or the geo-fences change (tracker.geofence).
+    """
+
+    date = models.DateField(unique=True)
+    visit_count = models.PositiveIntegerField(default=0)
+    # visits tagged is_home, subtracted from visit_count when the
+    # dashboard hides home visits
+    home_visit_count = models.PositiveIntegerField(default=0)
+    drive_minutes = models.PositiveIntegerField(default=0)
+    drive_km = models.FloatField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["date"]
+        verbose_name_plural = "Day summaries"
+
+    def __str__(self) -> str:
+        return f"{self.date}: {self.visit_count} visits, {self.drive_km:.1f} km"
+
+    def visible_visit_count(self, hide_home: bool) -> int:
+        return self.visit_count - self.home_visit_count if hide_home else self.visit_count
+
+    @classmethod
+    def refresh(cls, dates) -> None:
+        """Recomputes the summaries for `dates` from their TimelineEntry
+        rows, dropping any day that no longer has entries at all."""
+        dates = set(dates)
+        if not dates:
+            return
+        cls._rebuild(TimelineEntry.objects.filter(visit_date__in=dates), dates)
+        ReportCache.invalidate(dates)
+
+    @classmethod
+    def refresh_all(cls) -> None:
+        cls._rebuild(TimelineEntry.objects.all(), None)
+        ReportCache.objects.all().delete()
+
+    @classmethod
+    def _rebuild(cls, entries, dates) -> None:
+        totals = {}
+        for entry in entries.only(
+            "entry_type", "is_home", "distance_km", "start_time", "end_time", "visit_date",
+        ):
+            row = totals.setdefault(entry.visit_date, cls(date=entry.visit_date))
+            if entry.entry_type == TimelineEntry.DRIVE:
+                row.drive_minutes += entry.duration_minutes or 0
+                row.drive_km += entry.distance_km or 0
+            else:
+                row.visit_count += 1
+                if entry.is_home:
+                    row.home_visit_count += 1
+
+        stale = cls.objects.exclude(date__in=totals.keys())
+        if dates is not None:
+            stale = stale.filter(date__in=dates)
+        stale.delete()
+        cls.objects.bulk_create(
+            totals.values(),
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=["date"],
+            update_fields=["visit_count", "home_visit_count", "drive_minutes", "drive_km", "updated_at"],
+        )
+
+
+class ReportCache(models.Model):
+    """
+    A computed invoicing report (tracker.reports) for one period size and
+    date range, so re-opening the same month-end report is one row read.
+    Cleared by DaySummary.refresh for any range overlapping changed days.
+    """
+
+    period = models.CharField(max_length=10)
+    start_date = models.DateField()
+    end_date = models.DateField()
+    rows = models.JSONField(default=list)
+    created_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["period", "start_date", "end_date"], name="unique_report_range"
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.period} report {self.start_date} – {self.end_date}"
+
+    @classmethod
+    def invalidate(cls, dates) -> None:
+        dates = set(dates)
+        if dates:
+            cls.objects.filter(start_date__lte=max(dates), end_date__gte=min(dates)).delete()
+
+
+class ImportedSegment(models.Model):
+    """
+    Ledger of every raw Timeline segment already imported, keyed by a hash
+    of the canonicalised segment (see tracker.parsers.segment_fingerprint).
+
+    Google only offers full-history exports, so every upload re-sends years
+    of segments that haven't changed since last time. Checking this ledger
+    lets the importer drop those before building, diffing or saving any
+    TimelineEntry, so a daily re-upload costs about as much as the new days.
+    A segment Google later refines (e.g. an extended end_time) hashes
+    differently and goes through the normal refine path.
+    """
+
+    fingerprint = models.CharField(max_length=64, unique=True)
+    imported_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self) -> str:
+        return self.fingerprint
+
+
+class ImportJob(models.Model):
+    """
+    One uploaded Timeline export waiting for, or going through, a
+    background import (see tracker.jobs). Big multi-year exports take
+    longer to import than a gunicorn worker will wait on a request, so the
+    upload view only saves the file and queues one of these; the dashboard
+    then polls its progress counters.
+    """
+
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (PENDING, "Queued"),
+        (RUNNING, "Importing"),
+        (DONE, "Finished"),
+        (FAILED, "Failed"),
+    ]
+
+    upload = models.FileField(upload_to="imports/")
+    original_name = models.CharField(max_length=255, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING, db_index=True)
+
+    # running totals, updated after every import batch
+    segments_parsed = models.PositiveIntegerField(default=0)
+    created_count = models.PositiveIntegerField(default=0)
+    refined_count = models.PositiveIntegerField(default=0)
+    skipped_count = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self) -> str:
+        return f"Import #{self.pk} ({self.get_status_display()})"
+
+    @property
+    def is_active(self) -> bool:
+        return self.status in (self.PENDING, self.RUNNING)
+
+    def progress(self) -> dict:
+        """JSON-ready snapshot for the dashboard's progress poller."""
+        return {
+            "id": self.pk,
+            "status": self.status,
+            "status_display": self.get_status_display(),
+            "active": self.is_active,
+            "file": self.original_name,
+            "parsed": self.segments_parsed,
+            "created": self.created_count,
+            "refined": self.refined_count,
+            "skipped": self.skipped_count,
+            "error": self.error,
+        }
+
+
 class AppConfig(models.Model):
     """
     Singleton settings row (requirement 5). Always accessed via
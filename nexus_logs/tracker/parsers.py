@@ -19,8 +19,9 @@ segment is one of three shapes:
   {"startTime": "...", "endTime": "...",
    "timelinePath": [{"point": "geo:...", "durationMinutesOffsetFromStartTime": "34"}]}
 
-`timelinePath` segments are raw breadcrumb points, not a visit or a drive,
-and are ignored.
+`timelinePath` segments are raw breadcrumb points, not a visit or a drive.
+They're left out of the parsed entries, but `iter_timeline(paths=True)`
+yields them separately so the importer can rebuild drive routes.
 
 Three things worth knowing:
   - Numbers (distanceMeters, probability) are encoded as *strings*, not
@@ -41,9 +42,24 @@ Three things worth knowing:
 Some older Google Takeout exports use a different, wrapped shape
 ("semanticSegments": [...], with "placeVisit"/"activitySegment" keys and
 numeric lat/lng E7 values). That shape is also supported as a fallback.
+
+Multi-year exports can run to hundreds of MB, so besides `parse_timeline`
+(which takes already-loaded JSON) there's `iter_timeline`, which reads the
+file incrementally and yields one parsed visit/drive at a time without ever
+holding the whole JSON tree in memory. `iter_timeline_batches` does the
+same a batch at a time for the importer, optionally parsing the batches in
+a process pool.
 """
-from datetime import datetime
-from typing import Any, Optional
+import codecs
+import collections
+import hashlib
+import heapq
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Iterator, Optional
 
 from dateutil import parser as dateutil_parser
 
@@ -69,9 +85,47 @@ def _first(*values):
     return None
 
 
+# Google writes every timestamp in one of a few fixed ISO-8601 shapes —
+# "2024-05-01T08:15:00.000+02:00" (on-device exports), "...Z" or
+# "...+00:00" with 0, 3 or 6 fractional digits — so those are split by
+# position and handed to the C-level datetime.fromisoformat, with the
+# handful of distinct UTC offsets in a file memoised as tzinfo objects.
+# Anything else (no offset, odd precision, a week date, ...) still goes
+# through dateutil's full ISO parser.
+_FAST_ISO_LENGTHS = frozenset([19, 23, 26])  # seconds, millis, micros
+_utc_offsets = {"Z": timezone.utc, "+00:00": timezone.utc, "-00:00": timezone.utc}
+
+
+def _utc_offset(suffix: str) -> timezone:
+    tz = _utc_offsets.get(suffix)
+    if tz is None:
+        hours, minutes = int(suffix[1:3]), int(suffix[4:6])
+        delta = timedelta(hours=hours, minutes=minutes)
+        tz = _utc_offsets[suffix] = timezone(-delta if suffix[0] == "-" else delta)
+    return tz
+
+
+def _parse_time_fast(value: str) -> Optional[datetime]:
+    if value[-1] == "Z":
+        local, suffix = value[:-1], "Z"
+    elif len(value) > 6 and value[-6] in "+-" and value[-3] == ":":
+        local, suffix = value[:-6], value[-6:]
+    else:
+        return None
+    if len(local) not in _FAST_ISO_LENGTHS or local[10] != "T":
+        return None
+    return datetime.fromisoformat(local).replace(tzinfo=_utc_offset(suffix))
+
+
 def _parse_time(value: Optional[str]) -> Optional[datetime]:
     if not value:
         return None
+    try:
+        parsed = _parse_time_fast(value)
+    except (ValueError, TypeError, IndexError):
+        parsed = None
+    if parsed is not None:
+        return parsed
     try:
         return dateutil_parser.isoparse(value)
     except (ValueError, TypeError):
@@ -89,15 +143,19 @@ def _parse_float(value) -> Optional[float]:
 
 def _parse_geo(value: Optional[str]):
     """'geo:-33.960123,18.470456' or '-33.96,18.47' -> (-33.96, 18.47)"""
-    if not value or "," not in value:
+    if not isinstance(value, str):
+        return None, None
+    lat_str, comma, lng_str = value.partition(",")
+    if not comma:
         return None, None
-    value = value.strip()
-    if value.startswith("geo:"):
-        value = value[4:]
+    # float() itself ignores surrounding whitespace, so only the prefix
+    # needs stripping
+    lat_str = lat_str.lstrip()
+    if lat_str.startswith("geo:"):
+        lat_str = lat_str[4:]
     try:
-        lat_str, lng_str = value.split(",", 1)
-        return float(lat_str.strip()), float(lng_str.strip())
-    except (ValueError, TypeError):
+        return float(lat_str), float(lng_str)
+    except ValueError:
         return None, None
 
 
@@ -188,13 +246,106 @@ def _parse_drive_segment(segment: dict) -> Optional[dict]:
     }
 
 
-def parse_timeline(data) -> list:
+def _parse_path_segment(segment: dict) -> Optional[dict]:
+    """A timelinePath segment -> {"entry_type": "path", "points": [(time,
+    lat, lng), ...]}. Each point's time is the segment start plus its
+    minute offset. These are periodic GPS breadcrumbs, not tied to any one
+    drive; tracker.paths matches them to drives by time."""
+    start = _parse_time(segment.get("startTime"))
+    if not start or not isinstance(segment["timelinePath"], list):
+        return None
+    points = []
+    for point in segment["timelinePath"]:
+        if not isinstance(point, dict):
+            continue
+        lat, lng = _parse_geo(point.get("point"))
+        offset = _parse_float(point.get("durationMinutesOffsetFromStartTime"))
+        if lat is not None and offset is not None:
+            points.append((start + timedelta(minutes=offset), lat, lng))
+    if not points:
+        return None
+    return {"entry_type": "path", "start_time": start, "points": points, "raw_data": segment}
+
+
+def segment_fingerprint(segment) -> str:
+    """Stable content hash of a raw segment, independent of key order and
+    whitespace in the export, so byte-for-byte repeats of a segment across
+    re-exports can be recognised without touching the database."""
+    canonical = json.dumps(segment, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+_NO_SEGMENTS_MESSAGE = (
+    "Couldn't find timeline segments in this file — expected either "
+    "a bare JSON array or an object with a 'semanticSegments' array. "
+    "Is this a Timeline.json / location-history.json export?"
+)
+
+
+def _parse_segment(segment) -> Optional[dict]:
+    """One raw segment -> a visit/drive dict, or None for timelinePath
+    breadcrumbs, nested sub-visits and anything unrecognised."""
+    if not isinstance(segment, dict):
+        return None
+    if "visit" in segment or "placeVisit" in segment:
+        return _parse_visit_segment(segment)
+    if "activity" in segment or "activitySegment" in segment:
+        return _parse_drive_segment(segment)
+    return None  # timelinePath or unrecognised segment
+
+
+def _start_time(entry: dict) -> datetime:
+    return entry["start_time"]
+
+
+# Below this many segments per worker, pickling chunks to and from the
+# pool costs more than parsing them in-process.
+PARALLEL_MIN_CHUNK = 5_000
+
+
+def _parse_chunk(offset: int, segments: list) -> list:
+    """Process-pool worker: parses one contiguous chunk of segments and
+    returns it sorted. Each entry comes back with the index of its segment
+    in place of `raw_data`, so the segments aren't pickled a second time
+    on the way back."""
+    entries = []
+    for i, segment in enumerate(segments, offset):
+        parsed = _parse_segment(segment)
+        if parsed:
+            parsed["raw_data"] = i
+            entries.append(parsed)
+    entries.sort(key=_start_time)
+    return entries
+
+
+def _parse_parallel(segments: list, workers: int) -> list:
+    """Parses contiguous chunks in a process pool, then k-way merges the
+    sorted chunks. Both the per-chunk sort and heapq.merge are stable (ties
+    keep chunk order), so the result is identical to sorting the whole
+    list in one go."""
+    chunk_size = max(PARALLEL_MIN_CHUNK, -(-len(segments) // (workers * 4)))
+    offsets = range(0, len(segments), chunk_size)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        chunks = list(
+            pool.map(_parse_chunk, offsets, (segments[o:o + chunk_size] for o in offsets))
+        )
+    for chunk in chunks:
+        for entry in chunk:
+            entry["raw_data"] = segments[entry["raw_data"]]
+    return list(heapq.merge(*chunks, key=_start_time))
+
+
+def parse_timeline(data, workers: int = 1) -> list:
     """
     Accepts either the bare array a real on-device export contains, or the
     older {"semanticSegments": [...]} wrapped shape. Returns a list of
     dicts (one per visit/drive; timelinePath breadcrumb segments are
-    skipped), each with keys matching TimelineEntry fields, ready for
-    `TimelineEntry.objects.create(**entry, source="google")`.
+    skipped), each with keys matching TimelineEntry fields plus
+    `raw_data`, the original segment (stored separately as a RawSegment).
+
+    With `workers` > 1, large exports are parsed in that many processes
+    (None means one per CPU); the result is exactly the same as parsing
+    sequentially.
     """
     if isinstance(data, list):
         segments = data
@@ -204,24 +355,235 @@ def parse_timeline(data) -> list:
         segments = None
 
     if segments is None:
-        raise TimelineParseError(
-            "Couldn't find timeline segments in this file — expected either "
-            "a bare JSON array or an object with a 'semanticSegments' array. "
-            "Is this a Timeline.json / location-history.json export?"
-        )
+        raise TimelineParseError(_NO_SEGMENTS_MESSAGE)
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers > 1 and isinstance(segments, list) and len(segments) >= 2 * PARALLEL_MIN_CHUNK:
+        return _parse_parallel(segments, workers)
 
     entries = []
     for segment in segments:
-        if not isinstance(segment, dict):
-            continue
-        if "visit" in segment or "placeVisit" in segment:
-            parsed = _parse_visit_segment(segment)
-        elif "activity" in segment or "activitySegment" in segment:
-            parsed = _parse_drive_segment(segment)
-        else:
-            parsed = None  # timelinePath or unrecognised segment
+        parsed = _parse_segment(segment)
         if parsed:
             entries.append(parsed)
 
-    entries.sort(key=lambda e: e["start_time"])
+    entries.sort(key=_start_time)
     return entries
+
+
+# ---------------------------------------------------------------------------
+# Streaming mode
+# ---------------------------------------------------------------------------
+
+_JSON_WHITESPACE = " \t\n\r"
+_JSON_DELIMITERS = frozenset(_JSON_WHITESPACE + ",]}")
+_json_decoder = json.JSONDecoder()
+
+
+class _JsonStream:
+    """
+    Just enough of an incremental JSON reader to walk the *outer* structure
+    of a Timeline export (the top-level array, or the top-level object that
+    holds "semanticSegments") while handing each segment to the stdlib
+    decoder on its own. Only the current segment plus one read-chunk of
+    text is ever buffered.
+    """
+
+    def __init__(self, fp, chunk_size: int):
+        self._fp = fp
+        self._chunk_size = chunk_size
+        self._decoder = None  # set on the first bytes chunk
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        """Append more text to the buffer; False once the file is exhausted.
+        The read size grows with whatever is still unconsumed, so a single
+        oversized value costs a linear number of re-decodes, not quadratic."""
+        if self._eof:
+            return False
+        remaining = self._buf[self._pos:]
+        while True:
+            raw = self._fp.read(max(self._chunk_size, len(remaining)))
+            chunk = raw
+            if isinstance(raw, bytes):
+                if self._decoder is None:
+                    self._decoder = codecs.getincrementaldecoder("utf-8-sig")()
+                chunk = self._decoder.decode(raw, final=not raw)
+            # a read that ends mid-way through a multi-byte character
+            # decodes to nothing yet — that isn't the end of the file
+            if chunk or not raw:
+                break
+        if not chunk:
+            self._eof = True
+        self._buf = remaining + chunk
+        self._pos = 0
+        return not self._eof
+
+    def peek(self) -> str:
+        """Skip whitespace and return the next character ("" at EOF)."""
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in _JSON_WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise json.JSONDecodeError(f"Expecting '{char}'", self._buf, self._pos)
+        self._pos += 1
+
+    def decode_value(self):
+        """Decode the next complete JSON value, reading more as needed."""
+        self.peek()
+        while True:
+            try:
+                value, end = _json_decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # a bare number at the end of the buffer may have been cut short
+            # ("1" of "1.5") — only trust it once a delimiter follows it
+            if (
+                isinstance(value, (int, float))
+                and self._buf[end:end + 1] not in _JSON_DELIMITERS
+                and self._fill()
+            ):
+                continue
+            self._pos = end
+            return value
+
+    def iter_array(self) -> Iterator[Any]:
+        self.expect("[")
+        if self.peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            yield self.decode_value()
+            char = self.peek()
+            self._pos += 1
+            if char == "]":
+                return
+            if char != ",":
+                raise json.JSONDecodeError("Expecting ',' delimiter", self._buf, self._pos - 1)
+
+
+def iter_segments(fp, chunk_size: int = 64 * 1024) -> Iterator[Any]:
+    """
+    Yields the raw segments of a Timeline export one at a time, reading
+    `fp` (a binary or text file object) incrementally. Accepts the same two
+    shapes as `parse_timeline`. Raises json.JSONDecodeError on malformed
+    JSON (possibly part-way through, since the file is read lazily) and
+    TimelineParseError if no segment array is found.
+    """
+    stream = _JsonStream(fp, chunk_size)
+    first = stream.peek()
+    if first == "[":
+        yield from stream.iter_array()
+        return
+    if first == "{":
+        stream.expect("{")
+        if stream.peek() != "}":
+            while True:
+                key = stream.decode_value()
+                stream.expect(":")
+                if key == "semanticSegments" and stream.peek() == "[":
+                    # anything after the array (e.g. rawSignals) is never read
+                    yield from stream.iter_array()
+                    return
+                stream.decode_value()  # some other top-level key — skip it
+                if stream.peek() != ",":
+                    break
+                stream.expect(",")
+        stream.expect("}")
+    else:
+        stream.decode_value()  # raises for anything that isn't valid JSON
+    raise TimelineParseError(_NO_SEGMENTS_MESSAGE)
+
+
+def iter_timeline(fp, chunk_size: int = 64 * 1024, paths: bool = False) -> Iterator[dict]:
+    """
+    Streaming counterpart to `parse_timeline`: yields the same visit/drive
+    dicts, one segment at a time, so peak memory stays flat however many
+    years the export covers. Entries come out in file order rather than
+    sorted — exports are already chronological, and nothing downstream
+    depends on strict ordering.
+
+    With `paths=True`, timelinePath segments are yielded too, as
+    "path" dicts (see `_parse_path_segment`), for the importer to rebuild
+    drive routes from.
+    """
+    for segment in iter_segments(fp, chunk_size):
+        parsed = _parse_any(segment, paths)
+        if parsed:
+            yield parsed
+
+
+def _parse_any(segment, paths: bool) -> Optional[dict]:
+    if paths and isinstance(segment, dict) and "timelinePath" in segment:
+        return _parse_path_segment(segment)
+    return _parse_segment(segment)
+
+
+def _parse_batch(segments: list, paths: bool) -> tuple:
+    """Parses and fingerprints one batch of raw segments — in a process-pool
+    worker when iter_timeline_batches runs with workers. Entries come back
+    with the index of their segment in place of `raw_data`, so the segments
+    aren't pickled a second time on the way back."""
+    entries, fingerprints = [], []
+    for i, segment in enumerate(segments):
+        parsed = _parse_any(segment, paths)
+        if parsed:
+            parsed["raw_data"] = i
+            entries.append(parsed)
+            fingerprints.append(segment_fingerprint(segment))
+    return entries, fingerprints
+
+
+def _with_raw_data(segments: list, parsed: tuple) -> tuple:
+    entries, fingerprints = parsed
+    for entry in entries:
+        entry["raw_data"] = segments[entry["raw_data"]]
+    return entries, fingerprints
+
+
+def iter_timeline_batches(
+    fp, batch_size: int, paths: bool = False, workers: int = 1, chunk_size: int = 64 * 1024
+) -> Iterator[tuple]:
+    """
+    Like `iter_timeline`, but yields the entries of each `batch_size` raw
+    segments at a time, as (entries, fingerprints) with each entry's
+    `segment_fingerprint` alongside it.
+
+    With `workers` > 1, batches are parsed and fingerprinted in that many
+    processes while this one carries on reading the file and the caller
+    imports the previous batch. At most two batches per worker are in
+    flight, so memory stays flat as in sequential mode, and the batches come
+    out the same and in the same order.
+    """
+    segments = iter_segments(fp, chunk_size)
+    batches = iter(lambda: list(itertools.islice(segments, batch_size)), [])
+    if workers <= 1:
+        for batch in batches:
+            yield _with_raw_data(batch, _parse_batch(batch, paths))
+        return
+
+    pool = ProcessPoolExecutor(max_workers=workers)
+    try:
+        pending = collections.deque()
+        for batch in batches:
+            pending.append((batch, pool.submit(_parse_batch, batch, paths)))
+            if len(pending) >= 2 * workers:
+                batch, future = pending.popleft()
+                yield _with_raw_data(batch, future.result())
+        while pending:
+            batch, future = pending.popleft()
+            yield _with_raw_data(batch, future.result())
+    finally:
+        # an abandoned import shouldn't wait for batches nobody will read
+        pool.shutdown(cancel_futures=True)
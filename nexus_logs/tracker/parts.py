@@ -0,0 +1,173 @@
+"""
+The parts catalogue: splits each job's free-text parts_used into
+PartLineItem rows (quantity, unit, part) and keeps the Part index the
+autocomplete searches, so "how many glands this month" is a GROUP BY
+(tracker.reports.parts_usage) rather than a re-parse of every job.
+
+Lines are read the way they're usually typed on site:
+  X1 gland, 2x gland, 2 glands  -> 1 / 2 / 2 of "gland(s)", no unit
+  500mm 16x25 trunking          -> 0.5 m of "16x25 trunking"
+  4x2 plug                      -> 1 of "4x2 plug" (a size, not a count)
+Lengths, volumes and weights are stored in m, l and kg so they total up
+whichever unit they were typed in. A unit only counts as one when it's
+attached to the number ("3m cable", not "3 m cable"), so "2 L brackets"
+stays two L brackets.
+
+parts_used stays the source of truth. sync_part_items is called wherever
+a job's parts are saved and only touches the lines that changed.
+"""
+import re
+from collections import Counter, namedtuple
+from typing import Optional
+
+from django.db.models import F
+
+from .models import Part, PartLineItem
+
+PARTS_SUGGESTION_LIMIT = 10
+
+ParsedPart = namedtuple("ParsedPart", ["line", "quantity", "unit", "name", "key"])
+
+# typed unit -> (stored unit, factor)
+_UNITS = {
+    "mm": ("m", 0.001),
+    "cm": ("m", 0.01),
+    "m": ("m", 1),
+    "ml": ("l", 0.001),
+    "l": ("l", 1),
+    "g": ("kg", 0.001),
+    "kg": ("kg", 1),
+}
+_NUMBER = r"\d+(?:[.,]\d+)?"
+_LINE = re.compile(
+    rf"^(?:[x×]\s*(?P<prefixed>{_NUMBER})\s+"  # X1 gland
+    rf"|(?P<count>{_NUMBER})(?:\s*[x×]\s+|(?P<unit>{'|'.join(_UNITS)})\s+|\s+))"  # 2x / 500mm / 2
+    r"(?P<name>\S.*)$",
+    re.IGNORECASE,
+)
+
+
+# Plural endings of a name's last word, longest first, and what's left in
+# their place. Only endings added to an unchanged singular ("glands",
+# "boxes"): folding "ties" to "ty" would split it from "tie".
+_PLURAL_ENDINGS = (("sses", "ss"), ("ches", "ch"), ("shes", "sh"), ("xes", "x"), ("s", ""))
+
+
+def _singular(word: str) -> str:
+    if len(word) > 3 and word.isalpha() and not word.endswith(("ss", "us", "is")):
+        for plural, singular in _PLURAL_ENDINGS:
+            if word.endswith(plural):
+                return word[: -len(plural)] + singular
+    return word
+
+
+def part_key(name: str) -> str:
+    """The name case- and space-folded, with a plural last word made
+    singular: "2 Glands" and "gland" are the same part."""
+    words = name.casefold().split()
+    if words:
+        words[-1] = _singular(words[-1])
+    return " ".join(words)
+
+
+def parse_part_line(line: str) -> Optional[ParsedPart]:
+    """Splits one parts_used line, or returns None for a blank one."""
+    line = line.strip()
+    if not line:
+        return None
+    quantity, unit, name = 1.0, "", line
+    match = _LINE.match(line)
+    if match:
+        number = match["prefixed"] or match["count"]
+        quantity = float(number.replace(",", "."))
+        name = match["name"].strip()
+        if match["unit"]:
+            unit, factor = _UNITS[match["unit"].lower()]
+            quantity = round(quantity * factor, 6)
+    return ParsedPart(line[:500], quantity, unit, name[:255], part_key(name)[:255])
+
+
+def parse_parts(text: str) -> list:
+    """Every non-blank line of a parts_used text, parsed."""
+    return [parsed for parsed in map(parse_part_line, text.splitlines()) if parsed]
+
+
+def _parts_by_key(parsed: list) -> dict:
+    """The Part for each parsed line's key, creating any that are new."""
+    names = {}
+    for item in parsed:
+        names.setdefault(item.key, item.name)
+    Part.objects.bulk_create(
+        [Part(key=key, name=name) for key, name in names.items()], ignore_conflicts=True
+    )
+    return {part.key: part for part in Part.objects.filter(key__in=names)}
+
+
+def _adjust_use_counts(deltas: Counter) -> None:
+    for part_id, delta in deltas.items():
+        if delta:
+            Part.objects.filter(pk=part_id).update(use_count=F("use_count") + delta)
+
+
+def sync_part_items(entry) -> None:
+    """Brings `entry`'s line items in line with its parts_used: lines that
+    were removed are deleted, new ones are added, and unchanged lines (and
+    their part's use count) are left alone."""
+    wanted = Counter(parse_parts(entry.parts_used))
+    existing = list(entry.part_items.all())
+
+    stale = []
+    for item in existing:
+        parsed = parse_part_line(item.line)
+        if parsed in wanted and item.visit_date == entry.visit_date:
+            wanted[parsed] -= 1
+            if not wanted[parsed]:
+                del wanted[parsed]
+        else:
+            stale.append(item)
+    if not stale and not wanted:
+        return
+
+    deltas = Counter()
+    if stale:
+        PartLineItem.objects.filter(pk__in=[item.pk for item in stale]).delete()
+        deltas.subtract(item.part_id for item in stale)
+    if wanted:
+        parts = _parts_by_key(list(wanted))
+        new_items = [
+            PartLineItem(
+                entry=entry,
+                part=parts[parsed.key],
+                line=parsed.line,
+                quantity=parsed.quantity,
+                unit=parsed.unit,
+                visit_date=entry.visit_date,
+            )
+            for parsed in wanted.elements()
+        ]
+        PartLineItem.objects.bulk_create(new_items)
+        deltas.update(item.part_id for item in new_items)
+    _adjust_use_counts(deltas)
+
+
+def release_part_items(entry) -> None:
+    """Takes an entry's line items out of the part use counts — call before
+    deleting the entry (its line items go with it)."""
+    deltas = Counter()
+    deltas.subtract(entry.part_items.values_list("part_id", flat=True))
+    _adjust_use_counts(deltas)
+
+
+def suggest_parts(prefix: str, limit: int = PARTS_SUGGESTION_LIMIT) -> list:
+    """Names of previously used parts starting with `prefix`, most used
+    first. The prefix is a range on Part.key, so it's answered from the
+    unique index (a LIKE with ESCAPE, which Django's startswith emits,
+    can't use it on SQLite)."""
+    key = part_key(prefix)
+    if not key:
+        return []
+    return list(
+        Part.objects.filter(key__gte=key, key__lt=key + "\U0010ffff", use_count__gt=0)
+        .order_by("-use_count", "name")
+        .values_list("name", flat=True)[:limit]
+    )
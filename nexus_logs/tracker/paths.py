@@ -0,0 +1,118 @@
+"""
+Rebuilds drive routes from an export's timelinePath breadcrumbs.
+
+Breadcrumbs aren't attached to drives in the export — they're periodic GPS
+points in their own segments, covering visits and drives alike. Each point
+is matched by time to the Google drive it falls inside and merged into
+that drive's DrivePath blob; points recorded during visits match nothing
+and are dropped.
+
+An export is chronological, with a path segment usually starting before
+the drive it covers, so during an import (tracker.importer) points that
+don't match a stored drive yet are kept in a buffer for the next batch.
+Points older than PATH_CARRY_WINDOW behind the import's progress can't
+belong to a drive still to come and are dropped from the buffer.
+"""
+import bisect
+import datetime as dt
+import json
+
+from .geofence import haversine_m
+from .models import DrivePath, TimelineEntry
+
+PATH_CARRY_WINDOW = dt.timedelta(hours=6)
+_E7 = 10_000_000
+
+
+def attach_path_points(points: list) -> list:
+    """Merges (time, lat, lng) points into the routes of the Google drives
+    they fall inside, and returns the points that matched no drive.
+    Re-attaching points a route already has is a no-op, so re-imports
+    don't duplicate them."""
+    if not points:
+        return []
+    earliest = min(p[0] for p in points)
+    latest = max(p[0] for p in points)
+    drives = list(
+        TimelineEntry.objects.filter(
+            entry_type=TimelineEntry.DRIVE,
+            source=TimelineEntry.GOOGLE,
+            # visit_date bounds the scan to the index; the times are exact
+            visit_date__gte=earliest.date() - dt.timedelta(days=1),
+            visit_date__lte=latest.date() + dt.timedelta(days=1),
+            start_time__lte=latest,
+            end_time__gte=earliest,
+        )
+        .only("pk", "start_time", "end_time")
+        .order_by("start_time")
+    )
+    starts = [d.start_time for d in drives]
+
+    matched = {}
+    unmatched = []
+    for point in points:
+        i = bisect.bisect_right(starts, point[0]) - 1
+        if i >= 0 and point[0] <= drives[i].end_time:
+            drive = drives[i]
+            matched.setdefault(drive.pk, (drive, set()))[1].add(
+                (
+                    round((point[0] - drive.start_time).total_seconds()),
+                    round(point[1] * _E7),
+                    round(point[2] * _E7),
+                )
+            )
+        else:
+            unmatched.append(point)
+    if not matched:
+        return unmatched
+
+    routes = []
+    existing = DrivePath.objects.in_bulk(list(matched))
+    for pk, (drive, new_points) in matched.items():
+        stored = existing.get(pk)
+        if stored is not None:
+            known = set(stored.points)
+            if new_points <= known:
+                continue
+            new_points |= known
+        ordered = sorted(new_points)
+        routes.append(
+            DrivePath(entry=drive, point_count=len(ordered), compressed=DrivePath.pack(ordered))
+        )
+    DrivePath.objects.bulk_create(
+        routes,
+        batch_size=500,
+        update_conflicts=True,
+        unique_fields=["entry"],
+        update_fields=["point_count", "compressed"],
+    )
+    return unmatched
+
+
+def iter_route_geojson(route: DrivePath, chunk_size: int = 500):
+    """Streams a drive's route as a GeoJSON LineString Feature, a chunk of
+    coordinates at a time. The length of the route as driven comes last,
+    in the properties, for comparing against Google's distance_km."""
+    entry = route.entry
+    yield '{"type":"Feature","geometry":{"type":"LineString","coordinates":['
+    length_m = 0.0
+    previous = None
+    points = route.points
+    for offset in range(0, len(points), chunk_size):
+        coordinates = []
+        for _, lat_e7, lng_e7 in points[offset:offset + chunk_size]:
+            lat, lng = lat_e7 / _E7, lng_e7 / _E7
+            if previous is not None:
+                length_m += haversine_m(previous[0], previous[1], lat, lng)
+            previous = (lat, lng)
+            coordinates.append(f"[{lng},{lat}]")
+        yield ("," if offset else "") + ",".join(coordinates)
+    properties = {
+        "entry": entry.pk,
+        "start": entry.start_time.isoformat(),
+        "end": entry.end_time.isoformat(),
+        "points": len(points),
+        "distance_km": entry.distance_km,
+        "route_km": round(length_m / 1000, 2),
+    }
+    yield "]},\"properties\":" + json.dumps(properties) + "}"
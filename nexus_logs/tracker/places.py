@@ -0,0 +1,123 @@
+"""
+Place-name memory: remembers the name/address the user last typed for a
+place and applies it to later visits of the same place, on import and
+to existing unnamed visits, so each customer only has to be named once.
+
+Visits with Google's place_id match only the place remembered under that
+id: a place_id nobody has named yet is a new place, however close it is
+to a known one (the shop next door, a neighbour's house). Visits without
+one fall back to coordinates: the nearest remembered place that has no
+place_id either, within PLACE_MATCH_RADIUS_M, found through a small grid
+of rounded coordinates rather than a scan.
+"""
+import math
+from typing import Optional
+
+from .geofence import haversine_m, tag_entries
+from .models import DaySummary, KnownPlace, TimelineEntry
+
+PLACE_MATCH_RADIUS_M = 75
+_CELL_DEG = 0.001  # ~110 m of latitude, so a 3x3 block covers the radius
+
+
+def _cell(lat: float, lng: float) -> tuple:
+    return math.floor(lat / _CELL_DEG), math.floor(lng / _CELL_DEG)
+
+
+class PlaceMemory:
+    """Every KnownPlace, held as a place_id dict plus a coordinate grid of
+    the places without one, so an import batch costs one query and one
+    dict lookup per visit."""
+
+    def __init__(self, places):
+        self._by_place_id = {}
+        self._grid = {}
+        for place in places:
+            if place.place_id:
+                self._by_place_id[place.place_id] = place
+            elif place.latitude is not None and place.longitude is not None:
+                self._grid.setdefault(_cell(place.latitude, place.longitude), []).append(place)
+
+    @classmethod
+    def load(cls) -> "PlaceMemory":
+        return cls(KnownPlace.objects.all())
+
+    def lookup(self, place_id: Optional[str], lat: Optional[float], lng: Optional[float]) -> Optional[KnownPlace]:
+        if place_id:
+            return self._by_place_id.get(place_id)
+        if lat is None or lng is None:
+            return None
+        return self.nearest(lat, lng)
+
+    def nearest(self, lat: float, lng: float) -> Optional[KnownPlace]:
+        row, col = _cell(lat, lng)
+        best, best_distance = None, PLACE_MATCH_RADIUS_M
+        for d_row in (-1, 0, 1):
+            for d_col in (-1, 0, 1):
+                for place in self._grid.get((row + d_row, col + d_col), ()):
+                    distance = haversine_m(lat, lng, place.latitude, place.longitude)
+                    if distance <= best_distance:
+                        best, best_distance = place, distance
+        return best
+
+
+def apply_known_names(entries, memory: PlaceMemory) -> None:
+    """Fills blank location_name/address on unsaved visits from memory.
+    Never overwrites anything already set."""
+    for entry in entries:
+        if entry.entry_type != TimelineEntry.VISIT or (entry.location_name and entry.address):
+            continue
+        place = memory.lookup(entry.place_id, entry.latitude, entry.longitude)
+        if place is not None:
+            entry.location_name = entry.location_name or place.location_name
+            entry.address = entry.address or place.address
+
+
+def remember_place(entry: TimelineEntry) -> Optional[KnownPlace]:
+    """Records `entry`'s name/address against its place after the user
+    edits it. Visits with neither a place_id nor coordinates (most manual
+    entries) have nothing to key on and are skipped."""
+    if entry.entry_type != TimelineEntry.VISIT or not (entry.location_name or entry.address):
+        return None
+    defaults = {
+        "latitude": entry.latitude,
+        "longitude": entry.longitude,
+        "location_name": entry.location_name,
+        "address": entry.address,
+    }
+    if entry.place_id:
+        place, _ = KnownPlace.objects.update_or_create(place_id=entry.place_id, defaults=defaults)
+        return place
+    if entry.latitude is None or entry.longitude is None:
+        return None
+    place = PlaceMemory(KnownPlace.objects.filter(place_id__isnull=True)).nearest(
+        entry.latitude, entry.longitude
+    )
+    if place is None:
+        return KnownPlace.objects.create(**defaults)
+    for field, value in defaults.items():
+        setattr(place, field, value)
+    place.save()
+    return place
+
+
+def name_unnamed_visits(place: KnownPlace) -> int:
+    """Copies a just-remembered name onto the place's other visits that
+    are still completely unnamed. Returns how many were filled in."""
+    if not place.place_id:
+        return 0
+    visits = list(
+        TimelineEntry.objects.filter(
+            entry_type=TimelineEntry.VISIT, place_id=place.place_id, location_name="", address=""
+        )
+    )
+    for visit in visits:
+        visit.location_name = place.location_name
+        visit.address = place.address
+    if visits:
+        tag_entries(visits)  # the new name may match the home address
+        TimelineEntry.objects.bulk_update(
+            visits, ["location_name", "address", "geofence", "is_home"], batch_size=500
+        )
+        DaySummary.refresh(v.visit_date for v in visits)
+    return len(visits)
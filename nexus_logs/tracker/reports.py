@@ -0,0 +1,135 @@
+"""
+Per-day, per-week and per-month totals for invoicing: billable visit
+minutes, driving km and minutes, and how many jobs had parts logged.
+
+Everything is computed by one GROUP BY query over TimelineEntry for the
+requested range. Results are cached in ReportCache, keyed by the period
+and date range, so re-opening a month-end report doesn't re-scan the
+month. DaySummary.refresh — which everything that changes entries already
+calls — clears every cached report overlapping the changed days.
+
+Parts usage for the same range (parts_usage) is a second GROUP BY, over
+the PartLineItem rows tracker.parts keeps for each job's parts list. It
+isn't cached: the line items are indexed by date and far fewer than
+entries.
+
+"Billable" visit time is time at any visit not tagged as home
+(TimelineEntry.is_home): customers' sites, the depot and manual jobs.
+"""
+import datetime as dt
+
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Q, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+
+from .models import PartLineItem, ReportCache, TimelineEntry
+
+DAY = "day"
+WEEK = "week"
+MONTH = "month"
+PERIOD_CHOICES = [(DAY, "Daily"), (WEEK, "Weekly"), (MONTH, "Monthly")]
+
+REPORT_HEADERS = [
+    "Period starting",
+    "Visits",
+    "Billable visit minutes",
+    "Billable hours",
+    "Drive km",
+    "Drive minutes",
+    "Jobs with parts",
+]
+
+_TOTAL_FIELDS = ["visits", "billable_minutes", "drive_km", "drive_minutes", "jobs_with_parts"]
+_duration = ExpressionWrapper(F("end_time") - F("start_time"), output_field=DurationField())
+_billable = Q(entry_type=TimelineEntry.VISIT, is_home=False)
+_drive = Q(entry_type=TimelineEntry.DRIVE)
+
+
+def _period_expression(period: str):
+    if period == WEEK:
+        return TruncWeek("visit_date")  # Monday of the week
+    if period == MONTH:
+        return TruncMonth("visit_date")
+    return F("visit_date")
+
+
+def _compute(period: str, start_date: dt.date, end_date: dt.date) -> list:
+    rows = (
+        TimelineEntry.objects.filter(visit_date__gte=start_date, visit_date__lte=end_date)
+        .annotate(period=_period_expression(period))
+        .values("period")
+        .annotate(
+            visits=Count("pk", filter=_billable),
+            billable=Sum(_duration, filter=_billable),
+            drive_km=Sum("distance_km", filter=_drive),
+            drive_time=Sum(_duration, filter=_drive),
+            jobs_with_parts=Count("pk", filter=_billable & ~Q(parts_used="")),
+        )
+        .order_by("period")
+    )
+    return [
+        {
+            "period": row["period"].isoformat(),
+            "visits": row["visits"],
+            "billable_minutes": round((row["billable"] or dt.timedelta()).total_seconds() / 60),
+            "drive_km": round(row["drive_km"] or 0, 1),
+            "drive_minutes": round((row["drive_time"] or dt.timedelta()).total_seconds() / 60),
+            "jobs_with_parts": row["jobs_with_parts"],
+        }
+        for row in rows
+    ]
+
+
+def build_report(period: str, start_date: dt.date, end_date: dt.date) -> dict:
+    """{"rows": [...], "totals": {...}} for the range, one row per period
+    with any entries, from the cache when it's still valid."""
+    cached = ReportCache.objects.filter(
+        period=period, start_date=start_date, end_date=end_date
+    ).first()
+    if cached is not None:
+        rows = cached.rows
+    else:
+        rows = _compute(period, start_date, end_date)
+        ReportCache.objects.update_or_create(
+            period=period, start_date=start_date, end_date=end_date, defaults={"rows": rows}
+        )
+
+    for row in rows:
+        if isinstance(row["period"], str):
+            row["period"] = dt.date.fromisoformat(row["period"])
+        row["billable_hours"] = round(row["billable_minutes"] / 60, 2)
+    totals = {field: sum(row[field] for row in rows) for field in _TOTAL_FIELDS}
+    totals["drive_km"] = round(totals["drive_km"], 1)
+    totals["billable_hours"] = round(totals["billable_minutes"] / 60, 2)
+    return {"rows": rows, "totals": totals}
+
+
+def report_export_row(row: dict) -> list:
+    return [
+        row["period"].isoformat() if row["period"] else "",
+        row["visits"],
+        row["billable_minutes"],
+        row["billable_hours"],
+        row["drive_km"],
+        row["drive_minutes"],
+        row["jobs_with_parts"],
+    ]
+
+
+def parts_usage(start_date: dt.date, end_date: dt.date) -> list:
+    """Per part and unit: total quantity and the number of jobs it was used
+    on over the range, most used first."""
+    rows = (
+        PartLineItem.objects.filter(visit_date__gte=start_date, visit_date__lte=end_date)
+        .values("part", "part__name", "unit")
+        .annotate(quantity=Sum("quantity"), jobs=Count("entry", distinct=True))
+        .order_by("-jobs", "part__name")
+    )
+    return [
+        {
+            "part": row["part__name"],
+            "unit": row["unit"],
+            "quantity": round(row["quantity"], 3),
+            "jobs": row["jobs"],
+        }
+        for row in rows
+    ]
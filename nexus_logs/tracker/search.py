@@ -0,0 +1,81 @@
+"""
+Full-text search over visits' location name, address, parts and comments.
+
+On SQLite this queries the tracker_entry_search FTS5 index (created, and
+kept current by triggers, in migration 0011): matches are ranked by BM25,
+with the location weighted above the address, parts and comments, and
+each result carries a snippet of the text around the matched words.
+Other databases fall back to an unranked icontains scan.
+
+The user's words are each quoted before reaching FTS5, so punctuation and
+words like AND/NOT are searched for rather than parsed as query syntax;
+the last word is matched as a prefix, so results show up while typing.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.utils.html import escape
+
+from .models import TimelineEntry
+
+SEARCH_RESULT_LIMIT = 50
+SEARCH_SNIPPET_TOKENS = 12
+
+# bm25() column weights, in index column order
+_WEIGHTS = "4.0, 2.0, 1.0, 1.0"
+# Private-use markers around matched words, swapped for <mark> only after
+# the snippet has been HTML-escaped.
+_OPEN, _CLOSE = "\ue000", "\ue001"
+_WORD = re.compile(r"\w+")
+
+
+def fts_query(text: str) -> str:
+    """The user's search text as an FTS5 query: every word required, the
+    last one as a prefix."""
+    words = _WORD.findall(text)
+    if not words:
+        return ""
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def _snippet_html(snippet: str) -> str:
+    return escape(snippet).replace(_OPEN, "<mark>").replace(_CLOSE, "</mark>")
+
+
+def search_entries(text: str, limit: int = SEARCH_RESULT_LIMIT) -> list:
+    """Up to `limit` visits matching `text`, best first, as
+    (entry, snippet_html) pairs. snippet_html is None when the database has
+    no full-text index."""
+    if connection.vendor != "sqlite":
+        return [(entry, None) for entry in _search_by_scan(text, limit)]
+    query = fts_query(text)
+    if not query:
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid, snippet(tracker_entry_search, -1, %s, %s, '…', %s) "
+            f"FROM tracker_entry_search WHERE tracker_entry_search MATCH %s "
+            f"ORDER BY bm25(tracker_entry_search, {_WEIGHTS}) LIMIT %s",
+            [_OPEN, _CLOSE, SEARCH_SNIPPET_TOKENS, query, limit],
+        )
+        hits = cursor.fetchall()
+    entries = TimelineEntry.objects.in_bulk([pk for pk, _ in hits])
+    return [(entries[pk], _snippet_html(snippet)) for pk, snippet in hits if pk in entries]
+
+
+def _search_by_scan(text: str, limit: int):
+    words = _WORD.findall(text)
+    if not words:
+        return []
+    entries = TimelineEntry.objects.filter(entry_type=TimelineEntry.VISIT)
+    for word in words:
+        entries = entries.filter(
+            Q(location_name__icontains=word)
+            | Q(address__icontains=word)
+            | Q(parts_used__icontains=word)
+            | Q(comments__icontains=word)
+        )
+    return entries.order_by("-start_time")[:limit]
@@ -0,0 +1,24 @@
+"""
+Per-connection SQLite tuning, applied from a `connection_created` hook
+(see TrackerConfig.ready) so every connection — web requests, the import
+worker thread, management commands — runs with the same profile:
+
+  - WAL journaling, so the dashboard keeps reading while an import is
+    writing instead of waiting on (or failing with) "database is locked";
+  - synchronous=NORMAL, which in WAL mode only risks the last few commits
+    on power loss, never corruption, and skips an fsync per transaction;
+  - a bigger page cache and memory-mapped reads for the hot tables;
+  - temp tables and sort spills kept in memory.
+
+The values come from settings.SQLITE_PRAGMAS. Waiting for the write lock
+is handled by the database's "timeout" option, not a pragma.
+"""
+from django.conf import settings
+
+
+def configure_sqlite(sender, connection, **kwargs) -> None:
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        for pragma, value in getattr(settings, "SQLITE_PRAGMAS", {}).items():
+            cursor.execute(f"PRAGMA {pragma} = {value}")
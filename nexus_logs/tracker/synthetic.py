@@ -0,0 +1,260 @@
+"""
+Generates synthetic Timeline exports for benchmarking the parser and the
+import pipeline (see the `benchmark_import` management command) without
+needing a real multi-year export to hand.
+
+The output mimics what real exports throw at the parser:
+  - both shapes tracker.parsers accepts — the bare array of
+    visit/activity/timelinePath segments, and the older wrapped
+    {"semanticSegments": [...]} shape with placeVisit/activitySegment
+    entries and E7 coordinates;
+  - nested sub-visits (hierarchyLevel "1" segments in the array shape,
+    childVisits in the wrapped one), which the parser must skip;
+  - timelinePath breadcrumb segments with a jittered point every few
+    minutes, which make up a large share of a real file but produce no
+    entries;
+  - string-encoded numbers, a handful of UTC offsets, and a pool of
+    repeat places so visits share place IDs the way regular customers do.
+
+Exports are written segment by segment, so even a million-segment file
+never exists in memory as a whole. The same `seed` always produces the
+same file; bumping `revision` re-exports the same history with changed
+probabilities, distances and end times — what a real re-export looks like
+to the importer (new fingerprints, same identities).
+"""
+import datetime as dt
+import json
+import random
+
+ARRAY = "array"
+SEMANTIC = "semantic"
+SCHEMAS = [ARRAY, SEMANTIC]
+
+_PLACE_COUNT = 300
+_BASE_LAT, _BASE_LNG = -33.92, 18.42
+_OFFSETS = [dt.timedelta(hours=2), dt.timedelta(hours=2), dt.timedelta(hours=1), dt.timedelta(0)]
+_SEMANTIC_TYPES = ["Unknown"] * 8 + ["Home", "Work"]
+
+
+def _timestamp(moment: dt.datetime, offset: dt.timedelta) -> str:
+    local = moment.astimezone(dt.timezone(offset))
+    return local.isoformat(timespec="milliseconds")
+
+
+def _geo(lat: float, lng: float) -> str:
+    return f"geo:{lat:.6f},{lng:.6f}"
+
+
+class _ExportHistory:
+    """Walks forward through synthetic days, producing one day's segments
+    at a time as (kind, fields) tuples that the schema writers render."""
+
+    def __init__(self, seed: int, revision: int):
+        self._rng = random.Random(seed)
+        self._revision = revision
+        self._places = [
+            (
+                f"ChIJ{self._rng.getrandbits(64):016x}",
+                _BASE_LAT + self._rng.uniform(-0.3, 0.3),
+                _BASE_LNG + self._rng.uniform(-0.3, 0.3),
+            )
+            for _ in range(_PLACE_COUNT)
+        ]
+        self._day = dt.datetime(2020, 1, 1, 6, tzinfo=dt.timezone.utc)
+
+    def _revised(self, value: float, spread: float) -> float:
+        # deterministic per revision, so re-exports differ from each other
+        # but a given revision always renders the same file
+        return value + spread * self._revision * 0.01
+
+    def days(self):
+        rng = self._rng
+        moment = self._day
+        while True:
+            offset = rng.choice(_OFFSETS)
+            # a long day can run past the next morning's start time
+            moment = max(moment, self._day + dt.timedelta(minutes=rng.randint(0, 90)))
+            lat, lng = self._places[0][1:]
+            for stop in range(rng.randint(4, 9)):
+                place_id, place_lat, place_lng = self._places[
+                    0 if stop == 0 else rng.randrange(_PLACE_COUNT)
+                ]
+                drive_minutes = rng.randint(8, 55)
+                drive_end = moment + dt.timedelta(minutes=drive_minutes)
+                if stop:
+                    yield "drive", {
+                        "start": moment, "end": drive_end, "offset": offset,
+                        "from": (lat, lng), "to": (place_lat, place_lng),
+                        "distance_m": self._revised(drive_minutes * rng.uniform(500, 900), 1500),
+                    }
+                    yield "path", {
+                        "start": moment, "end": drive_end, "offset": offset,
+                        "points": [
+                            (
+                                lat + (place_lat - lat) * i / drive_minutes + rng.gauss(0, 0.0003),
+                                lng + (place_lng - lng) * i / drive_minutes + rng.gauss(0, 0.0003),
+                                i,
+                            )
+                            for i in range(0, drive_minutes, 2)
+                        ],
+                    }
+                    moment = drive_end
+                visit_end = moment + dt.timedelta(minutes=rng.randint(15, 150))
+                nested = None
+                if rng.random() < 0.2:
+                    sub_id, sub_lat, sub_lng = self._places[rng.randrange(_PLACE_COUNT)]
+                    nested = {
+                        "place_id": sub_id, "lat": place_lat + rng.gauss(0, 0.0005),
+                        "lng": place_lng + rng.gauss(0, 0.0005),
+                        "start": moment + dt.timedelta(minutes=5),
+                        "end": visit_end - dt.timedelta(minutes=5),
+                    }
+                # a revised visit ends a little earlier, without moving any
+                # later segment (which would change their identities)
+                yield "visit", {
+                    "start": moment, "end": visit_end - dt.timedelta(minutes=min(self._revision, 10)),
+                    "offset": offset,
+                    "place_id": place_id, "lat": place_lat, "lng": place_lng,
+                    "semantic_type": "Home" if stop == 0 else rng.choice(_SEMANTIC_TYPES),
+                    "probability": min(self._revised(rng.uniform(0.5, 0.99), 0.5), 1.0),
+                    "nested": nested,
+                }
+                lat, lng = place_lat, place_lng
+                moment = visit_end
+            self._day += dt.timedelta(days=1)
+
+
+def _array_segments(kind: str, f: dict):
+    """Renders one history item in the current on-device export shape."""
+    times = {"startTime": _timestamp(f["start"], f["offset"]), "endTime": _timestamp(f["end"], f["offset"])}
+    if kind == "visit":
+        yield {
+            **times,
+            "visit": {
+                "hierarchyLevel": "0",
+                "topCandidate": {
+                    "placeID": f["place_id"],
+                    "semanticType": f["semantic_type"],
+                    "probability": f"{f['probability']:.6f}",
+                    "placeLocation": _geo(f["lat"], f["lng"]),
+                },
+                "probability": f"{f['probability']:.6f}",
+            },
+        }
+        if f["nested"]:
+            sub = f["nested"]
+            yield {
+                "startTime": _timestamp(sub["start"], f["offset"]),
+                "endTime": _timestamp(sub["end"], f["offset"]),
+                "visit": {
+                    "hierarchyLevel": "1",
+                    "topCandidate": {
+                        "placeID": sub["place_id"],
+                        "semanticType": "Unknown",
+                        "probability": "0.410000",
+                        "placeLocation": _geo(sub["lat"], sub["lng"]),
+                    },
+                    "probability": "0.410000",
+                },
+            }
+    elif kind == "drive":
+        yield {
+            **times,
+            "activity": {
+                "start": _geo(*f["from"]),
+                "end": _geo(*f["to"]),
+                "distanceMeters": f"{f['distance_m']:.6f}",
+                "topCandidate": {"type": "in passenger vehicle", "probability": "0.970000"},
+            },
+        }
+    else:
+        yield {
+            **times,
+            "timelinePath": [
+                {"point": _geo(lat, lng), "durationMinutesOffsetFromStartTime": str(minute)}
+                for lat, lng, minute in f["points"]
+            ],
+        }
+
+
+def _semantic_segments(kind: str, f: dict):
+    """Renders one history item in the older wrapped Takeout shape."""
+    duration = {
+        "startTimestamp": _timestamp(f["start"], f["offset"]),
+        "endTimestamp": _timestamp(f["end"], f["offset"]),
+    }
+    if kind == "visit":
+        visit = {
+            "location": {
+                "placeId": f["place_id"],
+                "latitudeE7": round(f["lat"] * 1e7),
+                "longitudeE7": round(f["lng"] * 1e7),
+                "semanticType": f["semantic_type"],
+            },
+            "duration": duration,
+            "visitConfidence": round(f["probability"] * 100),
+        }
+        if f["nested"]:
+            sub = f["nested"]
+            visit["childVisits"] = [
+                {
+                    "location": {
+                        "placeId": sub["place_id"],
+                        "latitudeE7": round(sub["lat"] * 1e7),
+                        "longitudeE7": round(sub["lng"] * 1e7),
+                    },
+                    "duration": {
+                        "startTimestamp": _timestamp(sub["start"], f["offset"]),
+                        "endTimestamp": _timestamp(sub["end"], f["offset"]),
+                    },
+                }
+            ]
+        yield {"placeVisit": visit}
+    elif kind == "drive":
+        yield {
+            "activitySegment": {
+                "startLocation": {"latitudeE7": round(f["from"][0] * 1e7), "longitudeE7": round(f["from"][1] * 1e7)},
+                "endLocation": {"latitudeE7": round(f["to"][0] * 1e7), "longitudeE7": round(f["to"][1] * 1e7)},
+                "duration": duration,
+                "distance": round(f["distance_m"]),
+                "activityType": "IN_PASSENGER_VEHICLE",
+            }
+        }
+    else:
+        yield {
+            "startTime": duration["startTimestamp"],
+            "endTime": duration["endTimestamp"],
+            "timelinePath": [
+                {"point": _geo(lat, lng), "durationMinutesOffsetFromStartTime": str(minute)}
+                for lat, lng, minute in f["points"]
+            ],
+        }
+
+
+def iter_synthetic_segments(count: int, schema: str = ARRAY, seed: int = 0, revision: int = 0):
+    """Yields exactly `count` raw segments of a synthetic export."""
+    render = _array_segments if schema == ARRAY else _semantic_segments
+    produced = 0
+    for kind, fields in _ExportHistory(seed, revision).days():
+        for segment in render(kind, fields):
+            if produced == count:
+                return
+            yield segment
+            produced += 1
+
+
+def write_synthetic_export(fp, count: int, schema: str = ARRAY, seed: int = 0, revision: int = 0) -> None:
+    """Writes a `count`-segment synthetic export to the text file `fp`."""
+    if schema not in SCHEMAS:
+        raise ValueError(f"Unknown export schema {schema!r} (expected one of {', '.join(SCHEMAS)})")
+    fp.write("[\n" if schema == ARRAY else '{\n"semanticSegments": [\n')
+    for i, segment in enumerate(iter_synthetic_segments(count, schema, seed, revision)):
+        if i:
+            fp.write(",\n")
+        fp.write(json.dumps(segment, separators=(",", ":")))
+    if schema == ARRAY:
+        fp.write("\n]\n")
+    else:
+        # real wrapped exports carry more top-level data after the segments,
+        # which the streaming reader should never get as far as reading
+        fp.write('\n],\n"rawSignals": [],\n"userLocationProfile": {"frequentPlaces": []}\n}\n')
@@ -0,0 +1,95 @@
+// Nexus Logs service worker: keeps the pages you've recently looked at so
+// they can still be read back with no signal.
+//
+// Pages are fetched network-first, so you always see current data when
+// there is a connection. Those fetches still go through the browser's HTTP
+// cache, so an unchanged day costs a bodiless 304, not a re-rendered page.
+// A copy of each page goes into the cache. Offline, the last copy is served
+// instead. Only the most recently viewed MAX_PAGES pages are kept.
+var CACHE = "nexus-pages-v1";
+var MAX_PAGES = 60;
+var PAGES = [
+  /^\/$/,
+  /^\/timeline\/$/,
+  /^\/timeline\/page\/$/,
+  /^\/entry\/\d+\/form\/$/,
+  /^\/reports\/$/,
+  /^\/search\/$/
+];
+// The stylesheet script the pages load from a CDN, kept so cached pages
+// still render properly offline.
+var ASSETS = ["https://cdn.tailwindcss.com/"];
+
+self.addEventListener("install", function () {
+  self.skipWaiting();
+});
+
+self.addEventListener("activate", function (event) {
+  event.waitUntil(
+    caches.keys()
+      .then(function (names) {
+        return Promise.all(names.filter(function (name) { return name !== CACHE; })
+          .map(function (name) { return caches.delete(name); }));
+      })
+      .then(function () { return self.clients.claim(); })
+  );
+});
+
+function remember(request, response) {
+  return caches.open(CACHE).then(function (cache) {
+    // delete first, so a page seen again moves to the newest end
+    return cache.delete(request)
+      .then(function () { return cache.put(request, response); })
+      .then(function () { return cache.keys(); })
+      .then(function (requests) {
+        var pages = requests.filter(function (r) { return ASSETS.indexOf(r.url) === -1; });
+        return Promise.all(pages.slice(0, Math.max(0, pages.length - MAX_PAGES))
+          .map(function (r) { return cache.delete(r); }));
+      });
+  });
+}
+
+function offline() {
+  return new Response(
+    "<!DOCTYPE html><meta name='viewport' content='width=device-width, initial-scale=1'>" +
+    "<title>Offline · Nexus Logs</title><body style='font-family:sans-serif;padding:2rem;color:#334155'>" +
+    "<h1 style='font-size:1.2rem'>You're offline</h1>" +
+    "<p>This page hasn't been opened on this phone before, so there's no saved copy of it. " +
+    "Days you've already viewed are still available.</p></body>",
+    { status: 503, headers: { "Content-Type": "text/html; charset=utf-8" } }
+  );
+}
+
+self.addEventListener("fetch", function (event) {
+  var request = event.request;
+  if (request.method !== "GET") return;
+  var url = new URL(request.url);
+
+  if (ASSETS.indexOf(url.origin + url.pathname) !== -1) {
+    event.respondWith(
+      caches.match(request).then(function (hit) {
+        return hit || fetch(request).then(function (response) {
+          var copy = response.clone();
+          caches.open(CACHE).then(function (cache) { cache.put(request, copy); });
+          return response;
+        });
+      })
+    );
+    return;
+  }
+
+  if (url.origin !== self.location.origin) return;
+  if (!PAGES.some(function (page) { return page.test(url.pathname); })) return;
+  event.respondWith(
+    fetch(request)
+      .then(function (response) {
+        if (response.ok) event.waitUntil(remember(request, response.clone()));
+        return response;
+      })
+      .catch(function () {
+        return caches.match(request).then(function (hit) {
+          return hit || (request.mode === "navigate" ? offline() : Response.error());
+        });
+      })
+  );
+});
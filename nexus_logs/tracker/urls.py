@@ -4,10 +4,21 @@ from . import views
 
 urlpatterns = [
     path("", views.dashboard, name="dashboard"),
+    path("timeline/", views.timeline, name="timeline"),
+    path("timeline/page/", views.timeline_page, name="timeline_page"),
+    path("search/", views.search, name="search"),
     path("upload/", views.upload_timeline, name="upload_timeline"),
+    path("upload/jobs/<int:pk>/", views.import_job_progress, name="import_job_progress"),
+    path("entry/<int:pk>/route/", views.drive_route, name="drive_route"),
+    path("entry/<int:pk>/form/", views.entry_form, name="entry_form"),
     path("entry/<int:pk>/edit/", views.edit_entry, name="edit_entry"),
     path("entry/<int:pk>/delete/", views.delete_entry, name="delete_entry"),
+    path("parts/autocomplete/", views.parts_autocomplete, name="parts_autocomplete"),
     path("manual-entry/", views.manual_entry, name="manual_entry"),
+    path("reports/", views.report_view, name="reports"),
     path("export/", views.export, name="export"),
+    path("sw.js", views.service_worker, name="service_worker"),
     path("config/", views.config_view, name="config"),
+    path("config/areas/add/", views.add_geofence, name="add_geofence"),
+    path("config/areas/<int:pk>/delete/", views.delete_geofence, name="delete_geofence"),
 ]
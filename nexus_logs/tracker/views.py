@@ -1,20 +1,33 @@
 import csv
 import datetime as dt
-import json
+import hashlib
+import tempfile
 
 from django.contrib import messages
 from django.db import transaction
-from django.http import HttpResponse
+from django.db.models import Count, Exists, Max, OuterRef, Q
+from django.db.models.functions import Length
+from django.http import FileResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.template.defaultfilters import pluralize
 from django.urls import reverse
 from django.utils import timezone
-
-from .forms import ConfigForm, JobEntryForm, ManualEntryForm, UploadTimelineForm
-from .models import AppConfig, TimelineEntry
-from .parsers import TimelineParseError, parse_timeline
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+
+from . import reports
+from .forms import ConfigForm, GeoFenceForm, JobEntryForm, ManualEntryForm, UploadTimelineForm
+from .geofence import retag_all, tag_entries
+from .jobs import enqueue_import
+from .models import AppConfig, DaySummary, DrivePath, GeoFence, ImportJob, TimelineEntry
+from .parts import release_part_items, suggest_parts, sync_part_items
+from .paths import iter_route_geojson
+from .places import name_unnamed_visits, remember_place
+from .search import search_entries
 
 try:
     from openpyxl import Workbook
+    from openpyxl.utils import get_column_letter
 except ImportError:  # pragma: no cover - openpyxl is in requirements.txt
     Workbook = None
 
@@ -68,6 +81,65 @@ def _date_range_from_request(request):
     return start_date, end_date
 
 
+# Conditional GETs for the dashboard and exports: a browser re-requesting
+# the same range gets a bodiless 304 unless something in that range has
+# changed since. The validators come from aggregates that every write
+# already maintains — each entry's updated_at, the day summaries that
+# every change refreshes (which also catch deletions and retags, neither
+# of which touches an entry's updated_at), and the number of stored routes.
+# A few cheap indexed aggregates instead of rendering the page.
+def _range_state(request) -> dict:
+    """Validators for the date range in `request`, computed once per
+    request (the ETag and Last-Modified checks both need them). None when
+    the page can't be served from a cached copy."""
+    if not hasattr(request, "_range_state"):
+        request._range_state = None
+        # a pending flash message or a running import makes the page
+        # different from any earlier copy, whatever the data says
+        if not len(messages.get_messages(request)) and not ImportJob.objects.filter(
+            status__in=[ImportJob.PENDING, ImportJob.RUNNING]
+        ).exists():
+            # the same range the view itself will use
+            if request.GET.get("report"):
+                start_date, end_date = _report_range_from_request(request)
+            else:
+                start_date, end_date = _date_range_from_request(request)
+            entries = TimelineEntry.objects.filter(
+                visit_date__gte=start_date, visit_date__lte=end_date
+            ).aggregate(count=Count("pk"), changed=Max("updated_at"))
+            days = DaySummary.objects.filter(date__gte=start_date, date__lte=end_date).aggregate(
+                count=Count("pk"), changed=Max("updated_at")
+            )
+            routes = DrivePath.objects.filter(
+                entry__visit_date__gte=start_date, entry__visit_date__lte=end_date
+            ).count()
+            config = AppConfig.get_solo()
+            request._range_state = {
+                "last_modified": max(filter(None, [entries["changed"], days["changed"]]), default=None),
+                "key": (
+                    start_date, end_date, entries["count"], entries["changed"], days["count"],
+                    days["changed"], routes, config.home_address, config.default_export_format,
+                ),
+            }
+    return request._range_state
+
+
+def _range_etag(request, *args, **kwargs):
+    state = _range_state(request)
+    return state and hashlib.md5(repr(state["key"]).encode()).hexdigest()
+
+
+def _range_last_modified(request, *args, **kwargs):
+    state = _range_state(request)
+    return state and state["last_modified"]
+
+
+# Whether a drive has a stored route, without loading the route itself.
+_has_path = Exists(DrivePath.objects.filter(entry=OuterRef("pk")))
+
+
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_range_etag, last_modified_func=_range_last_modified)
 def dashboard(request):
     start_date, end_date = _date_range_from_request(request)
     show_home = request.GET.get("show_home") == "1"
@@ -75,152 +147,201 @@ def dashboard(request):
     entries = TimelineEntry.objects.filter(visit_date__gte=start_date, visit_date__lte=end_date)
 
     config = AppConfig.get_solo()
-    if config.home_address and not show_home:
-        entries = entries.exclude(location_name__icontains=config.home_address).exclude(
-            address__icontains=config.home_address
-        )
+    # is_home is precomputed from the home address and any home geo-fence
+    # (tracker.geofence), so hiding home visits is an indexed lookup
+    hide_home = not show_home
+    if hide_home:
+        entries = entries.exclude(is_home=True)
 
-    entries = list(entries.order_by("start_time"))
+    entries = list(entries.annotate(has_path=_has_path).order_by("start_time"))
 
     days = {}
     for entry in entries:
         days.setdefault(entry.visit_date, []).append(entry)
 
+    # Day headers and range totals come from the pre-aggregated DaySummary
+    # rows (one per day) rather than re-summing every entry here. The days
+    # themselves come from the entries, so a day whose summary is missing
+    # (an entry written outside the views and the importer) still shows,
+    # totalled from its entries.
+    summaries = {
+        summary.date: summary
+        for summary in DaySummary.objects.filter(date__gte=start_date, date__lte=end_date)
+    }
     day_summaries = []
-    for day in sorted(days.keys()):
-        day_entries = days[day]
-        drives = [e for e in day_entries if e.entry_type == TimelineEntry.DRIVE]
-        visits = [e for e in day_entries if e.entry_type == TimelineEntry.VISIT]
+    range_totals = {"visit_count": 0, "drive_minutes": 0, "drive_km": 0}
+    for date in sorted(summaries.keys() | days.keys()):
+        day_entries = days.get(date, [])
+        summary = summaries.get(date)
+        if summary is not None:
+            visit_count = summary.visible_visit_count(hide_home)
+            drive_minutes, drive_km = summary.drive_minutes, summary.drive_km
+        else:
+            drives = [e for e in day_entries if e.entry_type == TimelineEntry.DRIVE]
+            visit_count = len(day_entries) - len(drives)
+            drive_minutes = sum(e.duration_minutes or 0 for e in drives)
+            drive_km = sum(e.distance_km or 0 for e in drives)
+        range_totals["visit_count"] += visit_count
+        range_totals["drive_minutes"] += drive_minutes
+        range_totals["drive_km"] += drive_km
+
+        if not day_entries:
+            continue  # e.g. a day with nothing but hidden home visits
         day_summaries.append(
             {
-                "date": day,
+                "date": date,
                 "entries": day_entries,
-                "visit_count": len(visits),
-                "drive_minutes": sum(e.duration_minutes or 0 for e in drives),
-                "drive_km": round(sum(e.distance_km or 0 for e in drives), 1),
-                "job_forms": {e.pk: JobEntryForm(instance=e) for e in visits},
+                "visit_count": visit_count,
+                "drive_minutes": drive_minutes,
+                "drive_km": round(drive_km, 1),
             }
         )
+    range_totals["drive_km"] = round(range_totals["drive_km"], 1)
 
     context = {
         "day_summaries": day_summaries,
+        "range_totals": range_totals,
         "start_date": start_date,
         "end_date": end_date,
         "show_home": show_home,
         "config": config,
         "has_entries": bool(entries),
+        "active_jobs": ImportJob.objects.filter(status__in=[ImportJob.PENDING, ImportJob.RUNNING]),
     }
     return render(request, "tracker/dashboard.html", context)
 
 
-# Fields Google's own data can legitimately refine between exports (e.g. an
-# in-progress visit's end_time growing once you've actually left). Never
-# includes location_name/address/parts_used/comments — those may have been
-# typed in by the user and a re-import must not clobber them.
-_REFINABLE_FIELDS = ["end_time", "distance_km", "latitude", "longitude", "raw_data"]
-
-
-def _identity_key(entry: dict):
-    """The stable identity Google reuses for 'the same' visit/drive across
-    re-exports. Visits key on their place_id (stable even if start/end get
-    refined); drives have no place_id but can't physically overlap for one
-    phone, so start_time alone is safe. See the UniqueConstraints on
-    TimelineEntry for the DB-level backstop of this same logic."""
-    if entry["entry_type"] == TimelineEntry.VISIT:
-        return (TimelineEntry.VISIT, entry.get("place_id"), entry["start_time"])
-    return (TimelineEntry.DRIVE, None, entry["start_time"])
-
-
-def _import_parsed_entries(parsed: list) -> tuple:
-    """Creates new TimelineEntry rows for segments never seen before, and
-    refines already-imported ones in place (see _REFINABLE_FIELDS) instead
-    of either duplicating them or leaving stale end times when the same
-    Timeline export is re-uploaded — which happens on every import, since
-    Google only offers a full-history export, not an incremental one.
-    Returns (created_count, updated_count).
-    """
-    if not parsed:
-        return 0, 0
-
-    min_date = min(e["start_time"] for e in parsed).date() - dt.timedelta(days=1)
-    max_date = max(e["end_time"] for e in parsed).date() + dt.timedelta(days=1)
-    existing = {
-        _identity_key(
-            {
-                "entry_type": e.entry_type,
-                "place_id": e.place_id,
-                "start_time": e.start_time,
-            }
-        ): e
-        for e in TimelineEntry.objects.filter(
-            source=TimelineEntry.GOOGLE, visit_date__gte=min_date, visit_date__lte=max_date
+# The timeline browser pages through every entry newest-first by keyset
+# rather than OFFSET: each page starts strictly after the last row of the
+# previous one in (visit_date, start_time, id) order, which is exactly the
+# order of the (visit_date, start_time) index (SQLite appends the rowid to
+# every index entry). So the database seeks straight to the cursor and
+# reads one page of rows, however far back the user has scrolled.
+TIMELINE_PAGE_SIZE = 50
+TIMELINE_MAX_PAGE_SIZE = 200
+_EPOCH = dt.datetime(1970, 1, 1, tzinfo=dt.timezone.utc)
+
+
+def _encode_cursor(entry: TimelineEntry) -> str:
+    micros = (entry.start_time - _EPOCH) // dt.timedelta(microseconds=1)
+    return f"{entry.visit_date.isoformat()}.{micros}.{entry.pk}"
+
+
+def _decode_cursor(value: str):
+    """'2025-03-01.1740808800000000.123' -> (date, aware datetime, pk), or
+    None if the cursor is malformed."""
+    try:
+        date_str, micros, pk = value.split(".")
+        return (
+            dt.date.fromisoformat(date_str),
+            _EPOCH + dt.timedelta(microseconds=int(micros)),
+            int(pk),
+        )
+    except (ValueError, OverflowError):
+        return None
+
+
+def _timeline_page(entries, cursor, limit: int):
+    """One page of `entries` after `cursor` (or from the top), plus the
+    cursor for the page after it (None on the last page)."""
+    entries = entries.order_by("-visit_date", "-start_time", "-id")
+    if cursor is not None:
+        visit_date, start_time, pk = cursor
+        # visit_date__lte is the index range; the OR picks up where the
+        # last page stopped within that first day
+        entries = entries.filter(visit_date__lte=visit_date).filter(
+            Q(visit_date__lt=visit_date)
+            | Q(start_time__lt=start_time)
+            | Q(start_time=start_time, id__lt=pk)
         )
+    page = list(entries.annotate(has_path=_has_path)[: limit + 1])
+    next_cursor = _encode_cursor(page[limit - 1]) if len(page) > limit else None
+    return page[:limit], next_cursor
+
+
+def _timeline_entry_json(entry: TimelineEntry) -> dict:
+    day = entry.visit_date.isoformat()
+    return {
+        "id": entry.pk,
+        "type": entry.entry_type,
+        "source": entry.source,
+        "date": day,
+        "start": timezone.localtime(entry.start_time).strftime("%H:%M"),
+        "end": timezone.localtime(entry.end_time).strftime("%H:%M"),
+        "duration_minutes": entry.duration_minutes,
+        "distance_km": entry.distance_km,
+        "name": entry.display_name,
+        "address": entry.address,
+        "job_logged": bool(entry.parts_used or entry.comments),
+        "maps_link": entry.maps_link,
+        "day_url": f"{reverse('dashboard')}?start_date={day}&end_date={day}",
+        "route_url": reverse("drive_route", args=[entry.pk]) if entry.has_path else None,
     }
 
-    to_create = []
-    to_update = []
-    seen_in_batch = set()
-    for entry in parsed:
-        key = _identity_key(entry)
-        if key in seen_in_batch:
-            continue  # the export itself repeated this segment
-        seen_in_batch.add(key)
-
-        match = existing.get(key)
-        if match is None:
-            to_create.append(
-                TimelineEntry(
-                    source=TimelineEntry.GOOGLE,
-                    visit_date=entry["start_time"].date(),
-                    **entry,
-                )
-            )
-            continue
-
-        changed = False
-        for field in _REFINABLE_FIELDS:
-            new_value = entry.get(field)
-            if new_value is not None and getattr(match, field) != new_value:
-                setattr(match, field, new_value)
-                changed = True
-        if changed:
-            to_update.append(match)
-
-    with transaction.atomic():
-        created = TimelineEntry.objects.bulk_create(
-            to_create, batch_size=500, ignore_conflicts=True
-        )
-        if to_update:
-            TimelineEntry.objects.bulk_update(to_update, _REFINABLE_FIELDS, batch_size=500)
 
-    return len(created), len(to_update)
+def timeline(request):
+    """Infinite-scroll browser over the whole history; the rows themselves
+    come from timeline_page as the user scrolls."""
+    context = {
+        "show_home": request.GET.get("show_home") == "1",
+        "from_date": _parse_date(request.GET.get("from"), None),
+    }
+    return render(request, "tracker/timeline.html", context)
+
+
+def timeline_page(request):
+    """JSON page of timeline entries, newest first. Pass the previous
+    response's `next` as `?cursor=` for the following page; `?from=` starts
+    the first page at the end of a given day instead of the newest entry."""
+    try:
+        limit = min(int(request.GET.get("limit", TIMELINE_PAGE_SIZE)), TIMELINE_MAX_PAGE_SIZE)
+    except ValueError:
+        limit = TIMELINE_PAGE_SIZE
+    limit = max(limit, 1)
+
+    entries = TimelineEntry.objects.all()
+    if request.GET.get("show_home") != "1":
+        entries = entries.exclude(is_home=True)
+
+    cursor = None
+    if request.GET.get("cursor"):
+        cursor = _decode_cursor(request.GET["cursor"])
+        if cursor is None:
+            return JsonResponse({"error": "Invalid cursor."}, status=400)
+    else:
+        from_date = _parse_date(request.GET.get("from"), None)
+        if from_date is not None:
+            entries = entries.filter(visit_date__lte=from_date)
+
+    page, next_cursor = _timeline_page(entries, cursor, limit)
+    return JsonResponse({"entries": [_timeline_entry_json(e) for e in page], "next": next_cursor})
+
+
+def search(request):
+    """Ranked full-text search over visits' names, addresses, parts and
+    comments (tracker.search)."""
+    query = request.GET.get("q", "").strip()
+    context = {"query": query, "results": search_entries(query) if query else []}
+    return render(request, "tracker/search.html", context)
 
 
 def upload_timeline(request):
+    """Saves the export and queues it for the background worker, then
+    returns straight away — parsing and importing a multi-year file can
+    take far longer than a gunicorn worker will hold a request open. The
+    dashboard polls `import_job_progress` until it's done."""
     if request.method == "POST":
         form = UploadTimelineForm(request.POST, request.FILES)
         if form.is_valid():
             uploaded = request.FILES["timeline_file"]
-            try:
-                data = json.load(uploaded)
-            except (json.JSONDecodeError, UnicodeDecodeError):
-                messages.error(request, "That file isn't valid JSON.")
-                return render(request, "tracker/upload.html", {"form": form})
-
-            try:
-                parsed = parse_timeline(data)
-            except TimelineParseError as exc:
-                messages.error(request, str(exc))
-                return render(request, "tracker/upload.html", {"form": form})
-
-            created_count, updated_count = _import_parsed_entries(parsed)
-            skipped_count = len(parsed) - created_count - updated_count
+            with transaction.atomic():
+                job = ImportJob.objects.create(upload=uploaded, original_name=uploaded.name)
+                enqueue_import(job)
 
             messages.success(
                 request,
-                f"Processed {len(parsed)} timeline segments: "
-                f"{created_count} new, {updated_count} refined (e.g. an in-progress "
-                f"visit's end time), {skipped_count} unchanged.",
+                f"Import #{job.pk} queued — progress is shown below and the "
+                "new entries appear as soon as it finishes.",
             )
             return redirect(reverse("dashboard"))
     else:
@@ -229,16 +350,61 @@ def upload_timeline(request):
     return render(request, "tracker/upload.html", {"form": form})
 
 
+def import_job_progress(request, pk):
+    job = get_object_or_404(ImportJob, pk=pk)
+    return JsonResponse(job.progress())
+
+
+def drive_route(request, pk):
+    """A drive's breadcrumb route as GeoJSON, streamed a chunk of points at
+    a time (see tracker.paths)."""
+    route = get_object_or_404(DrivePath.objects.select_related("entry"), entry_id=pk)
+    return StreamingHttpResponse(iter_route_geojson(route), content_type="application/geo+json")
+
+
+def entry_form(request, pk):
+    """Just one visit's job-details form, as an HTML fragment. The dashboard
+    fetches it when that visit's panel is first opened, rather than building
+    a JobEntryForm for every visit in the range on each page load."""
+    entry = get_object_or_404(TimelineEntry, pk=pk, entry_type=TimelineEntry.VISIT)
+    context = {
+        "entry": entry,
+        "form": JobEntryForm(instance=entry),
+        "next": _back_to_dashboard(request),
+    }
+    return render(request, "tracker/entry_form.html", context)
+
+
 def edit_entry(request, pk):
     entry = get_object_or_404(TimelineEntry, pk=pk, entry_type=TimelineEntry.VISIT)
     if request.method == "POST":
         form = JobEntryForm(request.POST, instance=entry)
         if form.is_valid():
-            form.save()
-            messages.success(request, f"Saved job details for {entry.display_name}.")
+            with transaction.atomic():
+                entry = form.save(commit=False)
+                tag_entries([entry])  # a renamed visit may now match the home address
+                entry.save()
+                if "parts_used" in form.changed_data:
+                    sync_part_items(entry)
+                DaySummary.refresh([entry.visit_date])
+                named = 0
+                if {"location_name", "address"} & set(form.changed_data):
+                    place = remember_place(entry)
+                    if place is not None:
+                        named = name_unnamed_visits(place)
+            message = f"Saved job details for {entry.display_name}."
+            if named:
+                message += f" Also named {named} other unnamed visit{pluralize(named)} to the same place."
+            messages.success(request, message)
     return redirect(_back_to_dashboard(request))
 
 
+def parts_autocomplete(request):
+    """Previously used part names starting with ?q=, most used first, for
+    the parts_used fields' suggestions."""
+    return JsonResponse({"parts": suggest_parts(request.GET.get("q", ""))})
+
+
 def _back_to_dashboard(request):
     next_url = request.POST.get("next") or request.GET.get("next")
     return next_url or reverse("dashboard")
@@ -250,7 +416,7 @@ def manual_entry(request):
         if form.is_valid():
             cd = form.cleaned_data
             with transaction.atomic():
-                visit = TimelineEntry.objects.create(
+                visit = TimelineEntry(
                     entry_type=TimelineEntry.VISIT,
                     source=TimelineEntry.MANUAL,
                     location_name=cd["location_name"],
@@ -260,16 +426,22 @@ def manual_entry(request):
                     parts_used=cd["parts_used"],
                     comments=cd["comments"],
                 )
+                tag_entries([visit])
+                visit.save()
+                sync_part_items(visit)
+                touched_dates = {visit.visit_date}
                 if cd["estimated_drive_minutes"]:
                     drive_end = cd["arrival_time"]
                     drive_start = drive_end - dt.timedelta(minutes=cd["estimated_drive_minutes"])
-                    TimelineEntry.objects.create(
+                    drive = TimelineEntry.objects.create(
                         entry_type=TimelineEntry.DRIVE,
                         source=TimelineEntry.MANUAL,
                         location_name="Driving",
                         start_time=drive_start,
                         end_time=drive_end,
                     )
+                    touched_dates.add(drive.visit_date)
+                DaySummary.refresh(touched_dates)
             messages.success(request, f"Added {visit.display_name} to the log.")
             return redirect(f"{reverse('dashboard')}?start_date={visit.visit_date}&end_date={visit.visit_date}")
     else:
@@ -287,61 +459,241 @@ def delete_entry(request, pk):
     entry = get_object_or_404(TimelineEntry, pk=pk)
     if request.method == "POST":
         name = entry.display_name if entry.entry_type == TimelineEntry.VISIT else "drive"
-        entry.delete()
+        with transaction.atomic():
+            release_part_items(entry)
+            entry.delete()
+            DaySummary.refresh([entry.visit_date])
         messages.success(request, f"Deleted {name}.")
     return redirect(_back_to_dashboard(request))
 
 
+# Rows are pulled from the database this many at a time while an export
+# streams, rather than materialising the whole range first.
+EXPORT_CHUNK_SIZE = 2000
+
+# Longest value each fixed-format export column can hold (dates, choice
+# labels, numbers); the free-text columns are measured in SQL instead.
+_FIXED_EXPORT_WIDTHS = {
+    "Date": 10,
+    "Type": 5,
+    "Source": 15,
+    "Start": 16,
+    "End": 16,
+    "Duration (min)": 6,
+    "Distance (km)": 8,
+}
+_FREE_TEXT_EXPORT_FIELDS = {
+    "Location": "location_name",
+    "Address": "address",
+    "Parts Used": "parts_used",
+    "Comments": "comments",
+}
+
+
+class _Echo:
+    """csv.writer target that hands each formatted row straight back, so
+    rows can be yielded to a StreamingHttpResponse one at a time."""
+
+    def write(self, value):
+        return value
+
+
+def _stream_csv(entries):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_HEADERS)
+    for entry in entries.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield writer.writerow(_entry_export_row(entry))
+
+
+def _export_column_widths(entries) -> list:
+    """XLSX column widths, worked out before any row is written (a
+    write-only sheet can't go back and resize). Free-text columns take
+    their longest value from one aggregate query over the range."""
+    longest = entries.order_by().aggregate(
+        **{field: Max(Length(field)) for field in _FREE_TEXT_EXPORT_FIELDS.values()}
+    )
+    widths = []
+    for header in EXPORT_HEADERS:
+        if header in _FREE_TEXT_EXPORT_FIELDS:
+            content = longest[_FREE_TEXT_EXPORT_FIELDS[header]] or 0
+        else:
+            content = _FIXED_EXPORT_WIDTHS.get(header, 0)
+        length = max(len(header), content)
+        widths.append(min(max(length + 2, 10), 50))
+    return widths
+
+
+def _write_xlsx(entries, fileobj) -> None:
+    """Constant-memory XLSX: openpyxl's write-only mode streams each row
+    to disk as it's appended instead of building the sheet in memory."""
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Nexus Logs")
+    for index, width in enumerate(_export_column_widths(entries), start=1):
+        ws.column_dimensions[get_column_letter(index)].width = width
+    ws.append(EXPORT_HEADERS)
+    for entry in entries.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        ws.append(_entry_export_row(entry))
+    wb.save(fileobj)
+
+
+def _report_range_from_request(request):
+    """Like _date_range_from_request, but defaulting to the current month
+    so far — reports are mostly run at month end."""
+    today = timezone.localdate()
+    start_date = _parse_date(request.GET.get("start_date"), today.replace(day=1))
+    end_date = _parse_date(request.GET.get("end_date"), today)
+    if end_date < start_date:
+        start_date, end_date = end_date, start_date
+    return start_date, end_date
+
+
+def _report_period_from_request(request) -> str:
+    period = request.GET.get("period")
+    return period if period in dict(reports.PERIOD_CHOICES) else reports.DAY
+
+
+def report_view(request):
+    start_date, end_date = _report_range_from_request(request)
+    period = _report_period_from_request(request)
+    context = {
+        "report": reports.build_report(period, start_date, end_date),
+        "parts": reports.parts_usage(start_date, end_date),
+        "period": period,
+        "period_choices": reports.PERIOD_CHOICES,
+        "start_date": start_date,
+        "end_date": end_date,
+        "config": AppConfig.get_solo(),
+    }
+    return render(request, "tracker/reports.html", context)
+
+
+def _export_report(request, fmt: str):
+    start_date, end_date = _report_range_from_request(request)
+    period = _report_period_from_request(request)
+    report = reports.build_report(period, start_date, end_date)
+    rows = [reports.report_export_row(row) for row in report["rows"]]
+    rows.append(["Total", *reports.report_export_row({**report["totals"], "period": None})[1:]])
+    filename = f"nexus-logs_{period}-report_{start_date}_{end_date}.{fmt}"
+
+    if fmt == AppConfig.XLSX:
+        # a report is one row per day/week/month, so it's small enough to
+        # build in memory
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("Report")
+        for index, header in enumerate(reports.REPORT_HEADERS, start=1):
+            ws.column_dimensions[get_column_letter(index)].width = max(len(header) + 2, 12)
+        ws.append(reports.REPORT_HEADERS)
+        for row in rows:
+            ws.append(row)
+        tmp = tempfile.TemporaryFile()
+        wb.save(tmp)
+        tmp.seek(0)
+        return FileResponse(
+            tmp,
+            as_attachment=True,
+            filename=filename,
+            content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        )
+
+    writer = csv.writer(_Echo())
+    lines = [writer.writerow(reports.REPORT_HEADERS), *(writer.writerow(row) for row in rows)]
+    response = StreamingHttpResponse(lines, content_type="text/csv")
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_range_etag, last_modified_func=_range_last_modified)
 def export(request):
-    start_date, end_date = _date_range_from_request(request)
+    """The full entry log for the range as CSV/XLSX — or, with
+    ?report=day|week|month, the invoicing report's totals instead."""
     config = AppConfig.get_solo()
     fmt = request.GET.get("format") or config.default_export_format
 
-    entries = TimelineEntry.objects.filter(
-        visit_date__gte=start_date, visit_date__lte=end_date
-    ).order_by("start_time")
+    if fmt == AppConfig.XLSX and Workbook is None:
+        messages.error(request, "openpyxl isn't installed — falling back to CSV.")
+        fmt = AppConfig.CSV
+
+    if request.GET.get("report"):
+        return _export_report(request, fmt)
+
+    start_date, end_date = _date_range_from_request(request)
 
+    entries = (
+        TimelineEntry.objects.filter(visit_date__gte=start_date, visit_date__lte=end_date)
+        .order_by("start_time")
+    )
     filename = f"nexus-logs_{start_date}_{end_date}.{fmt}"
 
     if fmt == AppConfig.XLSX:
-        if Workbook is None:
-            messages.error(request, "openpyxl isn't installed — falling back to CSV.")
-            fmt = AppConfig.CSV
-        else:
-            wb = Workbook()
-            ws = wb.active
-            ws.title = "Nexus Logs"
-            ws.append(EXPORT_HEADERS)
-            for entry in entries:
-                ws.append(_entry_export_row(entry))
-            for column_cells in ws.columns:
-                length = max(len(str(cell.value)) if cell.value is not None else 0 for cell in column_cells)
-                ws.column_dimensions[column_cells[0].column_letter].width = min(max(length + 2, 10), 50)
-
-            response = HttpResponse(
-                content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-            )
-            response["Content-Disposition"] = f'attachment; filename="{filename}"'
-            wb.save(response)
-            return response
+        # A zip can't be sent until it's finished, so the workbook is built
+        # in a temp file (never in memory) and then streamed from disk.
+        tmp = tempfile.TemporaryFile()
+        _write_xlsx(entries, tmp)
+        tmp.seek(0)
+        return FileResponse(
+            tmp,
+            as_attachment=True,
+            filename=filename,
+            content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        )
 
-    response = HttpResponse(content_type="text/csv")
+    response = StreamingHttpResponse(_stream_csv(entries), content_type="text/csv")
     response["Content-Disposition"] = f'attachment; filename="{filename}"'
-    writer = csv.writer(response)
-    writer.writerow(EXPORT_HEADERS)
-    for entry in entries:
-        writer.writerow(_entry_export_row(entry))
     return response
 
 
+@cache_control(no_cache=True)
+def service_worker(request):
+    """The offline-caching service worker. Served from the site root
+    rather than /static/ because a worker only controls pages under its
+    own path."""
+    return render(request, "tracker/sw.js", content_type="application/javascript")
+
+
 def config_view(request):
     config = AppConfig.get_solo()
     if request.method == "POST":
         form = ConfigForm(request.POST, instance=config)
         if form.is_valid():
-            form.save()
+            with transaction.atomic():
+                form.save()
+                if "home_address" in form.changed_data:
+                    retag_all()  # every visit's is_home may have changed
             messages.success(request, "Settings saved.")
             return redirect(reverse("config"))
     else:
         form = ConfigForm(instance=config)
-    return render(request, "tracker/config.html", {"form": form})
+    context = {
+        "form": form,
+        "geofence_form": GeoFenceForm(),
+        "geofences": GeoFence.objects.annotate(entry_count=Count("entries")),
+    }
+    return render(request, "tracker/config.html", context)
+
+
+def add_geofence(request):
+    if request.method == "POST":
+        form = GeoFenceForm(request.POST)
+        if form.is_valid():
+            with transaction.atomic():
+                fence = form.save()
+                retag_all()
+            messages.success(
+                request, f"Added {fence.name} — {fence.entries.count()} visits fall inside it."
+            )
+        else:
+            messages.error(request, "Couldn't add that area: " + " ".join(
+                error for errors in form.errors.values() for error in errors
+            ))
+    return redirect(reverse("config"))
+
+
+def delete_geofence(request, pk):
+    fence = get_object_or_404(GeoFence, pk=pk)
+    if request.method == "POST":
+        with transaction.atomic():
+            fence.delete()
+            retag_all()
+        messages.success(request, f"Removed {fence.name}.")
+    return redirect(reverse("config"))
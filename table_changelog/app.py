@@ -8,6 +8,8 @@ from __future__ import annotations
 
 import json
 import os
+import sqlite3
+from datetime import datetime
 from typing import Any, Optional
 
 import pandas as pd
@@ -113,6 +115,16 @@ def parse_json(s: Optional[str]) -> dict:
         return {}
 
 
+def audit_subject(row: dict, labels: dict[int, dict]) -> dict:
+    """The values to label an audit row by (SKU, ProductName). A delta row
+    carries them only when they changed; otherwise they come from
+    `labels` — see demo_db.get_record_labels."""
+    after = parse_json(row["AfterData"])
+    if row["IsDelta"]:
+        return {**labels.get(row["RecordID"], {}), **after}
+    return after or parse_json(row["BeforeData"])
+
+
 def diff_html(before: dict, after: dict) -> str:
     rows = []
     for k in sorted(set(before) | set(after)):
@@ -161,7 +173,8 @@ with st.sidebar:
 
     page = st.radio(
         "nav",
-        ["📊 Dashboard", "🔍 Audit Log", "📦 Inventory", "⚡ Operations", "⚙️ Configuration"],
+        ["📊 Dashboard", "🔍 Audit Log", "📦 Inventory", "🕰️ Time Travel",
+         "⚡ Operations", "⚙️ Configuration"],
         label_visibility="collapsed",
     )
 
@@ -169,7 +182,6 @@ with st.sidebar:
     st.caption("Running in **Demo Mode** (SQLite)")
     if st.button("↺ Reset demo data", use_container_width=True):
         demo_db.reset_database()
-        demo_db.init_database()
         demo_db.seed_demo_data()
         st.cache_resource.clear()
         st.rerun()
@@ -179,11 +191,11 @@ with st.sidebar:
 # PAGE: Dashboard
 # ===========================================================================
 
-def page_dashboard() -> None:
+def page_dashboard(conn: sqlite3.Connection) -> None:
     st.title("📊 Dashboard")
     st.caption("Real-time summary of all tracked table changes")
 
-    stats = demo_db.get_audit_stats()
+    stats = demo_db.get_audit_stats(conn=conn)
     by_op = stats["by_operation"]
 
     # --- Metric row 1: audit counts ---
@@ -274,9 +286,12 @@ def page_dashboard() -> None:
 
     # Recent activity feed
     st.subheader("Recent activity")
-    recent = demo_db.get_audit_logs(limit=10)
+    recent = demo_db.get_audit_logs(limit=10, conn=conn)
+    labels = demo_db.get_record_labels(
+        [r["RecordID"] for r in recent if r["IsDelta"]], conn=conn
+    )
     for row in recent:
-        data = parse_json(row["AfterData"]) or parse_json(row["BeforeData"])
+        data = audit_subject(row, labels)
         sku  = data.get("SKU", "")
         name = data.get("ProductName", "")
         st.markdown(
@@ -294,7 +309,7 @@ def page_dashboard() -> None:
 # PAGE: Audit Log
 # ===========================================================================
 
-def page_audit_log() -> None:
+def page_audit_log(conn: sqlite3.Connection) -> None:
     st.title("🔍 Audit Log")
     st.caption("Complete history of every tracked change — expandable Before/After snapshots and field-level diffs")
 
@@ -310,7 +325,7 @@ def page_audit_log() -> None:
     rec_id = int(rec_id_raw) if rec_id_raw.strip().isdigit() else None
     rows   = demo_db.get_audit_logs(
         limit=limit, operation=op,
-        record_id=rec_id, search=search or None,
+        record_id=rec_id, search=search or None, conn=conn,
     )
 
     if not rows:
@@ -334,11 +349,15 @@ def page_audit_log() -> None:
 
     st.divider()
 
-    # Rows
+    # Rows — delta rows hold only the changed columns; their full rows are
+    # rebuilt only when asked for
+    labels = demo_db.get_record_labels(
+        [r["RecordID"] for r in rows if r["IsDelta"]], conn=conn
+    )
     for row in rows:
         before = parse_json(row["BeforeData"])
         after  = parse_json(row["AfterData"])
-        data   = after or before
+        data   = audit_subject(row, labels)
         sku    = data.get("SKU", "")
         name   = data.get("ProductName", "")
 
@@ -360,12 +379,17 @@ def page_audit_log() -> None:
             )
 
             # Field-level diff for UPDATE
-            if row["Operation"] == "UPDATE" and before and after:
+            if row["Operation"] == "UPDATE" and (before or after):
                 html = diff_html(before, after)
                 if html:
                     st.markdown("**Field-level diff**")
                     st.markdown(html, unsafe_allow_html=True)
 
+            if row["IsDelta"]:
+                if not st.checkbox("Show full rows", key=f"full_{row['AuditID']}"):
+                    continue
+                before, after = demo_db.get_audit_row_images(row["AuditID"], conn=conn)
+
             # Before / After JSON
             col_b, col_a = st.columns(2)
             with col_b:
@@ -392,11 +416,11 @@ def page_audit_log() -> None:
 # PAGE: Inventory
 # ===========================================================================
 
-def page_inventory() -> None:
+def page_inventory(conn: sqlite3.Connection) -> None:
     st.title("📦 Inventory")
     st.caption("Current live state of the Inventory table")
 
-    items = demo_db.get_inventory()
+    items = demo_db.get_inventory(conn=conn)
     if not items:
         st.info("No inventory records found.")
         return
@@ -456,21 +480,79 @@ def page_inventory() -> None:
         st.plotly_chart(fig, use_container_width=True)
 
 
+# ===========================================================================
+# PAGE: Time Travel
+# ===========================================================================
+
+def page_time_travel(conn: sqlite3.Connection) -> None:
+    st.title("🕰️ Time Travel")
+    st.caption("The Inventory table as it stood at any moment, rebuilt from the audit log")
+
+    counts = demo_db.get_table_counts(conn=conn)
+    if not counts["first_change"]:
+        st.info("The audit log is empty.")
+        return
+
+    first = datetime.fromisoformat(counts["first_change"])
+    last  = datetime.fromisoformat(counts["last_change"])
+    c1, c2 = st.columns(2)
+    day  = c1.date_input("Date (UTC)", value=first.date(),
+                         min_value=first.date(), max_value=last.date())
+    tod  = c2.time_input("Time (UTC)", value=datetime.strptime("12:00", "%H:%M").time(), step=900)
+    at   = datetime.combine(day, tod)
+
+    items   = demo_db.get_inventory_at(at, conn=conn)
+    current = {r["InventoryID"]: r for r in demo_db.get_inventory(conn=conn)}
+    then    = {r["InventoryID"]: r for r in items}
+    fields  = ["SKU", "ProductName", "Category", "Quantity", "UnitPrice", "Location", "IsActive"]
+
+    m1, m2, m3, m4 = st.columns(4)
+    m1.metric("Records then", len(then))
+    m2.metric("Since deleted", sum(1 for k in then if k not in current))
+    m3.metric("Since added",   sum(1 for k in current if k not in then))
+    m4.metric("Since changed", sum(
+        1 for k, r in then.items()
+        if k in current and any(r[f] != current[k][f] for f in fields)
+    ))
+
+    st.divider()
+    if not items:
+        st.info(f"Inventory was empty at {at:%Y-%m-%d %H:%M}.")
+        return
+
+    df = pd.DataFrame(items)
+    display = df[["InventoryID", *fields]].copy()
+    display["UnitPrice"] = display["UnitPrice"].map("${:.2f}".format)
+    display["IsActive"]  = display["IsActive"].map({1: "✅", 0: "❌"})
+    display["Now"] = [
+        "deleted" if k not in current
+        else "changed" if any(then[k][f] != current[k][f] for f in fields)
+        else "" for k in df["InventoryID"]
+    ]
+    display.columns = [
+        "ID", "SKU", "Product Name", "Category",
+        "Qty", "Unit Price", "Location", "Active", "Now",
+    ]
+    st.dataframe(display, use_container_width=True, hide_index=True)
+
+
 # ===========================================================================
 # PAGE: Operations
 # ===========================================================================
 
-def page_operations() -> None:
+def page_operations(conn: sqlite3.Connection) -> None:
     st.title("⚡ Operations")
     st.caption("INSERT, UPDATE, and DELETE records — every action is captured in the audit log")
 
-    items        = demo_db.get_inventory()
+    items        = demo_db.get_inventory(conn=conn)
     item_options = {
         f"#{r['InventoryID']}  {r['SKU']}  —  {r['ProductName']}": r["InventoryID"]
         for r in items
     }
 
-    tab_ins, tab_upd, tab_del = st.tabs(["➕ Insert", "✏️ Update", "🗑️ Delete"])
+    tab_ins, tab_upd, tab_del, tab_bulk = st.tabs(
+        ["➕ Insert", "✏️ Update", "🗑️ Delete", "📚 Bulk"]
+    )
 
     # ---- INSERT ----
     with tab_ins:
@@ -501,9 +583,10 @@ def page_operations() -> None:
                     inv_id = demo_db.insert_record(
                         sku.strip(), product_name.strip(), category,
                         int(quantity), float(unit_price), location, user=ins_user,
+                        conn=conn,
                     )
                     st.success(f"Inserted InventoryID = {inv_id}")
-                    log = demo_db.get_audit_logs(limit=1, operation="INSERT", record_id=inv_id)
+                    log = demo_db.get_audit_logs(limit=1, operation="INSERT", record_id=inv_id, conn=conn)
                     if log:
                         with st.expander("Audit log entry", expanded=True):
                             st.json(parse_json(log[0]["AfterData"]))
@@ -569,9 +652,9 @@ def page_operations() -> None:
                     st.warning("Tick at least one field to update.")
                 else:
                     try:
-                        demo_db.update_record(inv_id, user=upd_user, **kwargs)
+                        demo_db.update_record(inv_id, user=upd_user, conn=conn, **kwargs)
                         st.success(f"Updated InventoryID = {inv_id}")
-                        log = demo_db.get_audit_logs(limit=1, operation="UPDATE", record_id=inv_id)
+                        log = demo_db.get_audit_logs(limit=1, operation="UPDATE", record_id=inv_id, conn=conn)
                         if log:
                             with st.expander("Audit log entry — field diff", expanded=True):
                                 b = parse_json(log[0]["BeforeData"])
@@ -606,9 +689,9 @@ def page_operations() -> None:
 
             if go_del:
                 try:
-                    demo_db.delete_record(del_id, user=del_user)
+                    demo_db.delete_record(del_id, user=del_user, conn=conn)
                     st.success(f"Deleted InventoryID = {del_id}")
-                    log = demo_db.get_audit_logs(limit=1, operation="DELETE", record_id=del_id)
+                    log = demo_db.get_audit_logs(limit=1, operation="DELETE", record_id=del_id, conn=conn)
                     if log:
                         with st.expander("Audit log entry — deleted snapshot", expanded=True):
                             st.json(parse_json(log[0]["BeforeData"]))
@@ -616,12 +699,55 @@ def page_operations() -> None:
                 except Exception as exc:
                     st.error(f"Error: {exc}")
 
+    # ---- BULK ----
+    with tab_bulk:
+        st.subheader("Reprice a category")
+        st.caption("One transaction — writes one audit row per affected record, like a multi-row UPDATE")
+        categories = sorted({r["Category"] for r in items})
+        if not categories:
+            st.info("No records available.")
+        else:
+            with st.form("form_bulk_price"):
+                c1, c2 = st.columns(2)
+                bulk_cat = c1.selectbox("Category", categories)
+                pct      = c2.number_input("Price change (%)", min_value=-90.0, max_value=500.0,
+                                           value=10.0, step=1.0, format="%.1f")
+                bulk_user = st.text_input("User", value="batch_job", key="bulk_user")
+                go_bulk   = st.form_submit_button("Apply to category", type="primary")
+
+            if go_bulk:
+                changes = [
+                    (r["InventoryID"], {"UnitPrice": round(r["UnitPrice"] * (1 + pct / 100), 2)})
+                    for r in items if r["Category"] == bulk_cat
+                ]
+                try:
+                    n = demo_db.bulk_update_records(changes, user=bulk_user, conn=conn)
+                    st.success(f"Repriced {n} record(s) in {bulk_cat}")
+                    st.rerun()
+                except Exception as exc:
+                    st.error(f"Error: {exc}")
+
+        st.divider()
+        st.subheader("Purge inactive products")
+        inactive = [r["InventoryID"] for r in items if not r["IsActive"]]
+        purge_user = st.text_input("User", value="batch_job", key="purge_user")
+        confirm_purge = st.checkbox(
+            f"I confirm deletion of {len(inactive)} inactive record(s)", disabled=not inactive
+        )
+        if st.button("Delete inactive", type="primary", disabled=not (inactive and confirm_purge)):
+            try:
+                n = demo_db.bulk_delete_records(inactive, user=purge_user, conn=conn)
+                st.success(f"Deleted {n} record(s)")
+                st.rerun()
+            except Exception as exc:
+                st.error(f"Error: {exc}")
+
 
 # ===========================================================================
 # PAGE: Configuration
 # ===========================================================================
 
-def page_configuration() -> None:
+def page_configuration(conn: sqlite3.Connection) -> None:
     st.title("⚙️ Configuration")
     st.caption("Manage database connection settings and demo data")
 
@@ -689,11 +815,11 @@ def page_configuration() -> None:
             try:
                 import pyodbc               # noqa: F401
                 from db_connect import get_connection
-                conn = get_connection()
-                cur  = conn.cursor()
+                live = get_connection()
+                cur  = live.cursor()
                 cur.execute("SELECT @@VERSION AS v")
                 ver = cur.fetchone()[0]
-                conn.close()
+                live.close()
                 st.success(f"Connected!\n```\n{ver[:160]}\n```")
             except ImportError:
                 st.warning("**pyodbc not installed.**  Run: `pip3 install pyodbc`")
@@ -705,30 +831,22 @@ def page_configuration() -> None:
         st.subheader("Demo Mode (SQLite)")
         st.success("Currently active — all data uses a local SQLite file.", icon="✅")
 
-        conn = demo_db.get_connection()
-        cur  = conn.cursor()
-        cur.execute("SELECT COUNT(*) FROM Inventory")
-        n_inv = cur.fetchone()[0]
-        cur.execute("SELECT COUNT(*) FROM Inventory_AuditLog")
-        n_log = cur.fetchone()[0]
-        cur.execute("SELECT MIN(ChangedAt), MAX(ChangedAt) FROM Inventory_AuditLog")
-        rng = cur.fetchone()
-        conn.close()
-
-        c1, c2 = st.columns(2)
-        c1.metric("Inventory records",    n_inv)
-        c2.metric("Audit log entries",    n_log)
-        if rng and rng[0]:
-            st.caption(f"Date range: `{rng[0]}` → `{rng[1]}`")
+        counts = demo_db.get_table_counts(conn=conn)
+
+        c1, c2, c3 = st.columns(3)
+        c1.metric("Inventory records",    counts["inventory"])
+        c2.metric("Audit log entries",    counts["audit_log"])
+        c3.metric("Checkpoints",          counts["checkpoints"])
+        if counts["first_change"]:
+            st.caption(f"Date range: `{counts['first_change']}` → `{counts['last_change']}`")
 
         st.divider()
         st.markdown("**SQLite database path**")
         st.code(demo_db.DB_PATH)
 
         if st.button("🔄 Reset & re-seed demo data", type="secondary"):
-            demo_db.reset_database()
-            demo_db.init_database()
-            demo_db.seed_demo_data()
+            demo_db.reset_database(conn)
+            demo_db.seed_demo_data(conn)
             st.cache_resource.clear()
             st.success("Demo data has been reset and re-seeded.")
             st.rerun()
@@ -753,13 +871,17 @@ def page_configuration() -> None:
 # Router
 # ===========================================================================
 
-if page == "📊 Dashboard":
-    page_dashboard()
-elif page == "🔍 Audit Log":
-    page_audit_log()
-elif page == "📦 Inventory":
-    page_inventory()
-elif page == "⚡ Operations":
-    page_operations()
-elif page == "⚙️ Configuration":
-    page_configuration()
+# One pooled connection serves every query and write of this rerun.
+with demo_db.connection() as conn:
+    if page == "📊 Dashboard":
+        page_dashboard(conn)
+    elif page == "🔍 Audit Log":
+        page_audit_log(conn)
+    elif page == "📦 Inventory":
+        page_inventory(conn)
+    elif page == "🕰️ Time Travel":
+        page_time_travel(conn)
+    elif page == "⚡ Operations":
+        page_operations(conn)
+    elif page == "⚙️ Configuration":
+        page_configuration(conn)
@@ -8,9 +8,15 @@ from __future__ import annotations
 
 import json
 import os
+import queue
+import re
 import sqlite3
+import threading
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from typing import Any, Optional
+from typing import Any, Iterable, Iterator, Optional, Union
+
+import time_travel
 
 DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "demo_changelog.db")
 
@@ -37,59 +43,342 @@ USERS = ["app_user", "admin", "batch_job", "api_gateway", "migration_script"]
 # ---------------------------------------------------------------------------
 # Connection
 # ---------------------------------------------------------------------------
-
-def get_connection() -> sqlite3.Connection:
-    conn = sqlite3.connect(DB_PATH)
+#
+# Streamlit re-runs the whole script on every interaction, on a pool of
+# script threads, and each page calls several helpers below. Rather than
+# each helper opening its own connection, they borrow one from a small
+# pool (or use the one the caller passes in), so a page render costs a
+# single connection and the per-connection setup is paid once.
+#
+# Connections are opened in autocommit mode; `transaction()` issues an
+# explicit BEGIN, or a SAVEPOINT when the connection is already inside
+# one, so helpers can run standalone or as part of a caller's transaction.
+
+POOL_SIZE    = 4
+POOL_TIMEOUT = 10.0   # seconds to wait for a free connection
+
+PRAGMAS = {
+    "journal_mode": "WAL",        # readers don't block the writer and vice versa
+    "synchronous":  "NORMAL",     # safe with WAL; skips an fsync per commit
+    "busy_timeout": 5000,         # wait up to 5 s for another writer
+    "cache_size":   -16000,       # 16 MB page cache
+    "temp_store":   "MEMORY",
+    "mmap_size":    64 * 1024 * 1024,
+}
+
+
+def _open(path: str) -> sqlite3.Connection:
+    # check_same_thread=False: a pooled connection is handed to whichever
+    # Streamlit thread borrows it next — only ever one at a time
+    conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
     conn.row_factory = sqlite3.Row
+    for pragma, value in PRAGMAS.items():
+        conn.execute(f"PRAGMA {pragma} = {value}")
     return conn
 
 
+class ConnectionPool:
+    """A fixed-size, thread-safe pool of tuned SQLite connections."""
+
+    def __init__(self, path: str, size: int = POOL_SIZE) -> None:
+        self.path     = path
+        self._size    = size
+        self._idle: queue.LifoQueue = queue.LifoQueue()
+        self._opened  = 0
+        self._closed  = False
+        self._lock    = threading.Lock()
+
+    def acquire(self, timeout: float = POOL_TIMEOUT) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._opened < self._size:
+                self._opened += 1
+                try:
+                    return _open(self.path)
+                except Exception:
+                    self._opened -= 1
+                    raise
+        try:
+            return self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError(
+                f"No free database connection after {timeout:.0f} s "
+                f"(pool size {self._size})"
+            ) from None
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        if conn.in_transaction:
+            # the borrower bailed out mid-transaction — don't hand that on
+            conn.rollback()
+        with self._lock:
+            if self._closed:
+                # the pool was retired while this was borrowed
+                conn.close()
+                self._opened -= 1
+                return
+            self._idle.put(conn)
+
+    def close_all(self) -> None:
+        """Closes the idle connections; borrowed ones close as they return."""
+        with self._lock:
+            self._closed = True
+            while True:
+                try:
+                    conn = self._idle.get_nowait()
+                except queue.Empty:
+                    break
+                conn.close()
+                self._opened -= 1
+
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """The shared pool for DB_PATH (re-created if DB_PATH is changed)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool.path != DB_PATH:
+            if _pool is not None:
+                _pool.close_all()
+            _pool = ConnectionPool(DB_PATH)
+        return _pool
+
+
+def get_connection() -> sqlite3.Connection:
+    """A new, unpooled connection with the same tuning. Caller closes it;
+    prefer `connection()`."""
+    return _open(DB_PATH)
+
+
+@contextmanager
+def connection(conn: Optional[sqlite3.Connection] = None) -> Iterator[sqlite3.Connection]:
+    """Yields `conn` if given, otherwise borrows one from the pool for the
+    duration of the block."""
+    if conn is not None:
+        yield conn
+        return
+    pool = get_pool()
+    borrowed = pool.acquire()
+    try:
+        yield borrowed
+    finally:
+        pool.release(borrowed)
+
+
+@contextmanager
+def transaction(conn: Optional[sqlite3.Connection] = None) -> Iterator[sqlite3.Connection]:
+    """Runs the block in a transaction on `conn` (or a pooled connection):
+    committed if it completes, rolled back if it raises. Inside an
+    enclosing transaction it becomes a savepoint, so it only commits when
+    the outer transaction does."""
+    with connection(conn) as c:
+        if c.in_transaction:
+            c.execute("SAVEPOINT demo_db_tx")
+            try:
+                yield c
+            except BaseException:
+                c.execute("ROLLBACK TO demo_db_tx")
+                c.execute("RELEASE demo_db_tx")
+                raise
+            c.execute("RELEASE demo_db_tx")
+            return
+        c.execute("BEGIN IMMEDIATE")
+        try:
+            yield c
+        except BaseException:
+            c.rollback()
+            raise
+        c.commit()
+
+
 # ---------------------------------------------------------------------------
 # Schema
 # ---------------------------------------------------------------------------
 
-def init_database() -> None:
-    conn = get_connection()
-    conn.executescript("""
-        CREATE TABLE IF NOT EXISTS Inventory (
-            InventoryID INTEGER PRIMARY KEY AUTOINCREMENT,
-            SKU         TEXT    NOT NULL UNIQUE,
-            ProductName TEXT    NOT NULL,
-            Category    TEXT,
-            Quantity    INTEGER NOT NULL DEFAULT 0,
-            UnitPrice   REAL    NOT NULL DEFAULT 0.0,
-            Location    TEXT,
-            IsActive    INTEGER NOT NULL DEFAULT 1,
-            CreatedAt   TEXT    NOT NULL,
-            UpdatedAt   TEXT    NOT NULL
-        );
-
-        CREATE TABLE IF NOT EXISTS Inventory_AuditLog (
-            AuditID    INTEGER PRIMARY KEY AUTOINCREMENT,
-            Operation  TEXT    NOT NULL,
-            ChangedAt  TEXT    NOT NULL,
-            ChangedBy  TEXT    NOT NULL,
-            RecordID   INTEGER,
-            BeforeData TEXT,
-            AfterData  TEXT
-        );
-
-        CREATE INDEX IF NOT EXISTS IX_AuditLog_RecordID
-            ON Inventory_AuditLog (RecordID, ChangedAt);
-    """)
-    conn.commit()
-    conn.close()
-
-
-def reset_database() -> None:
-    conn = get_connection()
-    conn.executescript("""
-        DROP TABLE IF EXISTS Inventory_AuditLog;
-        DROP TABLE IF EXISTS Inventory;
-    """)
-    conn.commit()
-    conn.close()
-    init_database()
+def init_database(conn: Optional[sqlite3.Connection] = None) -> None:
+    with connection(conn) as c:
+        c.executescript("""
+            CREATE TABLE IF NOT EXISTS Inventory (
+                InventoryID INTEGER PRIMARY KEY AUTOINCREMENT,
+                SKU         TEXT    NOT NULL UNIQUE,
+                ProductName TEXT    NOT NULL,
+                Category    TEXT,
+                Quantity    INTEGER NOT NULL DEFAULT 0,
+                UnitPrice   REAL    NOT NULL DEFAULT 0.0,
+                Location    TEXT,
+                IsActive    INTEGER NOT NULL DEFAULT 1,
+                CreatedAt   TEXT    NOT NULL,
+                UpdatedAt   TEXT    NOT NULL
+            );
+
+            CREATE TABLE IF NOT EXISTS Inventory_AuditLog (
+                AuditID    INTEGER PRIMARY KEY AUTOINCREMENT,
+                Operation  TEXT    NOT NULL,
+                ChangedAt  TEXT    NOT NULL,
+                ChangedBy  TEXT    NOT NULL,
+                RecordID   INTEGER,
+                BeforeData TEXT,
+                AfterData  TEXT,
+                IsDelta    INTEGER NOT NULL DEFAULT 0   -- 1: only the changed columns
+            );
+
+            CREATE INDEX IF NOT EXISTS IX_AuditLog_RecordID
+                ON Inventory_AuditLog (RecordID, ChangedAt);
+
+            -- Time-travel replay order; AuditID rides along as the rowid
+            CREATE INDEX IF NOT EXISTS IX_AuditLog_ChangedAt
+                ON Inventory_AuditLog (ChangedAt);
+
+            -- Materialised table states for time_travel.py
+            CREATE TABLE IF NOT EXISTS Inventory_Checkpoint (
+                AuditID     INTEGER PRIMARY KEY,   -- state after this audit row
+                ChangedAt   TEXT    NOT NULL,
+                RecordCount INTEGER NOT NULL,
+                LogHead     INTEGER NOT NULL       -- log validated up to this AuditID
+            );
+
+            CREATE INDEX IF NOT EXISTS IX_Checkpoint_ChangedAt
+                ON Inventory_Checkpoint (ChangedAt);
+
+            CREATE TABLE IF NOT EXISTS Inventory_CheckpointRow (
+                AuditID     INTEGER NOT NULL,
+                InventoryID INTEGER NOT NULL,
+                RowData     TEXT    NOT NULL,
+                PRIMARY KEY (AuditID, InventoryID)
+            ) WITHOUT ROWID;
+        """)
+        columns = {r["name"] for r in c.execute("PRAGMA table_info(Inventory_AuditLog)")}
+        if "IsDelta" not in columns:
+            c.execute("ALTER TABLE Inventory_AuditLog ADD COLUMN IsDelta INTEGER NOT NULL DEFAULT 0")
+        # A record's latest full snapshot, and the deltas since it, each in
+        # one seek (see _DELTA_RUN_SQL)
+        c.execute(
+            "CREATE INDEX IF NOT EXISTS IX_AuditLog_RecordDelta "
+            "ON Inventory_AuditLog (RecordID, IsDelta)"
+        )
+        c.execute(
+            "CREATE INDEX IF NOT EXISTS IX_AuditLog_RecordAudit "
+            "ON Inventory_AuditLog (RecordID, AuditID)"
+        )
+        _init_audit_search(c)
+
+
+def reset_database(conn: Optional[sqlite3.Connection] = None) -> None:
+    with connection(conn) as c:
+        c.executescript("""
+            DROP TABLE IF EXISTS Inventory_CheckpointRow;
+            DROP TABLE IF EXISTS Inventory_Checkpoint;
+            DROP TABLE IF EXISTS Inventory_AuditSearch;
+            DROP TABLE IF EXISTS Inventory_AuditLog;
+            DROP TABLE IF EXISTS Inventory;
+        """)
+        init_database(c)
+
+
+# ---------------------------------------------------------------------------
+# Audit search index
+# ---------------------------------------------------------------------------
+#
+# Inventory_AuditSearch is a contentless FTS5 index keyed by AuditID. It
+# holds each audit row's ChangedBy and the field values of its Before /
+# After snapshots (JSON keys left out), so searching reads the index rather
+# than scanning the JSON text of every row. Audit rows are never edited, so
+# an insert trigger is all it takes to keep it current. The log is the
+# source of truth: backfill_audit_search() indexes any rows the index has
+# not seen, and runs on every init_database() so an existing database
+# picks the index up on first start.
+#
+# The SQL Server equivalent is the optional full-text index in schema.sql.
+
+# One audit row's index entry, for audit row alias {row}. A delta row's
+# AfterValues also carry its record's SKU and ProductName, taken from the
+# record's latest full snapshot before it, so searching for a product still
+# finds UPDATEs that changed neither.
+_AUDIT_SEARCH_VALUES = """
+    {row}.AuditID, {row}.ChangedBy,
+    (SELECT group_concat(value, ' ') FROM json_each({row}.BeforeData)),
+    COALESCE((SELECT group_concat(value, ' ') FROM json_each({row}.AfterData)), '')
+    || CASE WHEN {row}.IsDelta THEN ' ' || COALESCE((
+        SELECT (SELECT group_concat(value, ' ')
+                FROM json_each(COALESCE(f.AfterData, f.BeforeData))
+                WHERE key IN ('SKU', 'ProductName'))
+        FROM Inventory_AuditLog f
+        WHERE f.RecordID = {row}.RecordID AND f.IsDelta = 0 AND f.AuditID < {row}.AuditID
+        ORDER BY f.AuditID DESC LIMIT 1
+    ), '') ELSE '' END
+"""
+
+AUDIT_SEARCH_DDL = f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS Inventory_AuditSearch USING fts5(
+        ChangedBy, BeforeValues, AfterValues,
+        content='', tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    );
+
+    CREATE TRIGGER IF NOT EXISTS trg_Inventory_AuditSearch
+    AFTER INSERT ON Inventory_AuditLog
+    BEGIN
+        INSERT INTO Inventory_AuditSearch (rowid, ChangedBy, BeforeValues, AfterValues)
+        SELECT {_AUDIT_SEARCH_VALUES.format(row="new")};
+    END;
+"""
+
+_WORD = re.compile(r"\w+")
+
+
+def _init_audit_search(c: sqlite3.Connection) -> None:
+    trigger = c.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = 'trg_Inventory_AuditSearch'"
+    ).fetchone()
+    if trigger and "IsDelta" not in trigger[0]:
+        # Indexed before delta rows carried their record's label: rebuild
+        c.execute("DROP TRIGGER trg_Inventory_AuditSearch")
+        c.execute("INSERT INTO Inventory_AuditSearch (Inventory_AuditSearch) VALUES ('delete-all')")
+    try:
+        c.executescript(AUDIT_SEARCH_DDL)
+    except sqlite3.OperationalError:
+        # SQLite built without FTS5 — get_audit_logs falls back to LIKE
+        return
+    backfill_audit_search(c)
+
+
+def _has_audit_search(c: sqlite3.Connection) -> bool:
+    return c.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = 'Inventory_AuditSearch'"
+    ).fetchone() is not None
+
+
+def backfill_audit_search(conn: Optional[sqlite3.Connection] = None) -> int:
+    """Indexes audit rows newer than the newest indexed one — rows written
+    before the index existed, or by a writer that bypassed the trigger.
+    Returns how many rows were indexed."""
+    with transaction(conn) as c:
+        if not _has_audit_search(c):
+            return 0
+        cur = c.execute(
+            f"""
+            INSERT INTO Inventory_AuditSearch (rowid, ChangedBy, BeforeValues, AfterValues)
+            SELECT {_AUDIT_SEARCH_VALUES.format(row="a")}
+            FROM Inventory_AuditLog a
+            WHERE a.AuditID > (SELECT COALESCE(MAX(rowid), 0) FROM Inventory_AuditSearch)
+            ORDER BY a.AuditID
+            """
+        )
+        return cur.rowcount
+
+
+def audit_search_query(text: str) -> str:
+    """The search box text as an FTS5 query: every word required, each
+    quoted so punctuation and AND/OR/NOT are searched for literally, and
+    the last word matched as a prefix so results narrow while typing."""
+    terms = [f'"{word}"' for word in _WORD.findall(text)]
+    if terms:
+        terms[-1] += "*"
+    return " ".join(terms)
 
 
 # ---------------------------------------------------------------------------
@@ -106,6 +395,66 @@ def _get_row(cur: sqlite3.Cursor, inventory_id: int) -> Optional[dict]:
     return dict(row) if row else None
 
 
+# UPDATE audit rows hold only the columns that changed ("deltas"), as
+# trg_Inventory_Audit does with @snapshot_every. Every SNAPSHOT_EVERY-th
+# UPDATE of a record still stores the full before / after rows, so a full
+# row is never more than SNAPSHOT_EVERY - 1 deltas away. 1 stores full
+# rows for every UPDATE.
+SNAPSHOT_EVERY = 10
+
+# How many delta rows `record` has had since its latest full snapshot.
+# Both halves are seeks that read only the rows they count, at most
+# SNAPSHOT_EVERY, however long the record's history: the latest full row
+# off the end of IX_AuditLog_RecordDelta, then the range after it on
+# IX_AuditLog_RecordAudit.
+_DELTA_RUN_SQL = """
+    SELECT COUNT(*) FROM Inventory_AuditLog a
+    WHERE a.RecordID = {record}
+      AND a.AuditID > COALESCE((
+          SELECT f.AuditID FROM Inventory_AuditLog f
+          WHERE f.RecordID = {record} AND f.IsDelta = 0
+          ORDER BY f.AuditID DESC LIMIT 1
+      ), 0)
+"""
+
+_AUDIT_INSERT_SQL = """
+    INSERT INTO Inventory_AuditLog
+        (Operation, ChangedAt, ChangedBy, RecordID, BeforeData, AfterData, IsDelta)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def _changed_fields(before: dict, after: dict) -> tuple[dict, dict]:
+    keys = [k for k in after if before.get(k) != after[k]]
+    return {k: before.get(k) for k in keys}, {k: after[k] for k in keys}
+
+
+def _audit_params(
+    operation: str,
+    record_id: int,
+    before: Optional[dict],
+    after: Optional[dict],
+    user: str,
+    ts: str,
+    delta_run: Optional[int] = None,
+) -> tuple:
+    """One audit row's INSERT parameters. An UPDATE whose record has had
+    `delta_run` deltas since its last full snapshot is stored as a delta
+    unless a snapshot is due."""
+    is_delta = (
+        operation == "UPDATE" and delta_run is not None
+        and delta_run < SNAPSHOT_EVERY - 1
+    )
+    if is_delta:
+        before, after = _changed_fields(before, after)
+    return (
+        operation, ts, user, record_id,
+        json.dumps(before) if before else None,
+        json.dumps(after)  if after  else None,
+        int(is_delta),
+    )
+
+
 def _write_audit(
     cur: sqlite3.Cursor,
     operation: str,
@@ -115,22 +464,70 @@ def _write_audit(
     user: str,
     ts: str,
 ) -> None:
+    delta_run = None
+    if operation == "UPDATE":
+        cur.execute(_DELTA_RUN_SQL.format(record="?"), (record_id, record_id))
+        delta_run = cur.fetchone()[0]
+    cur.execute(
+        _AUDIT_INSERT_SQL,
+        _audit_params(operation, record_id, before, after, user, ts, delta_run),
+    )
+
+
+def _write_audit_rows(cur: sqlite3.Cursor, rows: Iterable[tuple]) -> None:
+    """Writes many _audit_params() tuples as one INSERT … SELECT. Staging
+    them first keeps the audit-search trigger inside a single statement —
+    FTS5 flushes its pending index data at the end of every statement, so
+    an executemany straight into the log would write one index segment per
+    row."""
+    cur.execute(
+        """
+        CREATE TEMP TABLE IF NOT EXISTS BulkAudit (
+            Operation, ChangedAt, ChangedBy, RecordID, BeforeData, AfterData, IsDelta
+        )
+        """
+    )
+    cur.execute("DELETE FROM temp.BulkAudit")
+    cur.executemany("INSERT INTO temp.BulkAudit VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
     cur.execute(
         """
         INSERT INTO Inventory_AuditLog
-            (Operation, ChangedAt, ChangedBy, RecordID, BeforeData, AfterData)
-        VALUES (?, ?, ?, ?, ?, ?)
-        """,
-        (
-            operation, ts, user, record_id,
-            json.dumps(before) if before else None,
-            json.dumps(after)  if after  else None,
-        ),
+            (Operation, ChangedAt, ChangedBy, RecordID, BeforeData, AfterData, IsDelta)
+        SELECT Operation, ChangedAt, ChangedBy, RecordID, BeforeData, AfterData, IsDelta
+        FROM temp.BulkAudit ORDER BY rowid
+        """
+    )
+    cur.execute("DELETE FROM temp.BulkAudit")
+
+
+def _stage_ids(cur: sqlite3.Cursor, ids: Iterable[int]) -> None:
+    """Loads `ids` into the connection's temp BulkKeys table, the stand-in
+    for T-SQL's INSERTED / DELETED sets in the bulk helpers below."""
+    cur.execute("CREATE TEMP TABLE IF NOT EXISTS BulkKeys (InventoryID INTEGER PRIMARY KEY)")
+    cur.execute("DELETE FROM temp.BulkKeys")
+    cur.executemany("INSERT OR IGNORE INTO temp.BulkKeys VALUES (?)", ((i,) for i in ids))
+
+
+def _snapshot(cur: sqlite3.Cursor) -> dict[int, dict]:
+    """Every staged row's current state, read in one query."""
+    cur.execute(
+        "SELECT i.* FROM Inventory i "
+        "JOIN temp.BulkKeys k ON k.InventoryID = i.InventoryID "
+        "ORDER BY i.InventoryID"
     )
+    return {r["InventoryID"]: dict(r) for r in cur.fetchall()}
+
+
+def _missing_ids(cur: sqlite3.Cursor) -> list[int]:
+    cur.execute(
+        "SELECT k.InventoryID FROM temp.BulkKeys k "
+        "WHERE NOT EXISTS (SELECT 1 FROM Inventory i WHERE i.InventoryID = k.InventoryID)"
+    )
+    return [r[0] for r in cur.fetchall()]
 
 
 # ---------------------------------------------------------------------------
-# CRUD  (each call opens + closes its own connection)
+# CRUD  (each call is one transaction — or part of the caller's, via conn)
 # ---------------------------------------------------------------------------
 
 def insert_record(
@@ -142,11 +539,11 @@ def insert_record(
     location: str,
     user: str = "demo_user",
     ts: Optional[str] = None,
+    conn: Optional[sqlite3.Connection] = None,
 ) -> int:
-    now  = ts or _now()
-    conn = get_connection()
-    cur  = conn.cursor()
-    try:
+    now = ts or _now()
+    with transaction(conn) as c:
+        cur = c.cursor()
         cur.execute(
             """
             INSERT INTO Inventory
@@ -159,25 +556,19 @@ def insert_record(
         inv_id = cur.lastrowid
         after  = _get_row(cur, inv_id)
         _write_audit(cur, "INSERT", inv_id, None, after, user, now)
-        conn.commit()
         return inv_id
-    except Exception:
-        conn.rollback()
-        raise
-    finally:
-        conn.close()
 
 
 def update_record(
     inventory_id: int,
     user: str = "demo_user",
     ts: Optional[str] = None,
+    conn: Optional[sqlite3.Connection] = None,
     **kwargs: Any,
 ) -> None:
-    now  = ts or _now()
-    conn = get_connection()
-    cur  = conn.cursor()
-    try:
+    now = ts or _now()
+    with transaction(conn) as c:
+        cur    = c.cursor()
         before = _get_row(cur, inventory_id)
         if before is None:
             raise ValueError(f"InventoryID {inventory_id} not found")
@@ -192,34 +583,154 @@ def update_record(
 
         after = _get_row(cur, inventory_id)
         _write_audit(cur, "UPDATE", inventory_id, before, after, user, now)
-        conn.commit()
-    except Exception:
-        conn.rollback()
-        raise
-    finally:
-        conn.close()
 
 
 def delete_record(
     inventory_id: int,
     user: str = "demo_user",
     ts: Optional[str] = None,
+    conn: Optional[sqlite3.Connection] = None,
 ) -> None:
-    now  = ts or _now()
-    conn = get_connection()
-    cur  = conn.cursor()
-    try:
+    now = ts or _now()
+    with transaction(conn) as c:
+        cur    = c.cursor()
         before = _get_row(cur, inventory_id)
         if before is None:
             raise ValueError(f"InventoryID {inventory_id} not found")
         cur.execute("DELETE FROM Inventory WHERE InventoryID = ?", (inventory_id,))
         _write_audit(cur, "DELETE", inventory_id, before, None, user, now)
-        conn.commit()
-    except Exception:
-        conn.rollback()
-        raise
-    finally:
-        conn.close()
+
+
+# ---------------------------------------------------------------------------
+# Bulk CRUD  (many rows, one transaction, set-based audit capture)
+# ---------------------------------------------------------------------------
+#
+# The bulk variants work the way trg_Inventory_Audit does for a multi-row
+# statement: the affected rows' before and after states are read as whole
+# sets (not row by row), and one audit row per affected record is written
+# in a single statement. Like one T-SQL statement, a batch has a single
+# user and timestamp, and succeeds or fails as a whole.
+
+def bulk_insert_records(
+    rows: Iterable[tuple],
+    user: str = "demo_user",
+    ts: Optional[str] = None,
+    conn: Optional[sqlite3.Connection] = None,
+) -> list[int]:
+    """Inserts (sku, product_name, category, quantity, unit_price,
+    location) tuples — the shape of PRODUCTS — and returns the new
+    InventoryIDs in input order."""
+    now = ts or _now()
+    with transaction(conn) as c:
+        cur = c.cursor()
+        # ids are AUTOINCREMENT and the transaction holds the write lock,
+        # so everything above the current maximum is this batch
+        cur.execute("SELECT COALESCE(MAX(InventoryID), 0) FROM Inventory")
+        last_id = cur.fetchone()[0]
+        cur.executemany(
+            """
+            INSERT INTO Inventory
+                (SKU, ProductName, Category, Quantity, UnitPrice,
+                 Location, IsActive, CreatedAt, UpdatedAt)
+            VALUES (?, ?, ?, ?, ?, ?, 1, ?, ?)
+            """,
+            ((*row, now, now) for row in rows),
+        )
+        cur.execute(
+            "SELECT * FROM Inventory WHERE InventoryID > ? ORDER BY InventoryID", (last_id,)
+        )
+        inserted = [dict(r) for r in cur.fetchall()]
+        _write_audit_rows(
+            cur,
+            (_audit_params("INSERT", r["InventoryID"], None, r, user, now) for r in inserted),
+        )
+        return [r["InventoryID"] for r in inserted]
+
+
+def bulk_update_records(
+    changes: Iterable[tuple[int, dict]],
+    user: str = "demo_user",
+    ts: Optional[str] = None,
+    conn: Optional[sqlite3.Connection] = None,
+) -> int:
+    """Applies (inventory_id, {column: value}) changes and returns how many
+    records were updated. Several changes to one record are merged, and
+    audited as one UPDATE — as a single T-SQL statement would be."""
+    merged: dict[int, dict] = {}
+    for inventory_id, fields in changes:
+        merged.setdefault(inventory_id, {}).update(fields)
+    if not merged:
+        return 0
+
+    now = ts or _now()
+    with transaction(conn) as c:
+        cur = c.cursor()
+        _stage_ids(cur, merged)
+        missing = _missing_ids(cur)
+        if missing:
+            raise ValueError(f"InventoryID {', '.join(map(str, missing[:10]))} not found")
+        before = _snapshot(cur)
+
+        # one executemany per distinct set of columns being changed
+        by_columns: dict[tuple, list] = {}
+        for inventory_id, fields in merged.items():
+            by_columns.setdefault(tuple(fields), []).append(
+                [*fields.values(), now, inventory_id]
+            )
+        for columns, params in by_columns.items():
+            # Column names come from internal callers — values are parameterised
+            set_sql = ", ".join(f"{k} = ?" for k in columns)
+            cur.executemany(
+                f"UPDATE Inventory SET {set_sql}{', ' if set_sql else ''}UpdatedAt = ? "
+                f"WHERE InventoryID = ?",
+                params,
+            )
+
+        after = _snapshot(cur)
+        cur.execute(
+            f"SELECT k.InventoryID, ({_DELTA_RUN_SQL.format(record='k.InventoryID')}) "
+            f"FROM temp.BulkKeys k"
+        )
+        delta_runs = {inventory_id: run for inventory_id, run in cur.fetchall()}
+        _write_audit_rows(
+            cur,
+            (
+                _audit_params(
+                    "UPDATE", inventory_id, before[inventory_id], row, user, now,
+                    delta_runs[inventory_id],
+                )
+                for inventory_id, row in after.items()
+            ),
+        )
+        return len(after)
+
+
+def bulk_delete_records(
+    inventory_ids: Iterable[int],
+    user: str = "demo_user",
+    ts: Optional[str] = None,
+    conn: Optional[sqlite3.Connection] = None,
+) -> int:
+    """Deletes the given records and returns how many were deleted."""
+    now = ts or _now()
+    with transaction(conn) as c:
+        cur = c.cursor()
+        _stage_ids(cur, inventory_ids)
+        missing = _missing_ids(cur)
+        if missing:
+            raise ValueError(f"InventoryID {', '.join(map(str, missing[:10]))} not found")
+        before = _snapshot(cur)
+        cur.execute(
+            "DELETE FROM Inventory WHERE InventoryID IN (SELECT InventoryID FROM temp.BulkKeys)"
+        )
+        _write_audit_rows(
+            cur,
+            (
+                _audit_params("DELETE", inventory_id, row, None, user, now)
+                for inventory_id, row in before.items()
+            ),
+        )
+        return len(before)
 
 
 # ---------------------------------------------------------------------------
@@ -231,9 +742,8 @@ def get_audit_logs(
     operation: Optional[str] = None,
     record_id: Optional[int] = None,
     search: Optional[str] = None,
+    conn: Optional[sqlite3.Connection] = None,
 ) -> list[dict]:
-    conn    = get_connection()
-    cur     = conn.cursor()
     clauses: list[str] = []
     params:  list[Any] = []
 
@@ -243,75 +753,139 @@ def get_audit_logs(
     if record_id is not None:
         clauses.append("RecordID = ?")
         params.append(record_id)
-    if search:
-        clauses.append("(BeforeData LIKE ? OR AfterData LIKE ? OR ChangedBy LIKE ?)")
-        s = f"%{search}%"
-        params += [s, s, s]
 
-    where = ("WHERE " + " AND ".join(clauses)) if clauses else ""
-    cur.execute(
-        f"""
-        SELECT AuditID, Operation, ChangedAt, ChangedBy,
-               RecordID, BeforeData, AfterData
-        FROM Inventory_AuditLog
-        {where}
-        ORDER BY AuditID DESC
-        LIMIT ?
-        """,
-        params + [limit],
-    )
-    rows = [dict(r) for r in cur.fetchall()]
-    conn.close()
-    return rows
-
-
-def get_inventory() -> list[dict]:
-    conn = get_connection()
-    cur  = conn.cursor()
-    cur.execute("SELECT * FROM Inventory ORDER BY InventoryID")
-    rows = [dict(r) for r in cur.fetchall()]
-    conn.close()
-    return rows
-
-
-def get_audit_stats() -> dict:
-    conn = get_connection()
-    cur  = conn.cursor()
-
-    cur.execute("SELECT COUNT(*) FROM Inventory_AuditLog")
-    total = cur.fetchone()[0]
-
-    cur.execute("SELECT Operation, COUNT(*) FROM Inventory_AuditLog GROUP BY Operation")
-    by_op = {r[0]: r[1] for r in cur.fetchall()}
-
-    cur.execute("""
-        SELECT date(ChangedAt) AS day, Operation, COUNT(*) AS cnt
-        FROM   Inventory_AuditLog
-        WHERE  ChangedAt >= date('now', '-7 days')
-        GROUP  BY day, Operation
-        ORDER  BY day
-    """)
-    timeline = [{"day": r[0], "operation": r[1], "count": r[2]} for r in cur.fetchall()]
-
-    cur.execute("""
-        SELECT ChangedBy, COUNT(*) AS cnt
-        FROM   Inventory_AuditLog
-        GROUP  BY ChangedBy
-        ORDER  BY cnt DESC
-        LIMIT  5
-    """)
-    by_user = [{"user": r[0], "count": r[1]} for r in cur.fetchall()]
-
-    cur.execute("SELECT COUNT(*) FROM Inventory WHERE IsActive = 1")
-    active_items = cur.fetchone()[0]
+    with connection(conn) as c:
+        source = "Inventory_AuditLog a"
+        order  = "a.AuditID"
+        if search and _has_audit_search(c):
+            query = audit_search_query(search)
+            if not query:
+                return []
+            # Walk the index newest-first and stop at `limit`, so the cost
+            # tracks the page size rather than the size of the log
+            source = (
+                "Inventory_AuditSearch s "
+                "JOIN Inventory_AuditLog a ON a.AuditID = s.rowid"
+            )
+            clauses.insert(0, "Inventory_AuditSearch MATCH ?")
+            params.insert(0, query)
+            order = "s.rowid"
+        elif search:
+            clauses.append("(a.BeforeData LIKE ? OR a.AfterData LIKE ? OR a.ChangedBy LIKE ?)")
+            s = f"%{search}%"
+            params += [s, s, s]
+
+        where = ("WHERE " + " AND ".join(clauses)) if clauses else ""
+        cur = c.execute(
+            f"""
+            SELECT a.AuditID, a.Operation, a.ChangedAt, a.ChangedBy,
+                   a.RecordID, a.BeforeData, a.AfterData, a.IsDelta
+            FROM {source}
+            {where}
+            ORDER BY {order} DESC
+            LIMIT ?
+            """,
+            params + [limit],
+        )
+        return [dict(r) for r in cur.fetchall()]
+
+
+def get_record_labels(
+    record_ids: Iterable[int],
+    conn: Optional[sqlite3.Connection] = None,
+) -> dict[int, dict]:
+    """SKU and ProductName for each record, from its latest full audit
+    snapshot — for labelling delta rows, which usually carry neither."""
+    ids = sorted(set(record_ids))
+    if not ids:
+        return {}
+    marks = ", ".join("?" for _ in ids)
+    with connection(conn) as c:
+        cur = c.execute(
+            f"""
+            SELECT RecordID, COALESCE(AfterData, BeforeData) AS Data
+            FROM Inventory_AuditLog
+            WHERE AuditID IN (
+                SELECT MAX(AuditID) FROM Inventory_AuditLog
+                WHERE RecordID IN ({marks}) AND IsDelta = 0
+                GROUP BY RecordID
+            )
+            """,
+            ids,
+        )
+        labels = {}
+        for r in cur.fetchall():
+            data = json.loads(r["Data"]) if r["Data"] else {}
+            labels[r["RecordID"]] = {k: data.get(k, "") for k in ("SKU", "ProductName")}
+        return labels
+
+
+def get_audit_row_images(
+    audit_id: int,
+    conn: Optional[sqlite3.Connection] = None,
+) -> tuple[Optional[dict], Optional[dict]]:
+    """The full before / after rows of one audit entry, rebuilt from the
+    record's nearest full snapshot when the entry is a delta."""
+    with connection(conn) as c:
+        return time_travel.row_images(c, audit_id)
+
+
+def get_inventory_at(
+    at: Union[str, datetime],
+    conn: Optional[sqlite3.Connection] = None,
+) -> list[dict]:
+    """Inventory as it stood at `at` (UTC), rebuilt from the audit log —
+    see time_travel.py. Takes any checkpoints that have come due first."""
+    if isinstance(at, datetime):
+        at = at.isoformat(sep=" ", timespec="seconds")
+    with transaction(conn) as c:
+        time_travel.refresh_checkpoints(c)
+        return time_travel.inventory_at(c, at)
+
+
+def get_inventory(conn: Optional[sqlite3.Connection] = None) -> list[dict]:
+    with connection(conn) as c:
+        cur = c.execute("SELECT * FROM Inventory ORDER BY InventoryID")
+        return [dict(r) for r in cur.fetchall()]
+
+
+def get_audit_stats(conn: Optional[sqlite3.Connection] = None) -> dict:
+    with connection(conn) as c:
+        cur = c.cursor()
+
+        cur.execute("SELECT COUNT(*) FROM Inventory_AuditLog")
+        total = cur.fetchone()[0]
+
+        cur.execute("SELECT Operation, COUNT(*) FROM Inventory_AuditLog GROUP BY Operation")
+        by_op = {r[0]: r[1] for r in cur.fetchall()}
+
+        cur.execute("""
+            SELECT date(ChangedAt) AS day, Operation, COUNT(*) AS cnt
+            FROM   Inventory_AuditLog
+            WHERE  ChangedAt >= date('now', '-7 days')
+            GROUP  BY day, Operation
+            ORDER  BY day
+        """)
+        timeline = [{"day": r[0], "operation": r[1], "count": r[2]} for r in cur.fetchall()]
+
+        cur.execute("""
+            SELECT ChangedBy, COUNT(*) AS cnt
+            FROM   Inventory_AuditLog
+            GROUP  BY ChangedBy
+            ORDER  BY cnt DESC
+            LIMIT  5
+        """)
+        by_user = [{"user": r[0], "count": r[1]} for r in cur.fetchall()]
+
+        cur.execute("SELECT COUNT(*) FROM Inventory WHERE IsActive = 1")
+        active_items = cur.fetchone()[0]
 
-    cur.execute(
-        "SELECT COALESCE(SUM(CAST(Quantity AS REAL) * UnitPrice), 0) "
-        "FROM Inventory WHERE IsActive = 1"
-    )
-    total_value = cur.fetchone()[0]
+        cur.execute(
+            "SELECT COALESCE(SUM(CAST(Quantity AS REAL) * UnitPrice), 0) "
+            "FROM Inventory WHERE IsActive = 1"
+        )
+        total_value = cur.fetchone()[0]
 
-    conn.close()
     return {
         "total_audit_entries": total,
         "by_operation": by_op,
@@ -322,23 +896,37 @@ def get_audit_stats() -> dict:
     }
 
 
-def is_seeded() -> bool:
-    conn  = get_connection()
-    cur   = conn.cursor()
-    cur.execute("SELECT COUNT(*) FROM Inventory_AuditLog")
-    count = cur.fetchone()[0]
-    conn.close()
-    return count > 0
+def get_table_counts(conn: Optional[sqlite3.Connection] = None) -> dict:
+    """Row counts and the audit log's date range, for the Configuration page."""
+    with connection(conn) as c:
+        n_inv = c.execute("SELECT COUNT(*) FROM Inventory").fetchone()[0]
+        n_log, first, last = c.execute(
+            "SELECT COUNT(*), MIN(ChangedAt), MAX(ChangedAt) FROM Inventory_AuditLog"
+        ).fetchone()
+        n_cp = c.execute("SELECT COUNT(*) FROM Inventory_Checkpoint").fetchone()[0]
+    return {
+        "inventory": n_inv, "audit_log": n_log, "checkpoints": n_cp,
+        "first_change": first, "last_change": last,
+    }
+
+
+def is_seeded(conn: Optional[sqlite3.Connection] = None) -> bool:
+    with connection(conn) as c:
+        # EXISTS stops at the first row instead of counting the whole log
+        return c.execute("SELECT EXISTS (SELECT 1 FROM Inventory_AuditLog)").fetchone()[0] == 1
 
 
 # ---------------------------------------------------------------------------
 # Demo seed  (historical data spread over last 7 days)
 # ---------------------------------------------------------------------------
 
-def seed_demo_data() -> None:
-    if is_seeded():
-        return
+def seed_demo_data(conn: Optional[sqlite3.Connection] = None) -> None:
+    with transaction(conn) as c:
+        if not is_seeded(c):
+            _seed(c)
+
 
+def _seed(conn: sqlite3.Connection) -> None:
     now = datetime.utcnow()
 
     def ts(days_ago: float, hours: int = 0, minutes: int = 0) -> str:
@@ -352,6 +940,7 @@ def seed_demo_data() -> None:
             sku, name, cat, qty, price, loc,
             user=USERS[i % len(USERS)],
             ts=ts(7 - i * 0.4, hours=8 + (i * 3) % 9),
+            conn=conn,
         )
         ids.append(inv_id)
 
@@ -370,10 +959,10 @@ def seed_demo_data() -> None:
         (ids[3],  {"IsActive": 0},                                       1,   8, "admin"),
     ]
     for inv_id, fields, days, hours, user in update_scenarios:
-        update_record(inv_id, user=user, ts=ts(days, hours=hours), **fields)
+        update_record(inv_id, user=user, ts=ts(days, hours=hours), conn=conn, **fields)
 
     for inv_id, days, hours, user in [
-        (ids[12], 2, 16, "admin"),
+        (ids[12], 1, 16, "admin"),
         (ids[13], 1,  9, "migration_script"),
     ]:
-        delete_record(inv_id, user=user, ts=ts(days, hours=hours))
+        delete_record(inv_id, user=user, ts=ts(days, hours=hours), conn=conn)
@@ -3,6 +3,7 @@ log_viewer.py — Inventory_AuditLog viewer.
 
 Two modes:
   1. CLI  : python3 log_viewer.py
+            python3 log_viewer.py as-of "2026-01-31 17:00:00"
   2. Web  : streamlit run log_viewer.py
 
 Streamlit is detected automatically; if unavailable the script falls back
@@ -11,19 +12,31 @@ to a rich terminal table (or plain print).
 from __future__ import annotations
 
 import json
+import re
 import sys
 from typing import Optional
 
+import time_travel
 from db_connect import get_connection
 
 # ---------------------------------------------------------------------------
 # Shared data fetch
 # ---------------------------------------------------------------------------
 
+def _contains_query(text: str) -> str:
+    """Search text as a CONTAINS condition: every word required, the last
+    one matched as a prefix."""
+    words = re.findall(r"\w+", text)
+    if not words:
+        return ""
+    return " AND ".join([f'"{word}"' for word in words[:-1]] + [f'"{words[-1]}*"'])
+
+
 def fetch_audit_logs(
     limit: int = 200,
     operation: Optional[str] = None,
     record_id: Optional[int] = None,
+    search: Optional[str] = None,
 ) -> list[dict]:
     """Return audit log rows as a list of dicts."""
     conn = get_connection()
@@ -38,6 +51,19 @@ def fetch_audit_logs(
     if record_id is not None:
         where_clauses.append("RecordID = ?")
         params.append(record_id)
+    if search:
+        # The full-text index is optional (schema.sql, section 4)
+        cur.execute(
+            "SELECT OBJECTPROPERTYEX(OBJECT_ID('dbo.Inventory_AuditLog'), "
+            "'TableHasActiveFulltextIndex')"
+        )
+        query = _contains_query(search) if cur.fetchone()[0] == 1 else ""
+        if query:
+            where_clauses.append("CONTAINS((ChangedBy, BeforeData, AfterData), ?)")
+            params.append(query)
+        else:
+            where_clauses.append("(BeforeData LIKE ? OR AfterData LIKE ? OR ChangedBy LIKE ?)")
+            params += [f"%{search}%"] * 3
 
     where_sql = ("WHERE " + " AND ".join(where_clauses)) if where_clauses else ""
 
@@ -49,7 +75,8 @@ def fetch_audit_logs(
             ChangedBy,
             RecordID,
             BeforeData,
-            AfterData
+            AfterData,
+            IsDelta
         FROM dbo.Inventory_AuditLog
         {where_sql}
         ORDER BY AuditID DESC
@@ -62,6 +89,29 @@ def fetch_audit_logs(
     return rows
 
 
+def fetch_inventory_at(at: str) -> list[dict]:
+    """Return dbo.Inventory as it stood at `at` (UTC), rebuilt from the
+    audit log by time_travel.py. Takes any checkpoints that have come due
+    first."""
+    conn = get_connection()
+    try:
+        time_travel.refresh_checkpoints(conn)
+        conn.commit()
+        return time_travel.inventory_at(conn, at)
+    finally:
+        conn.close()
+
+
+def fetch_row_images(audit_id: int) -> tuple[Optional[dict], Optional[dict]]:
+    """Return the full (before, after) rows of one audit entry, rebuilding
+    a delta-encoded UPDATE's from the record's earlier entries."""
+    conn = get_connection()
+    try:
+        return time_travel.row_images(conn, audit_id)
+    finally:
+        conn.close()
+
+
 def _format_json(raw: Optional[str]) -> str:
     """Pretty-print a JSON string, or return '—' if empty."""
     if not raw:
@@ -92,6 +142,7 @@ def run_streamlit() -> None:
         record_id_filter = st.number_input(
             "RecordID (0 = all)", min_value=0, step=1, value=0
         )
+        search = st.text_input("Search", placeholder="SKU, user, keyword…")
         limit = st.slider("Max rows", 10, 500, 100)
         refresh = st.button("Refresh")
 
@@ -102,6 +153,7 @@ def run_streamlit() -> None:
             limit=limit,
             operation=op_filter if op_filter != "ALL" else None,
             record_id=rid,
+            search=search or None,
         )
     except Exception as exc:
         st.error(f"Connection error: {exc}")
@@ -132,13 +184,19 @@ def run_streamlit() -> None:
             f"#{row['AuditID']}  :{op_color}[{row['Operation']}]  "
             f"RecordID={row['RecordID']}  {row['ChangedAt']}  by {row['ChangedBy']}"
         ):
+            before, after = row["BeforeData"], row["AfterData"]
+            if row["IsDelta"]:
+                st.caption("Changed columns only.")
+                if st.checkbox("Show full rows", key=f"full_{row['AuditID']}"):
+                    full_before, full_after = fetch_row_images(row["AuditID"])
+                    before, after = json.dumps(full_before), json.dumps(full_after)
             c1, c2 = st.columns(2)
             with c1:
                 st.subheader("Before")
-                st.code(_format_json(row["BeforeData"]), language="json")
+                st.code(_format_json(before), language="json")
             with c2:
                 st.subheader("After")
-                st.code(_format_json(row["AfterData"]), language="json")
+                st.code(_format_json(after), language="json")
 
 
 # ---------------------------------------------------------------------------
@@ -161,6 +219,7 @@ def run_cli() -> None:
         console = Console()
         table = Table(
             title="Inventory_AuditLog (latest 50)",
+            caption="Δ = changed columns only",
             show_lines=True,
         )
         table.add_column("AuditID", style="dim", justify="right")
@@ -174,7 +233,8 @@ def run_cli() -> None:
         op_styles = {"INSERT": "green", "UPDATE": "yellow", "DELETE": "red"}
 
         for r in rows:
-            op_text = Text(r["Operation"], style=op_styles.get(r["Operation"], "white"))
+            op_label = r["Operation"] + (" Δ" if r["IsDelta"] else "")
+            op_text = Text(op_label, style=op_styles.get(r["Operation"], "white"))
             before = (r["BeforeData"] or "—")[:120]
             after  = (r["AfterData"]  or "—")[:120]
             table.add_row(
@@ -194,8 +254,9 @@ def run_cli() -> None:
         print(f"\n{'AuditID':<8} {'Op':<8} {'ChangedAt':<20} {'By':<20} {'RecordID':<10}")
         print("-" * 80)
         for r in rows:
+            op_label = r["Operation"] + (" Δ" if r["IsDelta"] else "")
             print(
-                f"{r['AuditID']:<8} {r['Operation']:<8} "
+                f"{r['AuditID']:<8} {op_label:<8} "
                 f"{r['ChangedAt']:<20} {r['ChangedBy']:<20} "
                 f"{str(r['RecordID'] or ''):<10}"
             )
@@ -206,11 +267,48 @@ def run_cli() -> None:
             print()
 
 
+def run_cli_as_of(at: str) -> None:
+    rows = fetch_inventory_at(at)
+
+    if not rows:
+        print(f"Inventory was empty at {at}.")
+        return
+
+    columns = ["InventoryID", "SKU", "ProductName", "Category",
+               "Quantity", "UnitPrice", "Location", "IsActive"]
+    try:
+        from rich.console import Console
+        from rich.table import Table
+
+        table = Table(title=f"Inventory as of {at} ({len(rows)} rows)")
+        for col in columns:
+            numeric = col in ("InventoryID", "Quantity", "UnitPrice")
+            table.add_column(col, justify="right" if numeric else "left")
+        for r in rows:
+            table.add_row(*(str(r.get(col, "")) for col in columns))
+        Console().print(table)
+
+    except ImportError:
+        print(f"\nInventory as of {at} ({len(rows)} rows)")
+        print(f"{'ID':<6} {'SKU':<10} {'ProductName':<28} {'Qty':>6} {'Price':>9}  {'Location':<14} Active")
+        print("-" * 88)
+        for r in rows:
+            print(
+                f"{r['InventoryID']:<6} {r['SKU']:<10} {r['ProductName'][:28]:<28} "
+                f"{r['Quantity']:>6} {r['UnitPrice']:>9}  {str(r['Location'] or ''):<14} "
+                f"{'yes' if r['IsActive'] else 'no'}"
+            )
+
+
 # ---------------------------------------------------------------------------
 # Entry point
 # ---------------------------------------------------------------------------
 
 if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "as-of":
+        run_cli_as_of(sys.argv[2])
+        sys.exit()
+
     # When Streamlit runs this file it injects its own __streamlit__ marker
     try:
         import streamlit.runtime.scriptrunner  # noqa: F401
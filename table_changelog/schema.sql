@@ -31,7 +31,8 @@ BEGIN
         ChangedBy     NVARCHAR(256) NOT NULL,          -- DB login / app user
         RecordID      INT           NULL,              -- Inventory.InventoryID affected
         BeforeData    NVARCHAR(MAX) NULL,              -- JSON snapshot before change
-        AfterData     NVARCHAR(MAX) NULL               -- JSON snapshot after change
+        AfterData     NVARCHAR(MAX) NULL,              -- JSON snapshot after change
+        IsDelta       BIT           NOT NULL DEFAULT 0 -- 1: only the changed columns
     );
 
     -- Index for fast querying by record and time
@@ -40,10 +41,42 @@ BEGIN
 END;
 GO
 
+-- Audit tables created before delta encoding
+IF COL_LENGTH('dbo.Inventory_AuditLog', 'IsDelta') IS NULL
+    ALTER TABLE dbo.Inventory_AuditLog
+        ADD IsDelta BIT NOT NULL CONSTRAINT DF_Inventory_AuditLog_IsDelta DEFAULT 0;
+GO
+
+-- Finds a record's latest full snapshot in one seek (trigger, time_travel.py)
+IF NOT EXISTS (
+    SELECT 1 FROM sys.indexes
+    WHERE object_id = OBJECT_ID('dbo.Inventory_AuditLog') AND name = 'IX_AuditLog_RecordDelta'
+)
+    CREATE NONCLUSTERED INDEX IX_AuditLog_RecordDelta
+        ON dbo.Inventory_AuditLog (RecordID, IsDelta, AuditID);
+GO
+
+-- Counts a record's deltas since that snapshot as a range seek (trigger)
+IF NOT EXISTS (
+    SELECT 1 FROM sys.indexes
+    WHERE object_id = OBJECT_ID('dbo.Inventory_AuditLog') AND name = 'IX_AuditLog_RecordAudit'
+)
+    CREATE NONCLUSTERED INDEX IX_AuditLog_RecordAudit
+        ON dbo.Inventory_AuditLog (RecordID, AuditID);
+GO
+
 -- 3. Trigger -------------------------------------------------
 -- Handles INSERT, UPDATE, and DELETE in a single trigger.
 -- Uses the virtual INSERTED / DELETED tables and FOR JSON PATH
--- to capture full row snapshots.
+-- to capture row snapshots.
+--
+-- UPDATEs are delta-encoded: BeforeData / AfterData hold only the
+-- columns that changed (IsDelta = 1), found by comparing the two
+-- snapshots key by key with OPENJSON. Every @snapshot_every-th
+-- UPDATE of a record stores the full rows instead, so a full row
+-- is never more than @snapshot_every - 1 deltas away. Set it to 1
+-- to store full rows for every UPDATE. Needs SQL Server 2017+
+-- (STRING_AGG).
 
 CREATE OR ALTER TRIGGER dbo.trg_Inventory_Audit
 ON dbo.Inventory
@@ -53,6 +86,7 @@ BEGIN
     SET NOCOUNT ON;
 
     DECLARE @operation VARCHAR(10);
+    DECLARE @snapshot_every INT = 10;
 
     -- Determine operation type from virtual tables
     IF EXISTS (SELECT 1 FROM INSERTED) AND EXISTS (SELECT 1 FROM DELETED)
@@ -64,55 +98,166 @@ BEGIN
 
     -- For INSERT: no BeforeData, AfterData = inserted row(s)
     -- For UPDATE: BeforeData = deleted row(s), AfterData = inserted row(s)
+    --             (changed columns only, unless a snapshot is due)
     -- For DELETE: BeforeData = deleted row(s), no AfterData
 
     INSERT INTO dbo.Inventory_AuditLog
-        (Operation, ChangedAt, ChangedBy, RecordID, BeforeData, AfterData)
+        (Operation, ChangedAt, ChangedBy, RecordID, BeforeData, AfterData, IsDelta)
     SELECT
         @operation,
         SYSUTCDATETIME(),
         SYSTEM_USER,
-        COALESCE(i.InventoryID, d.InventoryID),
-        -- BeforeData: serialize the DELETED (old) row as JSON
-        (
-            SELECT
-                d2.InventoryID,
-                d2.SKU,
-                d2.ProductName,
-                d2.Category,
-                d2.Quantity,
-                d2.UnitPrice,
-                d2.Location,
-                d2.IsActive,
-                d2.CreatedAt,
-                d2.UpdatedAt
-            FROM DELETED d2
-            WHERE d2.InventoryID = COALESCE(i.InventoryID, d.InventoryID)
-            FOR JSON PATH, WITHOUT_ARRAY_WRAPPER
-        ),
-        -- AfterData: serialize the INSERTED (new) row as JSON
-        (
-            SELECT
-                i2.InventoryID,
-                i2.SKU,
-                i2.ProductName,
-                i2.Category,
-                i2.Quantity,
-                i2.UnitPrice,
-                i2.Location,
-                i2.IsActive,
-                i2.CreatedAt,
-                i2.UpdatedAt
-            FROM INSERTED i2
-            WHERE i2.InventoryID = COALESCE(i.InventoryID, d.InventoryID)
-            FOR JSON PATH, WITHOUT_ARRAY_WRAPPER
-        )
+        combined.InventoryID,
+        CASE WHEN enc.IsDelta = 1 THEN delta.BeforeData ELSE snap.BeforeData END,
+        CASE WHEN enc.IsDelta = 1 THEN delta.AfterData  ELSE snap.AfterData  END,
+        enc.IsDelta
     FROM
         (SELECT InventoryID FROM INSERTED
          UNION
          SELECT InventoryID FROM DELETED) AS combined(InventoryID)
-    LEFT JOIN INSERTED i ON i.InventoryID = combined.InventoryID
-    LEFT JOIN DELETED  d ON d.InventoryID = combined.InventoryID;
+    CROSS APPLY (
+        SELECT
+            -- BeforeData: serialize the DELETED (old) row as JSON
+            (
+                SELECT
+                    d2.InventoryID,
+                    d2.SKU,
+                    d2.ProductName,
+                    d2.Category,
+                    d2.Quantity,
+                    d2.UnitPrice,
+                    d2.Location,
+                    d2.IsActive,
+                    d2.CreatedAt,
+                    d2.UpdatedAt
+                FROM DELETED d2
+                WHERE d2.InventoryID = combined.InventoryID
+                FOR JSON PATH, WITHOUT_ARRAY_WRAPPER, INCLUDE_NULL_VALUES
+            ) AS BeforeData,
+            -- AfterData: serialize the INSERTED (new) row as JSON
+            (
+                SELECT
+                    i2.InventoryID,
+                    i2.SKU,
+                    i2.ProductName,
+                    i2.Category,
+                    i2.Quantity,
+                    i2.UnitPrice,
+                    i2.Location,
+                    i2.IsActive,
+                    i2.CreatedAt,
+                    i2.UpdatedAt
+                FROM INSERTED i2
+                WHERE i2.InventoryID = combined.InventoryID
+                FOR JSON PATH, WITHOUT_ARRAY_WRAPPER, INCLUDE_NULL_VALUES
+            ) AS AfterData
+    ) AS snap
+    -- Delta unless the record has had @snapshot_every - 1 deltas
+    -- since its last full snapshot. Two seeks, reading at most
+    -- @snapshot_every rows however long the record's history.
+    CROSS APPLY (
+        SELECT CASE
+            WHEN @operation = 'UPDATE' AND (
+                SELECT COUNT(*) FROM (
+                    SELECT TOP (@snapshot_every) 1 AS n
+                    FROM dbo.Inventory_AuditLog a
+                    WHERE a.RecordID = combined.InventoryID
+                      AND a.AuditID > COALESCE((
+                          SELECT TOP (1) f.AuditID FROM dbo.Inventory_AuditLog f
+                          WHERE f.RecordID = combined.InventoryID AND f.IsDelta = 0
+                          ORDER BY f.AuditID DESC
+                      ), 0)
+                ) AS run
+            ) < @snapshot_every - 1
+            THEN CAST(1 AS BIT) ELSE CAST(0 AS BIT)
+        END AS IsDelta
+    ) AS enc
+    -- The changed columns. Values are compared as binary text plus
+    -- length and JSON type, so case and trailing-space changes count.
+    OUTER APPLY (
+        SELECT
+            '{' + STRING_AGG(CAST(CONCAT('"', b.[key], '":',
+                CASE b.[type] WHEN 0 THEN 'null'
+                              WHEN 1 THEN '"' + STRING_ESCAPE(b.[value], 'json') + '"'
+                              ELSE b.[value] END) AS NVARCHAR(MAX)), ',') + '}' AS BeforeData,
+            '{' + STRING_AGG(CAST(CONCAT('"', a.[key], '":',
+                CASE a.[type] WHEN 0 THEN 'null'
+                              WHEN 1 THEN '"' + STRING_ESCAPE(a.[value], 'json') + '"'
+                              ELSE a.[value] END) AS NVARCHAR(MAX)), ',') + '}' AS AfterData
+        FROM OPENJSON(snap.BeforeData) b
+        JOIN OPENJSON(snap.AfterData)  a ON a.[key] = b.[key]
+        WHERE enc.IsDelta = 1
+          AND (   a.[type] <> b.[type]
+               OR DATALENGTH(a.[value]) <> DATALENGTH(b.[value])
+               OR a.[value] COLLATE Latin1_General_BIN2 <> b.[value] COLLATE Latin1_General_BIN2)
+    ) AS delta;
 
 END;
 GO
+
+-- 4. Full-text search index (optional) ------------------------
+-- Lets log_viewer.py's search use CONTAINS instead of scanning
+-- the JSON text of every audit row with LIKE. Needs Full-Text
+-- Search: included in Azure SQL; SQL Server Express needs the
+-- "Express with Advanced Services" edition. Skipped when it is
+-- not installed. The index keys off the audit table's primary
+-- key, whose generated name is looked up here. CHANGE_TRACKING
+-- AUTO keeps the index current as the trigger writes rows.
+
+IF FULLTEXTSERVICEPROPERTY('IsFullTextInstalled') = 1
+   AND NOT EXISTS (
+       SELECT 1 FROM sys.fulltext_indexes
+       WHERE object_id = OBJECT_ID('dbo.Inventory_AuditLog')
+   )
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM sys.fulltext_catalogs WHERE name = 'ftc_ChangeLog')
+        CREATE FULLTEXT CATALOG ftc_ChangeLog;
+
+    DECLARE @pk SYSNAME = (
+        SELECT name FROM sys.indexes
+        WHERE object_id = OBJECT_ID('dbo.Inventory_AuditLog') AND is_primary_key = 1
+    );
+
+    DECLARE @sql NVARCHAR(MAX) =
+        N'CREATE FULLTEXT INDEX ON dbo.Inventory_AuditLog (ChangedBy, BeforeData, AfterData) '
+      + N'KEY INDEX ' + QUOTENAME(@pk) + N' ON ftc_ChangeLog WITH CHANGE_TRACKING AUTO';
+
+    -- Populates from the existing rows in the background
+    EXEC sp_executesql @sql;
+END;
+GO
+
+-- 5. Time-travel checkpoints ---------------------------------
+-- Materialised copies of the whole table, taken by time_travel.py
+-- (log_viewer.py) so that rebuilding Inventory as of a past time
+-- replays only the audit rows after the nearest checkpoint.
+IF OBJECT_ID('dbo.Inventory_Checkpoint', 'U') IS NULL
+BEGIN
+    CREATE TABLE dbo.Inventory_Checkpoint (
+        AuditID       BIGINT        NOT NULL PRIMARY KEY,  -- state after this audit row
+        ChangedAt     DATETIME2     NOT NULL,
+        RecordCount   INT           NOT NULL,
+        LogHead       BIGINT        NOT NULL               -- log validated up to this AuditID
+    );
+
+    CREATE NONCLUSTERED INDEX IX_Checkpoint_ChangedAt
+        ON dbo.Inventory_Checkpoint (ChangedAt, AuditID);
+
+    CREATE TABLE dbo.Inventory_CheckpointRow (
+        AuditID       BIGINT        NOT NULL,
+        InventoryID   INT           NOT NULL,
+        RowData       NVARCHAR(MAX) NOT NULL,              -- JSON row, as in the audit log
+        CONSTRAINT PK_Inventory_CheckpointRow PRIMARY KEY (AuditID, InventoryID)
+    );
+END;
+GO
+
+-- Time-travel replay order (time_travel.py)
+IF NOT EXISTS (
+    SELECT 1 FROM sys.indexes
+    WHERE object_id = OBJECT_ID('dbo.Inventory_AuditLog') AND name = 'IX_AuditLog_ChangedAt'
+)
+    CREATE NONCLUSTERED INDEX IX_AuditLog_ChangedAt
+        ON dbo.Inventory_AuditLog (ChangedAt, AuditID)
+        INCLUDE (Operation, RecordID);
+GO
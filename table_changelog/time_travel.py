@@ -0,0 +1,243 @@
+"""
+time_travel.py — rebuilds Inventory as it stood at any past moment by
+replaying Inventory_AuditLog.
+
+Events are replayed in (ChangedAt, AuditID) order. To avoid replaying the
+whole history for every question, the table's full state is materialised
+every so often into Inventory_Checkpoint / Inventory_CheckpointRow. A
+reconstruction starts from the nearest checkpoint at or before the
+requested time and replays only the events after it.
+
+A checkpoint is a full copy of the table, so a new one is taken once the
+events since the previous checkpoint number at least CHECKPOINT_INTERVAL
+and at least the table's row count. Replay after a checkpoint then costs
+about as much as loading it, and checkpoints take about as much space as
+the log they cover.
+
+UPDATE rows may be deltas (IsDelta = 1) holding only the changed columns;
+replay merges them into the row the checkpoint or earlier events built.
+row_images() rebuilds the full rows of a single audit entry on demand,
+walking forward from the record's latest full snapshot before it.
+
+A write stamped with an earlier time than an existing checkpoint changes
+every state after it. refresh_checkpoints() finds such rows, keyed off
+the LogHead each checkpoint was last validated against, and drops the
+checkpoints they invalidate.
+
+The module only reads and writes through the DB-API connection it is
+given, with qmark parameters and SQL that is common to SQLite and SQL
+Server. demo_db and log_viewer use it for their own backends; the tables
+themselves are created by demo_db.init_database() and schema.sql.
+Callers own the transaction.
+"""
+from __future__ import annotations
+
+import json
+from typing import Any, Iterable, Optional
+
+CHECKPOINT_INTERVAL = 1000
+
+# Events strictly after checkpoint position (?, ?). Spelled out rather than
+# as a row-value comparison, which SQL Server does not support, and as a
+# range plus a filter so both engines walk the ChangedAt index in order.
+_AFTER_POSITION = "(ChangedAt >= ? AND (ChangedAt > ? OR AuditID > ?))"
+
+
+def apply_change(state: dict[int, dict], row: dict) -> None:
+    """Applies one audit row to `state` (InventoryID → row dict)."""
+    record_id = row["RecordID"]
+    if row["Operation"] == "DELETE":
+        state.pop(record_id, None)
+    elif row["IsDelta"]:
+        # a delta stamped before its record's INSERT has nothing to patch
+        if record_id in state and row["AfterData"]:
+            state[record_id] = {**state[record_id], **json.loads(row["AfterData"])}
+    else:
+        state[record_id] = json.loads(row["AfterData"])
+
+
+def replay(state: dict[int, dict], events: Iterable[dict]) -> dict[int, dict]:
+    """Applies `events`, in order, to `state` and returns it."""
+    for event in events:
+        apply_change(state, event)
+    return state
+
+
+def _fetch_dicts(cur: Any, size: Optional[int] = None) -> list[dict]:
+    columns = [col[0] for col in cur.description]
+    rows = cur.fetchmany(size) if size else cur.fetchall()
+    return [dict(zip(columns, r)) for r in rows]
+
+
+def _load_checkpoint(cur: Any, audit_id: int) -> dict[int, dict]:
+    cur.execute(
+        "SELECT InventoryID, RowData FROM Inventory_CheckpointRow WHERE AuditID = ?",
+        (audit_id,),
+    )
+    return {inventory_id: json.loads(data) for inventory_id, data in cur.fetchall()}
+
+
+def _select_events(cur: Any, position: Optional[tuple], at: Optional[Any] = None) -> None:
+    clauses: list[str] = []
+    params:  list[Any] = []
+    if position is not None:
+        changed_at, audit_id = position
+        clauses.append(_AFTER_POSITION)
+        params += [changed_at, changed_at, audit_id]
+    if at is not None:
+        clauses.append("ChangedAt <= ?")
+        params.append(at)
+    where = ("WHERE " + " AND ".join(clauses)) if clauses else ""
+    cur.execute(
+        f"""
+        SELECT AuditID, ChangedAt, Operation, RecordID, AfterData, IsDelta
+        FROM Inventory_AuditLog
+        {where}
+        ORDER BY ChangedAt, AuditID
+        """,
+        params,
+    )
+
+
+def _next_events(conn: Any, position: Optional[tuple], count: int) -> list[dict]:
+    # A cursor of its own, closed before anything is written: pyodbc can't
+    # write on a connection with a half-read result set
+    reader = conn.cursor()
+    try:
+        _select_events(reader, position)
+        return _fetch_dicts(reader, count)
+    finally:
+        reader.close()
+
+
+def _latest_checkpoint(conn: Any, at: Optional[Any] = None) -> Optional[dict]:
+    where, params = ("WHERE ChangedAt <= ?", [at]) if at is not None else ("", [])
+    # Only the first row is read, so its own cursor, closed before the
+    # result set is drained (see _next_events)
+    reader = conn.cursor()
+    try:
+        reader.execute(
+            f"""
+            SELECT AuditID, ChangedAt, RecordCount
+            FROM Inventory_Checkpoint
+            {where}
+            ORDER BY ChangedAt DESC, AuditID DESC
+            """,
+            params,
+        )
+        rows = _fetch_dicts(reader, 1)
+    finally:
+        reader.close()
+    return rows[0] if rows else None
+
+
+def _write_checkpoint(cur: Any, event: dict, state: dict[int, dict], head: int) -> None:
+    cur.execute(
+        """
+        INSERT INTO Inventory_Checkpoint (AuditID, ChangedAt, RecordCount, LogHead)
+        VALUES (?, ?, ?, ?)
+        """,
+        (event["AuditID"], event["ChangedAt"], len(state), head),
+    )
+    if state:
+        cur.executemany(
+            "INSERT INTO Inventory_CheckpointRow (AuditID, InventoryID, RowData) VALUES (?, ?, ?)",
+            [(event["AuditID"], inventory_id, json.dumps(row)) for inventory_id, row in state.items()],
+        )
+
+
+def _drop_checkpoints_after(cur: Any, changed_at: Any) -> None:
+    cur.execute(
+        """
+        DELETE FROM Inventory_CheckpointRow WHERE AuditID IN (
+            SELECT AuditID FROM Inventory_Checkpoint WHERE ChangedAt > ?
+        )
+        """,
+        (changed_at,),
+    )
+    cur.execute("DELETE FROM Inventory_Checkpoint WHERE ChangedAt > ?", (changed_at,))
+
+
+def refresh_checkpoints(conn: Any) -> int:
+    """Drops checkpoints invalidated by back-dated writes, then takes any
+    that are due. Returns how many were taken."""
+    cur = conn.cursor()
+    cur.execute("SELECT MAX(AuditID) FROM Inventory_AuditLog")
+    head = cur.fetchone()[0] or 0
+
+    cur.execute("SELECT MAX(LogHead) FROM Inventory_Checkpoint")
+    validated = cur.fetchone()[0]
+    if validated is not None and head > validated:
+        cur.execute("SELECT MIN(ChangedAt) FROM Inventory_AuditLog WHERE AuditID > ?", (validated,))
+        _drop_checkpoints_after(cur, cur.fetchone()[0])
+        cur.execute("UPDATE Inventory_Checkpoint SET LogHead = ?", (head,))
+
+    latest   = _latest_checkpoint(conn)
+    position = (latest["ChangedAt"], latest["AuditID"]) if latest else None
+    size     = latest["RecordCount"] if latest else 0
+    state: Optional[dict[int, dict]] = None
+    taken = 0
+    while True:
+        due    = max(CHECKPOINT_INTERVAL, size)
+        events = _next_events(conn, position, due)
+        if len(events) < due:
+            return taken
+        if state is None:
+            state = _load_checkpoint(cur, latest["AuditID"]) if latest else {}
+        replay(state, events)
+        last = events[-1]
+        _write_checkpoint(cur, last, state, head)
+        position = (last["ChangedAt"], last["AuditID"])
+        size     = len(state)
+        taken   += 1
+
+
+def inventory_at(conn: Any, at: Any) -> list[dict]:
+    """Inventory's rows as they stood at `at` (every change stamped at or
+    before it applied), ordered by InventoryID."""
+    cur = conn.cursor()
+    checkpoint = _latest_checkpoint(conn, at)
+    if checkpoint:
+        state    = _load_checkpoint(cur, checkpoint["AuditID"])
+        position = (checkpoint["ChangedAt"], checkpoint["AuditID"])
+    else:
+        state, position = {}, None
+    _select_events(cur, position, at)
+    replay(state, _fetch_dicts(cur))
+    return [state[k] for k in sorted(state)]
+
+
+def row_images(conn: Any, audit_id: int) -> tuple[Optional[dict], Optional[dict]]:
+    """The full (before, after) rows of one audit entry. A delta's are
+    rebuilt by applying, in write order, the record's deltas since its
+    latest full snapshot — at most SNAPSHOT_EVERY - 1 of them."""
+    cur = conn.cursor()
+    cur.execute(
+        "SELECT RecordID, BeforeData, AfterData, IsDelta FROM Inventory_AuditLog WHERE AuditID = ?",
+        (audit_id,),
+    )
+    rows = _fetch_dicts(cur)
+    if not rows:
+        return None, None
+    entry  = rows[0]
+    before = json.loads(entry["BeforeData"]) if entry["BeforeData"] else None
+    after  = json.loads(entry["AfterData"])  if entry["AfterData"]  else None
+    if not entry["IsDelta"]:
+        return before, after
+
+    cur.execute(
+        """
+        SELECT AfterData, IsDelta FROM Inventory_AuditLog
+        WHERE RecordID = ? AND AuditID < ? AND AuditID >= (
+            SELECT MAX(AuditID) FROM Inventory_AuditLog
+            WHERE RecordID = ? AND AuditID < ? AND IsDelta = 0
+        )
+        ORDER BY AuditID
+        """,
+        (entry["RecordID"], audit_id, entry["RecordID"], audit_id),
+    )
+    row: dict = {}
+    for data, is_delta in cur.fetchall():
+        if data:
+            row = {**row, **json.loads(data)} if is_delta else json.loads(data)
+    return {**row, **(before or {})}, {**row, **(after or {})}